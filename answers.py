@@ -0,0 +1,224 @@
+"""
+Förkompilerade svarsjämförelser per nivå.
+
+competition_loader bygger en matcher per nivå när katalogen laddas, så att
+svarskontrollen i /submit blir ett enda anrop utan att förväntat svar
+normaliseras om varje gång. Nivåns config.json kan ange hur svaret jämförs
+med ett "answer"-objekt:
+
+    "answer": {"type": "text", "whitespace": "collapse"}
+    "answer": {"type": "number", "tolerance": 0.01}
+    "answer": {"type": "set", "separator": ","}
+    "answer": {"type": "unordered"}
+    "answer": {"type": "regex", "pattern": "0x0?CF07731"}
+    "answer": {"type": "digest", "digest": "sha256:<hex>"}
+
+Utan "answer" gäller input_type som tidigare: "text" jämförs utan hänsyn
+till versaler och "number" som exakt sträng. Text, mängder och digest tar
+även "case_sensitive" (standard false) och "whitespace" ("strip",
+"collapse" eller "ignore"; standard "strip").
+
+På nivåer med genererad indata har varje deltagare ett eget svar, se
+compile_generated_matcher.
+"""
+import functools
+import hashlib
+import hmac
+import math
+import re
+from typing import Any, Callable, Dict, Optional
+
+
+Matcher = Callable[[str], bool]
+
+_WHITESPACE = re.compile(r"\s+")
+# Standardavgränsare för mängder: komma, semikolon och/eller blanksteg
+_ITEM_SEPARATOR = re.compile(r"[,;\s]+")
+
+
+def _normalizer(case_sensitive: bool = False, whitespace: str = "strip") -> Callable[[str], str]:
+    """Funktion som normaliserar ett svar enligt inställningarna."""
+    if whitespace not in ("strip", "collapse", "ignore"):
+        raise ValueError(f"Unknown whitespace mode '{whitespace}'")
+
+    def normalize(text: str) -> str:
+        if whitespace == "collapse":
+            text = _WHITESPACE.sub(" ", text.strip())
+        elif whitespace == "ignore":
+            text = _WHITESPACE.sub("", text)
+        else:
+            text = text.strip()
+        return text if case_sensitive else text.lower()
+
+    return normalize
+
+
+class TextMatcher:
+    """Normaliserad textjämförelse; förväntat svar normaliseras en gång."""
+
+    kind = "text"
+
+    def __init__(self, expected: str, case_sensitive: bool = False, whitespace: str = "strip"):
+        self.normalize = _normalizer(case_sensitive, whitespace)
+        self.expected = self.normalize(expected)
+
+    def __call__(self, answer: str) -> bool:
+        return self.normalize(answer) == self.expected
+
+
+class NumberMatcher:
+    """Numerisk jämförelse med absolut (eller relativ) tolerans."""
+
+    kind = "number"
+
+    def __init__(self, expected: str, tolerance: float = 0.0, relative: bool = False):
+        self.expected = float(expected)
+        self.tolerance = float(tolerance)
+        self.relative = relative
+
+    def __call__(self, answer: str) -> bool:
+        try:
+            value = float(answer.strip())
+        except ValueError:
+            return False
+        if self.relative:
+            return math.isclose(value, self.expected, rel_tol=self.tolerance, abs_tol=0.0)
+        return abs(value - self.expected) <= self.tolerance
+
+
+class SetMatcher:
+    """Oordnad lista av element; som mängd (dubbletter ignoreras) eller med antal."""
+
+    def __init__(self, expected: str, unique: bool = True, separator: Optional[str] = None,
+                 case_sensitive: bool = False, whitespace: str = "strip"):
+        self.kind = "set" if unique else "unordered"
+        self.unique = unique
+        self.separator = separator
+        self.normalize = _normalizer(case_sensitive, whitespace)
+        self.expected = self._items(expected)
+
+    def _items(self, text: str):
+        parts = text.split(self.separator) if self.separator else _ITEM_SEPARATOR.split(text)
+        items = [self.normalize(part) for part in parts]
+        items = [item for item in items if item]
+        return frozenset(items) if self.unique else sorted(items)
+
+    def __call__(self, answer: str) -> bool:
+        return self._items(answer) == self.expected
+
+
+class RegexMatcher:
+    """Hela (trimmade) svaret ska matcha ett förkompilerat reguljärt uttryck."""
+
+    kind = "regex"
+
+    def __init__(self, pattern: str, case_sensitive: bool = False):
+        self.pattern = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+    def __call__(self, answer: str) -> bool:
+        return self.pattern.fullmatch(answer.strip()) is not None
+
+
+class DigestMatcher:
+    """
+    Jämför SHA-256 av det normaliserade svaret. Långa svar behöver då inte
+    jämföras tecken för tecken, och med "digest" i config behöver svaret
+    inte stå i klartext.
+    """
+
+    kind = "digest"
+
+    def __init__(self, expected: str = "", digest: Optional[str] = None,
+                 case_sensitive: bool = False, whitespace: str = "strip"):
+        self.normalize = _normalizer(case_sensitive, whitespace)
+        if digest:
+            algorithm, _, hex_digest = digest.rpartition(":")
+            if algorithm not in ("", "sha256"):
+                raise ValueError(f"Unsupported digest algorithm '{algorithm}'")
+            self.digest = bytes.fromhex(hex_digest)
+        else:
+            self.digest = self._hash(expected)
+
+    def _hash(self, text: str) -> bytes:
+        return hashlib.sha256(self.normalize(text).encode("utf-8")).digest()
+
+    def __call__(self, answer: str) -> bool:
+        return hmac.compare_digest(self._hash(answer), self.digest)
+
+
+class NeverMatcher:
+    """Inget svar är rätt (genererad nivå vars svar saknas)."""
+
+    kind = "never"
+
+    def __call__(self, answer: str) -> bool:
+        return False
+
+
+class ExactMatcher:
+    """Exakt strängjämförelse efter strip() (input_type "number" utan answer-objekt)."""
+
+    kind = "exact"
+
+    def __init__(self, expected: str):
+        self.expected = expected
+
+    def __call__(self, answer: str) -> bool:
+        return answer.strip() == self.expected
+
+
+def _text_options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    return {"case_sensitive": bool(spec.get("case_sensitive", False)),
+            "whitespace": spec.get("whitespace", "strip")}
+
+
+def compile_matcher(expected_answer: str, input_type: str = "text", spec: Optional[Dict[str, Any]] = None) -> Matcher:
+    """
+    Bygger nivåns matcher från expected_answer, input_type och det valfria
+    answer-objektet. Kastar ValueError vid en ogiltig specifikation.
+    """
+    if not spec:
+        if input_type == "number":
+            return ExactMatcher(expected_answer)
+        return TextMatcher(expected_answer)
+
+    kind = spec.get("type", "number" if input_type == "number" else "text")
+    if kind == "text":
+        return TextMatcher(expected_answer, **_text_options(spec))
+    if kind == "number":
+        return NumberMatcher(expected_answer, spec.get("tolerance", 0.0), bool(spec.get("relative", False)))
+    if kind in ("set", "unordered"):
+        return SetMatcher(expected_answer, kind == "set", spec.get("separator"), **_text_options(spec))
+    if kind == "regex":
+        try:
+            return RegexMatcher(spec.get("pattern", expected_answer), bool(spec.get("case_sensitive", False)))
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {e}") from e
+    if kind == "digest":
+        return DigestMatcher(expected_answer, spec.get("digest"), **_text_options(spec))
+    raise ValueError(f"Unknown answer type '{kind}'")
+
+
+def compile_generated_matcher(expected_answer: Optional[str], input_type: str = "text",
+                              spec: Optional[Dict[str, Any]] = None) -> Matcher:
+    """
+    Matcher mot en deltagares genererade svar. "pattern" och "digest" är
+    fasta svar för hela nivån och skulle ersätta deltagarens eget, så regex
+    och digest jämförs här som text. Saknas svaret, eller går det inte att
+    jämföra (t.ex. "number" och ett svar som inte är ett tal), är inget svar
+    rätt - det ska bli ett felsvar, inte ett serverfel.
+    """
+    if not expected_answer:
+        return NeverMatcher()
+    if spec and spec.get("type") in ("regex", "digest"):
+        spec = dict(_text_options(spec), type="text")
+    try:
+        return compile_matcher(expected_answer, input_type, spec)
+    except ValueError:
+        return NeverMatcher()
+
+
+@functools.lru_cache(maxsize=1024)
+def default_matcher(expected_answer: str, input_type: str = "text") -> Matcher:
+    """Cachad matcher för enbart expected_answer och input_type (db.check_answer)."""
+    return compile_matcher(expected_answer, input_type)
@@ -0,0 +1,119 @@
+"""
+Buffrade räknare för felaktiga svar per (tävling, nivå, användare).
+
+Ett fel svar ökar bara en räknare i minnet - felvägen i submit_answer gör
+ingen databasskrivning. En bakgrundstråd skriver ut det som samlats var
+ATTEMPT_FLUSH_INTERVAL:e sekund som en batch upserts per tävling (en
+transaktion per databasfil), och det som återstår skrivs vid avslut.
+
+Räknarna som väntar på att skrivas ut ingår i läsningar från den egna
+processen; andra serverprocessers räknare syns efter deras nästa flush.
+/reset stämplar samma epokfil som progress-cachen, och räknare som samlats
+före en reset kastas då istället för att skrivas in i den nya databasen.
+"""
+import atexit
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Sekunder mellan utskrifterna till databasen
+ATTEMPT_FLUSH_INTERVAL = float(os.getenv("ATTEMPT_FLUSH_INTERVAL", "5"))
+
+Key = Tuple[str, int, str]      # (competition_id, level, user)
+Writer = Callable[[str, List[Tuple[int, str, int, int]]], None]
+
+
+class AttemptBuffer:
+    """Räknare i minnet som skrivs ut i batchar med writer(competition_id, [(level, user, antal, ts)])."""
+
+    def __init__(self, writer: Writer, stamp_path: Callable[[], str], interval: float = ATTEMPT_FLUSH_INTERVAL):
+        self.writer = writer
+        self.stamp_path = stamp_path
+        self.interval = interval
+        self.pending: Dict[Key, Tuple[int, int]] = {}
+        self.epoch: Optional[int] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        atexit.register(self.flush)
+
+    def _current_epoch(self) -> int:
+        try:
+            return os.stat(self.stamp_path()).st_mtime_ns
+        except OSError:
+            return 0
+
+    def record(self, user: str, competition_id: str, level: int):
+        """Ett fel svar till. Startar utskriftstråden första gången."""
+        key = (competition_id, level, user)
+        with self._lock:
+            if not self.pending:
+                self.epoch = self._current_epoch()
+            count, _ = self.pending.get(key, (0, 0))
+            self.pending[key] = (count + 1, int(time.time()))
+            if self._flusher is None:
+                self._start()
+
+    def pending_count(self, user: str, competition_id: str, level: int) -> int:
+        """Fel svar som ännu inte skrivits ut."""
+        with self._lock:
+            return self.pending.get((competition_id, level, user), (0, 0))[0]
+
+    def flush(self) -> int:
+        """Skriver ut alla väntande räknare. Returnerar antal skrivna rader."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending = self.pending, {}
+                epoch = self.epoch
+            if not pending:
+                return 0
+            if epoch != self._current_epoch():
+                # Databasen har återställts sedan räknarna samlades
+                return 0
+
+            batches: Dict[str, List[Tuple[int, str, int, int]]] = {}
+            for (competition_id, level, user), (count, ts) in pending.items():
+                batches.setdefault(competition_id, []).append((level, user, count, ts))
+            written = 0
+            for competition_id, rows in batches.items():
+                try:
+                    self.writer(competition_id, rows)
+                    written += len(rows)
+                except Exception as e:
+                    print(f"⚠️  Warning: Writing wrong-answer counts failed: {e}")
+                    self._restore(competition_id, rows, epoch)
+            return written
+
+    def _restore(self, competition_id: str, rows: List[Tuple[int, str, int, int]], epoch: Optional[int]):
+        # Lägg tillbaka räknarna så att de skrivs vid nästa försök
+        with self._lock:
+            if self.pending and self.epoch != epoch:
+                return
+            self.epoch = epoch
+            for level, user, count, ts in rows:
+                key = (competition_id, level, user)
+                previous, _ = self.pending.get(key, (0, 0))
+                self.pending[key] = (previous + count, ts)
+
+    def clear(self):
+        """Kastar väntande räknare (efter /reset)."""
+        with self._lock:
+            self.pending.clear()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _start(self):
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._run, name="attempt-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        """Stoppar utskriftstråden och skriver ut det som återstår."""
+        self._stop.set()
+        self._flusher = None
+        self.flush()
@@ -0,0 +1,199 @@
+"""
+Online-backup av tävlingsdatabasen med SQLite:s backup-API.
+
+Kopieringen sker i små steg (BACKUP_PAGES sidor åt gången) och läslåset
+släpps mellan stegen, så att skrivare aldrig blockeras länge, även under
+pågående event. Är databasen upptagen (BUSY/LOCKED) väntar ett steg
+BACKUP_SLEEP sekunder innan det försöker igen. Backuper skrivs först till
+en temporär fil och byter sedan namn, så att en ögonblicksbild på disk
+alltid är komplett. Endast de senaste BACKUP_KEEP behålls; backuper tagna
+före /reset (*-pre-reset) roteras aldrig bort.
+
+Schemat kan startas i flera serverprocesser; bara den som håller ett
+fcntl-lås i BACKUP_DIR tar backuperna.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import db
+
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "10"))
+# Intervall i sekunder för schemalagd backup, 0 = av
+BACKUP_INTERVAL = int(os.getenv("BACKUP_INTERVAL", "0"))
+
+# Sidor per steg och väntetid (sekunder) när databasen är upptagen
+BACKUP_PAGES = 64
+BACKUP_SLEEP = 0.005
+
+# Antal omstarter (orsakade av samtidiga skrivningar) innan vi kopierar i ett steg
+BACKUP_MAX_RESTARTS = 20
+
+# Backuper med detta suffix (tagna av /reset) tas aldrig bort av rotationen
+PRE_RESET_SUFFIX = "-pre-reset"
+
+_backup_lock = threading.Lock()
+_scheduler: Optional[threading.Thread] = None
+_scheduler_stop = threading.Event()
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class _RestartGuard:
+    """Progress-callback som avbryter när backupen startats om för många gånger."""
+
+    def __init__(self):
+        self.last_remaining = None
+        self.restarts = 0
+
+    def __call__(self, status, remaining, total):
+        # SQLite börjar om från början om källan ändras av en annan anslutning
+        if self.last_remaining is not None and remaining > self.last_remaining:
+            self.restarts += 1
+            if self.restarts > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        self.last_remaining = remaining
+
+
+def create_backup(reason: str = "manual", backup_dir: Optional[str] = None,
+                  keep: Optional[int] = None) -> Optional[str]:
+    """
+    Tar en konsistent ögonblicksbild av databasen medan den används.
+    Returnerar sökvägen till backupen, eller None om databasen inte finns.
+    """
+    backup_dir = backup_dir or BACKUP_DIR
+    keep = BACKUP_KEEP if keep is None else keep
+
+    if not os.path.exists(db.DB_PATH):
+        return None
+
+    os.makedirs(backup_dir, exist_ok=True)
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"{int(now * 1000) % 1000:03d}"
+    base_name = os.path.splitext(os.path.basename(db.DB_PATH))[0]
+    final_path = os.path.join(backup_dir, f"{base_name}-{stamp}-{reason}.db")
+    tmp_path = final_path + ".tmp"
+
+    with _backup_lock:
+        _copy_database(db.DB_PATH, tmp_path)
+        os.replace(tmp_path, final_path)
+        rotate_backups(backup_dir, keep)
+        _backup_shards(backup_dir, f"{stamp}-{reason}", keep)
+
+    return final_path
+
+
+def _copy_database(source_path: str, target_path: str):
+    """Kopierar en databas stegvis med backup-API:t."""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            # Kopiera några sidor åt gången och släpp låset mellan stegen
+            source.backup(target, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, progress=_RestartGuard())
+        except _TooManyRestarts:
+            # Skrivningar startar om en stegvis backup; vid mycket trafik
+            # kopieras allt i ett steg istället (kort läslås)
+            source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def _backup_shards(backup_dir: str, name: str, keep: int):
+    """
+    Med DB_SHARD_DIR kopieras även varje tävlings shard, till
+    <backup_dir>/shards/<name>/. Bara de senaste keep omgångarna behålls.
+    """
+    shards = db.list_shards()
+    if not shards:
+        return
+    shard_root = os.path.join(backup_dir, "shards")
+    tmp_dir = os.path.join(shard_root, name + ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    for path in shards:
+        _copy_database(path, os.path.join(tmp_dir, os.path.basename(path)))
+    os.replace(tmp_dir, os.path.join(shard_root, name))
+
+    rounds = sorted((os.path.join(shard_root, entry) for entry in os.listdir(shard_root)
+                     if not entry.endswith((".tmp", PRE_RESET_SUFFIX))), key=os.path.getmtime)
+    for old in rounds[:max(len(rounds) - keep, 0)]:
+        for entry in os.listdir(old):
+            os.remove(os.path.join(old, entry))
+        os.rmdir(old)
+
+
+def list_backups(backup_dir: Optional[str] = None) -> List[str]:
+    """Listar backuper, äldst först."""
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [name for name in os.listdir(backup_dir) if name.endswith(".db")]
+    paths = [os.path.join(backup_dir, name) for name in names]
+    return sorted(paths, key=os.path.getmtime)
+
+
+def rotate_backups(backup_dir: Optional[str] = None, keep: Optional[int] = None):
+    """Tar bort de äldsta backuperna så att högst keep finns kvar (pre-reset räknas inte)."""
+    keep = BACKUP_KEEP if keep is None else keep
+    backups = [path for path in list_backups(backup_dir)
+               if not os.path.splitext(path)[0].endswith(PRE_RESET_SUFFIX)]
+    for path in backups[:max(len(backups) - keep, 0)]:
+        os.remove(path)
+
+
+def _acquire_scheduler_lock():
+    """Låset som gör en process till den som tar schemalagda backuper, eller None."""
+    if fcntl is None:
+        return True
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    lock_file = open(os.path.join(BACKUP_DIR, ".scheduler.lock"), "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _run_scheduler(interval: int):
+    lock = None
+    while not _scheduler_stop.wait(interval):
+        if lock is None:
+            # En annan serverprocess tar backuperna; försök igen nästa varv
+            lock = _acquire_scheduler_lock()
+            if lock is None:
+                continue
+        try:
+            create_backup("scheduled")
+        except Exception as e:
+            print(f"⚠️  Warning: Scheduled backup failed: {e}")
+
+
+def start_scheduler(interval: Optional[int] = None) -> bool:
+    """Startar schemalagd backup i en bakgrundstråd. Returnerar False om avstängd."""
+    global _scheduler
+    interval = BACKUP_INTERVAL if interval is None else interval
+    if interval <= 0 or (_scheduler is not None and _scheduler.is_alive()):
+        return False
+
+    _scheduler_stop.clear()
+    _scheduler = threading.Thread(target=_run_scheduler, args=(interval,), name="db-backup", daemon=True)
+    _scheduler.start()
+    return True
+
+
+def stop_scheduler():
+    """Stoppar schemalagd backup."""
+    _scheduler_stop.set()
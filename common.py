@@ -4,8 +4,30 @@ Används av alla verify.py-filer.
 """
 import time
 import os
+import json
+import random
+import hashlib
+import atexit
+import contextlib
 import requests
-from typing import Any, Tuple, Callable
+from typing import Any, Tuple, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Spool-fil där resultat ligger tills servern har tagit emot dem. Varje server
+# (update_url + API-nyckel) får en egen fil: .result_spool-<hash>.jsonl
+SPOOL_PATH = os.getenv("RESULT_SPOOL", ".result_spool.jsonl")
+
+
+def spool_path_for(update_url: str, api_key: str, base: str = SPOOL_PATH) -> str:
+    """Spool-fil för en server, så att resultat aldrig skickas till fel server."""
+    digest = hashlib.sha1(f"{update_url}\0{api_key}".encode("utf-8")).hexdigest()[:12]
+    root, ext = os.path.splitext(base)
+    return f"{root}-{digest}{ext}"
 
 
 def time_exec(func: Callable) -> Tuple[Any, int]:
@@ -20,38 +42,261 @@ def time_exec(func: Callable) -> Tuple[Any, int]:
     return result, elapsed_ms
 
 
-def submit_result(user: str, level: int, ms: int, update_url: str, api_key: str):
+class ResultClient:
     """
-    Skickar resultat till servern via POST-request.
-    Hanterar fel gracefully - skriver varning men stoppar inte körningen.
+    Klient för resultatinlämning med beständig HTTP-session och lokal spool.
+    
+    Resultat skrivs först till en spool-fil på disk och skickas sedan i batchar
+    till serverns /update/batch. Vid nätverksfel görs omförsök med slumpad
+    exponentiell backoff, och vid 429 (strypt) väntar klienten så länge som
+    Retry-After anger; det som inte gick fram ligger kvar i spoolen och
+    skickas nästa gång flush() anropas.
+    
+    Flera processer kan dela spoolen: tillägg och omskrivning sker under ett
+    kort fcntl-lås, och flush() tar bara bort de rader den själv läste - det
+    som lagts till under tiden ligger kvar. Bara en process i taget skickar.
+    
+    Ett resultat tas bort ur spoolen först när servern har svarat för just
+    det: sparat, eller avvisat i sitt utfall per resultat. Avvisar servern
+    hela batchen (fel nyckel, tävlingen inte startad, fel URL, 409 när flera
+    tävlingar pågår) ligger allt kvar till nästa flush.
     """
-    try:
-        headers = {
+    
+    def __init__(self, update_url: str, api_key: str, spool_path: Optional[str] = None,
+                 batch_size: int = 200, retries: int = 3, backoff: float = 0.5, timeout: float = 5):
+        self.update_url = update_url
+        self.batch_url = update_url.rstrip("/") + "/batch"
+        self.spool_path = spool_path or spool_path_for(update_url, api_key)
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._pending = len(self._read_spool())
+        
+        # En session återanvänder TCP-anslutningen (keep-alive) mellan anrop
+        self.session = requests.Session()
+        self.session.headers.update({
             "Content-Type": "application/json",
             "X-API-Key": api_key
-        }
-        payload = {
-            "user": user,
-            "level": level,
-            "ms": ms
-        }
+        })
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def submit(self, user: str, level: int, ms: int, flush: bool = False) -> int:
+        """
+        Lägger ett resultat i spoolen. Skickar när batchen är full eller om flush=True.
+        Returnerar antal resultat som skickades till servern.
+        """
+        with self._locked(".lock"):
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"user": user, "level": level, "ms": ms}) + "\n")
+        self._pending += 1
         
-        response = requests.post(update_url, json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
+        if flush or self._pending >= self.batch_size:
+            return self.flush()
+        return 0
+    
+    def pending(self) -> int:
+        """Antal resultat som väntar i spoolen."""
+        return self._pending
+    
+    def flush(self) -> int:
+        """
+        Skickar alla spoolade resultat i batchar.
+        Returnerar antal resultat som servern tog emot (eller avvisade i sitt utfall).
+        """
+        with self._locked(".flush.lock", blocking=False) as acquired:
+            if not acquired:
+                # En annan process skickar redan spoolen
+                return 0
+            return self._flush()
+    
+    def _flush(self) -> int:
+        with self._locked(".lock"):
+            entries, offset = self._read_spool_with_offset()
+        sent = 0
         
-        print(f"✓ Resultat skickat till servern")
-    except requests.exceptions.RequestException as e:
-        print(f"⚠ Varning: Kunde inte skicka resultat till server: {e}")
-        print("   Fortsätter utan att uppdatera leaderboard...")
-
-
-
-
+        while sent < len(entries):
+            batch = entries[sent:sent + self.batch_size]
+            response = self._post_with_retry({"results": batch})
+            if response is None:
+                # Servern går inte att nå - behåll resten till nästa flush
+                break
+            
+            if response.status_code >= 400:
+                # Hela batchen avvisad (401/403/404/409 ...) - inget av resultaten
+                # är felaktigt i sig, så de ligger kvar till nästa flush
+                print(f"⚠ Varning: Servern avvisade batchen: {response.status_code} {response.text[:200]}")
+                break
+            
+            outcomes = self._outcomes(response, len(batch))
+            if outcomes is None:
+                print(f"⚠ Varning: Oväntat svar från servern: {response.status_code} {response.text[:200]}")
+                break
+            for entry, outcome in zip(batch, outcomes):
+                if outcome and "error" in outcome:
+                    # Servern avvisade just detta resultat - omförsök hjälper inte
+                    print(f"⚠ Varning: Resultat för nivå {entry.get('level')} avvisades: {outcome['error']}")
+            sent += len(batch)
+        
+        with self._locked(".lock"):
+            # Behåll det som inte skickades plus det andra lagt till sedan vi läste
+            appended, _ = self._read_spool_with_offset(offset)
+            remaining = entries[sent:] + appended
+            self._write_spool(remaining)
+        self._pending = len(remaining)
+        return sent
+    
+    @staticmethod
+    def _outcomes(response: requests.Response, count: int) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Utfallet per resultat ur svaret, eller None om svaret inte har ett per resultat."""
+        try:
+            outcomes = response.json().get("results")
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(outcomes, list) or len(outcomes) != count:
+            return None
+        return outcomes
+    
+    def close(self):
+        """Försöker skicka det som finns kvar och stänger sessionen."""
+        try:
+            self.flush()
+        finally:
+            self.session.close()
+    
+    def _post_with_retry(self, payload: Dict[str, Any]) -> Optional[requests.Response]:
+        """POST med omförsök. Returnerar None om servern inte kunde nås."""
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(self.batch_url, json=payload, timeout=self.timeout)
+                if response.status_code == 429:
+                    # Strypt - inte ett permanent fel, försök igen när servern säger till
+                    retry_after = self._retry_after(response)
+                elif response.status_code < 500:
+                    return response
+                error = f"HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            
+            if attempt < self.retries:
+                if retry_after is not None:
+                    time.sleep(retry_after)
+                else:
+                    # Full jitter: slumpa väntetiden mellan 0 och exponentiell backoff
+                    time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        
+        print(f"⚠ Varning: Kunde inte nå servern efter {self.retries + 1} försök: {error}")
+        return None
+    
+    def _retry_after(self, response: requests.Response) -> float:
+        """Sekunder enligt Retry-After, annars samma backoff som vid nätverksfel."""
+        try:
+            return max(float(response.headers.get("Retry-After", "")), 0.0)
+        except ValueError:
+            return self.backoff
+    
+    @contextlib.contextmanager
+    def _locked(self, suffix: str, blocking: bool = True):
+        """fcntl-lås på spool-filen + suffix. Ger False om låset var upptaget (blocking=False)."""
+        if fcntl is None:
+            yield True
+            return
+        with open(self.spool_path + suffix, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_spool(self) -> List[Dict[str, Any]]:
+        return self._read_spool_with_offset()[0]
+    
+    def _read_spool_with_offset(self, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Hela rader från byte offset och framåt, samt offset efter sista hela raden."""
+        if not os.path.exists(self.spool_path):
+            return [], 0
+        entries = []
+        with open(self.spool_path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Halvskriven rad - läses nästa gång
+                    break
+                offset += len(raw)
+                try:
+                    line = raw.decode("utf-8").strip()
+                    entry = json.loads(line) if line else None
+                except ValueError:
+                    # Trasig rad (t.ex. efter ett avbrott mitt i en skrivning) - hoppa över
+                    print(f"⚠ Varning: Hoppar över trasig rad i {self.spool_path}: {raw[:80]!r}")
+                    continue
+                if isinstance(entry, dict):
+                    entries.append(entry)
+        return entries, offset
+    
+    def _write_spool(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            if os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+            return
+        # Skriv till temporär fil och byt namn så att spoolen aldrig blir halvskriven
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.spool_path)
 
 
+_clients: Dict[Tuple[str, str], ResultClient] = {}
 
 
+def get_client(update_url: str, api_key: str) -> ResultClient:
+    """
+    Returnerar en delad klient per (update_url, api_key) så att anslutningen
+    återanvänds. De delade klienterna skickar det som återstår när processen avslutas.
+    """
+    key = (update_url, api_key)
+    if key not in _clients:
+        if not _clients:
+            atexit.register(_close_clients)
+        _clients[key] = ResultClient(update_url, api_key)
+    return _clients[key]
 
 
+def _close_clients():
+    for client in _clients.values():
+        try:
+            client.close()
+        except Exception as e:
+            print(f"⚠ Varning: Kunde inte skicka spoolade resultat: {e}")
+            continue
+        remaining = client.pending()
+        if remaining == 0:
+            print(f"✓ Resultat skickade till servern")
+        else:
+            print(f"⚠ Varning: {remaining} resultat väntar i {client.spool_path} och skickas vid nästa försök")
+            print("   Fortsätter utan att uppdatera leaderboard...")
+    _clients.clear()
 
 
+def submit_result(user: str, level: int, ms: int, update_url: str, api_key: str):
+    """
+    Lägger resultatet i den delade klientens spool. Det skickas i batch när
+    batchen är full och annars när processen avslutas, så en körning med
+    många resultat kostar inte ett anrop per resultat. Hanterar fel
+    gracefully - det som inte gick fram ligger kvar i spoolen och skickas
+    vid nästa inlämning.
+    """
+    client = get_client(update_url, api_key)
+    client.submit(user, level, ms)
+    print(f"✓ Resultat sparat - skickas till servern ({client.pending()} väntar)")
@@ -11,6 +11,8 @@ import re
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+import answers
+
 
 def load_competitions(competitions_dir: str = "competitions") -> Dict[str, Dict[str, Any]]:
     """
@@ -124,16 +126,46 @@ def load_competitions(competitions_dir: str = "competitions") -> Dict[str, Dict[
                 "expected_answer": level_config.get("expected_answer", "")
             }
             
+            # Compile the answer matcher once; the optional "answer" object selects how answers
+            # are compared (see answers.py), otherwise input_type decides as before
+            answer_spec = level_config.get("answer")
+            if answer_spec:
+                level["answer"] = answer_spec
+            try:
+                level["matcher"] = answers.compile_matcher(str(level["expected_answer"]), level["input_type"], answer_spec)
+            except (ValueError, TypeError) as e:
+                print(f"⚠️  Warning: Invalid answer spec for level {level_id} in competition {comp_id[:8]}: {e}")
+                level.pop("answer", None)
+                level["matcher"] = answers.compile_matcher(str(level["expected_answer"]), level["input_type"])
+            
             # Handle optional hint field
             hint = level_config.get("hint")
             if hint:
                 level["hint"] = hint
             
-            # Handle input file if specified - store filename for download, don't embed content
+            # Handle optional per-participant input generator: "file.py:function" relative to the
+            # level folder, or {"hook": ..., "options": {...}, "levels": [...]} (see inputs.py)
+            generator = level_config.get("generator")
+            if generator:
+                spec = generator if isinstance(generator, dict) else {"hook": generator}
+                hook_file, _, function = spec.get("hook", "").rpartition(":")
+                hook_path = (level_item / hook_file).resolve()
+                if hook_file and function and hook_path.is_file():
+                    level["generator"] = {
+                        "path": str(hook_path),
+                        "function": function,
+                        "options": spec.get("options", {}),
+                        "levels": [int(answered) for answered in spec.get("levels", [level_id])]
+                    }
+                else:
+                    print(f"⚠️  Warning: Generator '{spec.get('hook')}' not found for level {level_id} in competition {comp_id[:8]}")
+            
+            # Handle input file if specified - store filename for download, don't embed content.
+            # With a generator the file is generated per participant and input_file is only its name.
             input_file = level_config.get("input_file")
             if input_file:
                 input_file_path = level_item / input_file
-                if input_file_path.exists():
+                if input_file_path.exists() or "generator" in level:
                     # Store input_file info for download functionality
                     level["input_file"] = input_file
                     # Remove {{input}} placeholder from description if present
@@ -151,6 +183,12 @@ def load_competitions(competitions_dir: str = "competitions") -> Dict[str, Dict[
             
             competition["levels"][level_id] = level
         
+        # Levels answered from a generated input point at the level whose generator creates it
+        for level_id, level in competition["levels"].items():
+            for answered in level.get("generator", {}).get("levels", []):
+                if answered in competition["levels"]:
+                    competition["levels"][answered]["generated_by"] = level_id
+        
         if not competition["levels"]:
             print(f"⚠️  Warning: No levels found in competition {comp_id[:8]}, skipping")
             continue
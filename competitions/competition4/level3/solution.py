@@ -25,3 +25,4 @@ if __name__ == "__main__":
     
     result = sum_fibonacci_at_indices(indices)
     print(f"\nSum: {result}")  # Expected: 848288
+    print(f"Answer: {result}")
@@ -31,3 +31,4 @@ if __name__ == "__main__":
     # Level 4: Count pairs from F(1) to F(50) where ratio rounds to 1.618
     result = count_golden_ratio_pairs(50)
     print(f"\nTotal pairs that round to 1.618: {result}")  # Expected: 42
+    print(f"Answer: {result}")
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - State-transition and run-length analytics
+
+Works on a decoded signal series (can_dbc.decode_signal, or any times/values
+pair in capture order) with vectorized diff/cumsum/searchsorted operations
+only - no per-frame Python loop, so multi-million-frame logs take
+milliseconds:
+
+    transitions        every value change (from, to, row, time) and counts per pair
+    episodes           maximal runs of one value: start/end time, frames, duration
+    dwell_histogram    histogram of episode durations for one state
+    match_episodes     sorted merge join of two signals' episodes (overlap +- tolerance)
+                       (--check compares it with a brute-force join)
+
+An episode lasts from its first frame until the first frame of the next
+run (or its own last frame at the end of the log).
+
+Usage:
+    dbc = can_dbc.load_dbc('TE_CAN_DBC_V1_3.dbc')
+    log = can_log.load_log('level1/VBG_CAN_Log__1_.log')
+    csm = from_series(can_dbc.decode_signal(log, dbc, 'DblLckSnsrRprtdSts'))
+    truck = from_series(can_dbc.decode_signal(log, dbc, 'DblLckSnsrStsTrck'))
+    undefined = episodes(*csm, state=3)
+    pairs = match_episodes(undefined, episodes(*truck, state=3), tolerance_ms=100)
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+import can_timeline
+
+
+EPISODE = np.dtype([
+    ('value', '<i8'),
+    ('start_row', '<i8'),
+    ('end_row', '<i8'),        # last row of the run (inclusive)
+    ('frames', '<i8'),
+    ('start_ms', '<i8'),
+    ('end_ms', '<i8'),
+    ('duration_ms', '<i8'),
+])
+
+TRANSITION = np.dtype([
+    ('from_value', '<i8'),
+    ('to_value', '<i8'),
+    ('row', '<i8'),            # first row with the new value
+    ('time_ms', '<i8'),
+])
+
+
+def from_series(series):
+    """(times_ms, values, rows) of a can_dbc.SignalSeries, times unwrapped past midnight."""
+    return can_timeline.unwrap_midnight(series.timestamp_ms), np.asarray(series.raw), np.asarray(series.rows)
+
+
+def run_bounds(values):
+    """Start and end (exclusive) index of every run of equal consecutive values."""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(values)]))
+    return starts, ends
+
+
+def run_ids(values):
+    """Run number of every frame (0, 0, 1, 1, 1, 2, ...) via cumsum over changes."""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(([0], np.cumsum(values[1:] != values[:-1])))
+
+
+def transitions(times_ms, values, rows=None):
+    """Every change of value as a TRANSITION array, in capture order."""
+    values = np.asarray(values)
+    rows = np.arange(len(values)) if rows is None else np.asarray(rows)
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    result = np.zeros(len(change), dtype=TRANSITION)
+    result['from_value'] = values[change - 1]
+    result['to_value'] = values[change]
+    result['row'] = rows[change]
+    result['time_ms'] = np.asarray(times_ms)[change]
+    return result
+
+
+def transition_counts(changes):
+    """{(from, to): count} of a TRANSITION array."""
+    if len(changes) == 0:
+        return {}
+    pairs, counts = np.unique(np.stack([changes['from_value'], changes['to_value']], axis=1),
+                              axis=0, return_counts=True)
+    return {(int(a), int(b)): int(n) for (a, b), n in zip(pairs, counts)}
+
+
+def episodes(times_ms, values, rows=None, state=None):
+    """
+    Maximal runs as an EPISODE array, optionally only those of one state.
+    The duration runs to the first frame of the next run; the time column is
+    not strictly monotonic under the MSMS-as-ms rule, so it is clamped at 0.
+    """
+    times_ms = np.asarray(times_ms)
+    values = np.asarray(values)
+    rows = np.arange(len(values)) if rows is None else np.asarray(rows)
+    starts, ends = run_bounds(values)
+
+    result = np.zeros(len(starts), dtype=EPISODE)
+    if len(starts) == 0:
+        return result
+    result['value'] = values[starts]
+    result['start_row'] = rows[starts]
+    result['end_row'] = rows[ends - 1]
+    result['frames'] = ends - starts
+    result['start_ms'] = times_ms[starts]
+    # Ends at the next run's first frame; the last run ends at its own last frame
+    result['end_ms'] = times_ms[np.minimum(ends, len(values) - 1)]
+    result['duration_ms'] = np.maximum(result['end_ms'] - result['start_ms'], 0)
+
+    if state is not None:
+        result = result[result['value'] == state]
+    return result
+
+
+def dwell_histogram(episode_array, bins=10, state=None):
+    """(counts, bin_edges) of episode durations, optionally for one state."""
+    if state is not None:
+        episode_array = episode_array[episode_array['value'] == state]
+    return np.histogram(episode_array['duration_ms'], bins=bins)
+
+
+def dwell_summary(episode_array):
+    """{value: {episodes, frames, total_ms, mean_ms, max_ms}} per state."""
+    summary = {}
+    for value in np.unique(episode_array['value']):
+        selected = episode_array[episode_array['value'] == value]
+        summary[int(value)] = {
+            'episodes': len(selected),
+            'frames': int(selected['frames'].sum()),
+            'total_ms': int(selected['duration_ms'].sum()),
+            'mean_ms': float(selected['duration_ms'].mean()),
+            'max_ms': int(selected['duration_ms'].max()),
+        }
+    return summary
+
+
+def match_episodes(a, b, tolerance_ms=0):
+    """
+    Sorted merge join of two episode arrays: every (i, j) where episode a[i]
+    overlaps b[j] once both are widened by tolerance_ms, i.e.
+    a.start - tol <= b.end and b.start <= a.end + tol. Under the MSMS-as-ms
+    rule starts and ends can step backwards (an episode may even end before
+    it starts), so the binary search runs on monotonic envelopes of b - the
+    running max of its ends and the running min of its starts from the back -
+    and the candidates are then filtered with the exact overlap test.
+
+    Returns (index_a, index_b, lag_ms) with lag = b.start - a.start.
+    """
+    if len(a) == 0 or len(b) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    a_low = a['start_ms'] - tolerance_ms
+    a_high = a['end_ms'] + tolerance_ms
+    b_ends = np.maximum.accumulate(b['end_ms'])
+    b_starts = np.minimum.accumulate(b['start_ms'][::-1])[::-1]
+    low = np.searchsorted(b_ends, a_low, 'left')
+    high = np.searchsorted(b_starts, a_high, 'right')
+    counts = np.maximum(high - low, 0)
+
+    index_a = np.repeat(np.arange(len(a)), counts)
+    # Offsets within each a's range: 0, 1, ... counts-1
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    index_b = np.repeat(low, counts) + offsets
+    overlap = (b['end_ms'][index_b] >= a_low[index_a]) & (b['start_ms'][index_b] <= a_high[index_a])
+    index_a, index_b = index_a[overlap], index_b[overlap]
+    return index_a, index_b, b['start_ms'][index_b] - a['start_ms'][index_a]
+
+
+def match_episodes_brute_force(a, b, tolerance_ms=0):
+    """Reference for match_episodes: the same overlap test over all len(a) x len(b) pairs."""
+    overlap = ((b['end_ms'][None, :] >= a['start_ms'][:, None] - tolerance_ms) &
+               (b['start_ms'][None, :] <= a['end_ms'][:, None] + tolerance_ms))
+    index_a, index_b = np.nonzero(overlap)
+    return index_a, index_b, b['start_ms'][index_b] - a['start_ms'][index_a]
+
+
+def jittered_episodes(count, seed=0, jitter_ms=5000):
+    """Random back-to-back episodes whose clock steps back by up to jitter_ms, as under the MSMS rule."""
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.integers(0, 20000, count + 1)) - rng.integers(0, jitter_ms, count + 1)
+    values = np.arange(count + 1) % 4
+    return episodes(times, values)
+
+
+def check_matches(pairs, tolerances=(0, 100, 1000), seeds=range(20)):
+    """
+    Compare match_episodes with the brute-force join on the given
+    (a, b) episode arrays and on jittered random ones. Returns mismatches.
+    """
+    cases = list(pairs) + [(jittered_episodes(300, seed), jittered_episodes(200, seed + 1000)) for seed in seeds]
+    failures = []
+    for number, (a, b) in enumerate(cases):
+        for tolerance in tolerances:
+            fast = match_episodes(a, b, tolerance)
+            slow = match_episodes_brute_force(a, b, tolerance)
+            if not all(np.array_equal(x, y) for x, y in zip(fast, slow)):
+                failures.append((number, tolerance))
+    return failures
+
+
+def correlation_summary(a, b, tolerance_ms=0):
+    """How many episodes of a and b coincide, and the typical lag between them."""
+    index_a, index_b, lags = match_episodes(a, b, tolerance_ms)
+    return {
+        'episodes_a': len(a),
+        'episodes_b': len(b),
+        'matched_a': len(np.unique(index_a)),
+        'matched_b': len(np.unique(index_b)),
+        'median_lag_ms': float(np.median(lags)) if len(lags) else None,
+    }
+
+
+def main():
+    import can_dbc
+    import can_log
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    log_file = args[0] if args else os.path.join(base_dir, 'level1', 'VBG_CAN_Log__1_.log')
+    dbc = can_dbc.load_dbc(os.path.join(base_dir, 'TE_CAN_DBC_V1_3.dbc'))
+    log = can_log.load_log(log_file)
+
+    start = time.perf_counter()
+    csm_series = can_dbc.decode_signal(log, dbc, 'DblLckSnsrRprtdSts')
+    truck_series = can_dbc.decode_signal(log, dbc, 'DblLckSnsrStsTrck')
+    csm, truck = from_series(csm_series), from_series(truck_series)
+    csm_changes = transition_counts(transitions(*csm))
+    csm_episodes, truck_episodes = episodes(*csm), episodes(*truck)
+    csm_undefined = csm_episodes[csm_episodes['value'] == 3]
+    truck_undefined = truck_episodes[truck_episodes['value'] == 3]
+    correlation = correlation_summary(csm_undefined, truck_undefined, tolerance_ms=1000)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    names = csm_series.signal.choices
+    print(f"CSM (0xCF06523) transitions:")
+    for (a, b), count in sorted(csm_changes.items()):
+        print(f"  {names.get(a, a)} -> {names.get(b, b)}: {count}")
+    for label, array, series in (("CSM", csm_episodes, csm_series), ("Truck", truck_episodes, truck_series)):
+        print(f"\n{label} episodes per state:")
+        for value, stats in dwell_summary(array).items():
+            print(f"  {series.signal.choices.get(value, value):<12} {stats['episodes']:>4} episodes "
+                  f"{stats['frames']:>5} frames  mean {stats['mean_ms']:.0f} ms  max {stats['max_ms']} ms")
+    counts, edges = dwell_histogram(csm_undefined, bins=5)
+    print("\nCSM Undefined dwell time histogram:")
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        print(f"  {low:>8.0f} - {high:>8.0f} ms: {count}")
+    print(f"\nUndefined episodes CSM vs truck (±1000 ms): {correlation}")
+    print(f"(analysed in {elapsed:.1f} ms)")
+
+    if '--check' in sys.argv:
+        failures = check_matches([(csm_episodes, truck_episodes), (csm_undefined, truck_undefined)])
+        print(f"\nmatch_episodes vs brute force: {'OK' if not failures else f'MISMATCH {failures}'}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
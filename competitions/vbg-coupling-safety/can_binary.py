@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Compact binary CAN record format
+
+A .canb file is a small header followed by fixed-width 19-byte records
+(vs ~59 bytes per BUSMASTER text line), readable without any parsing:
+
+    header   8 bytes  magic b'VBGCANB1'
+             4 bytes  little-endian u32 length of the JSON metadata
+             JSON     start date, source file, BUSMASTER header lines, ...
+             padding  zero bytes up to a multiple of 64
+    records  timestamp_ms u32 | can_id u32 | channel u8 | flags u8 | dlc u8 | data 8 x u8
+
+timestamp_ms follows the repo rule (HH:MM:SS:MSMS, last field as ms);
+flags holds can_log.FLAG_EXTENDED / FLAG_REMOTE plus FLAG_TX for Tx frames.
+The reader maps the records with np.memmap as a structured array, and
+can_log.load_log() accepts .canb files directly, so every tool works on
+either format.
+
+Usage:
+    python can_binary.py convert level1/VBG_CAN_Log__1_.log      # -> VBG_CAN_Log__1_.canb
+    python can_binary.py info level1/VBG_CAN_Log__1_.canb
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+from itertools import islice
+
+import numpy as np
+
+import can_log
+
+
+MAGIC = b'VBGCANB1'
+FORMAT_VERSION = 1
+HEADER_ALIGN = 64
+
+# Direction is folded into the flags byte next to the can_log frame-type flags
+FLAG_TX = 0x04
+
+RECORD = np.dtype([
+    ('timestamp_ms', '<u4'),
+    ('can_id', '<u4'),
+    ('channel', 'u1'),
+    ('flags', 'u1'),
+    ('dlc', 'u1'),
+    ('data', 'u1', (8,)),
+])
+
+# Text lines converted per chunk
+CONVERT_LINES = 1 << 16
+
+
+def is_binary(path):
+    """True if the file starts with the .canb magic."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def to_records(columns):
+    """can_log column arrays -> RECORD array."""
+    records = np.zeros(len(columns['can_id']), dtype=RECORD)
+    records['timestamp_ms'] = columns['timestamp_ms']
+    records['can_id'] = columns['can_id']
+    records['channel'] = columns['channel']
+    records['flags'] = columns['flags'] | np.where(columns['direction'] == can_log.DIRECTIONS[b'Tx'], FLAG_TX, 0)
+    records['dlc'] = columns['dlc']
+    records['data'] = columns['data']
+    return records
+
+
+def to_columns(records):
+    """RECORD array -> can_log column arrays (views where the dtype allows)."""
+    return {
+        'timestamp_ms': records['timestamp_ms'].astype(np.int64),
+        'can_id': records['can_id'],
+        'direction': ((records['flags'] & FLAG_TX) != 0).astype(np.uint8),
+        'channel': records['channel'],
+        'flags': records['flags'] & ~np.uint8(FLAG_TX),
+        'dlc': records['dlc'],
+        'data': records['data'],
+    }
+
+
+def _encode_header(metadata):
+    payload = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    header = MAGIC + struct.pack('<I', len(payload)) + payload
+    return header + b'\0' * (-len(header) % HEADER_ALIGN)
+
+
+def read_metadata(path):
+    """Return (metadata, data_offset) of a .canb file."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a .canb file")
+        (length,) = struct.unpack('<I', f.read(4))
+        metadata = json.loads(f.read(length).decode('utf-8'))
+    header_size = len(MAGIC) + 4 + length
+    return metadata, header_size + (-header_size % HEADER_ALIGN)
+
+
+def convert(log_file, out_path=None):
+    """
+    Stream a BUSMASTER text log into a .canb file, CONVERT_LINES lines at a
+    time. Returns the output path.
+    """
+    out_path = out_path or os.path.splitext(log_file)[0] + '.canb'
+    header = can_log.read_header(log_file)
+    start = next((line[len('START DATE AND TIME'):].strip() for line in header
+                  if line.startswith('START DATE AND TIME')), None)
+    metadata = {
+        'version': FORMAT_VERSION,
+        'source': os.path.basename(log_file),
+        'start_datetime': start,
+        'header': header,
+        'record_size': RECORD.itemsize,
+    }
+
+    tmp_path = out_path + '.tmp'
+    with open(log_file, 'rb') as src, open(tmp_path, 'wb') as dst:
+        dst.write(_encode_header(metadata))
+        while True:
+            lines = list(islice(src, CONVERT_LINES))
+            if not lines:
+                break
+            dst.write(to_records(can_log.parse_lines(lines)).tobytes())
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def open_records(path):
+    """Memory-map the records of a .canb file as a RECORD structured array."""
+    metadata, offset = read_metadata(path)
+    count = (os.path.getsize(path) - offset) // RECORD.itemsize
+    if count == 0:
+        return metadata, np.zeros(0, dtype=RECORD)
+    return metadata, np.memmap(path, dtype=RECORD, mode='r', offset=offset, shape=(count,))
+
+
+def load_binary(path):
+    """A .canb file as a can_log.CanLog."""
+    metadata, records = open_records(path)
+    return can_log.CanLog(to_columns(records), source=path, header=metadata.get('header'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and inspect compact binary CAN logs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert_parser = commands.add_parser('convert', help="BUSMASTER text -> .canb")
+    convert_parser.add_argument('log')
+    convert_parser.add_argument('-o', '--output')
+    info_parser = commands.add_parser('info', help="Show header and record count")
+    info_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        start = time.perf_counter()
+        out_path = convert(args.log, args.output)
+        elapsed = time.perf_counter() - start
+        text_size, binary_size = os.path.getsize(args.log), os.path.getsize(out_path)
+        print(f"{args.log} ({text_size / (1 << 20):.1f} MB) -> {out_path} ({binary_size / (1 << 20):.1f} MB, "
+              f"{binary_size / text_size:.0%}) in {elapsed:.2f} s")
+        return
+
+    metadata, records = open_records(args.path)
+    print(f"Source:   {metadata.get('source')}")
+    print(f"Started:  {metadata.get('start_datetime')}")
+    print(f"Records:  {len(records):,} x {RECORD.itemsize} bytes")
+    if len(records):
+        print(f"Time:     {int(records['timestamp_ms'].min()):,} - {int(records['timestamp_ms'].max()):,} ms")
+
+
+if __name__ == '__main__':
+    main()
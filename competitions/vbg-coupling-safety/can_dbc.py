@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - DBC parser and vectorized signal decoder
+
+Parses a DBC file (BO_, SG_, VAL_, VAL_TABLE_, SIG_VALTYPE_, CM_) into a
+message/signal index and decodes any signal for all frames of its message
+in one vectorized operation over the N x 8 byte matrix from can_log:
+
+    - Intel (@1) and Motorola (@0) bit order
+    - signed (-) and unsigned (+) integers, IEEE float/double signals
+    - scale/offset to physical values
+    - value tables (VAL_) mapped to names
+
+Usage:
+    dbc = load_dbc('TE_CAN_DBC_V1_3.dbc')
+    log = can_log.load_log('level1/VBG_CAN_Log__1_.log')
+    series = decode_signal(log, dbc, 'DblLckSnsrRprtdSts')
+    undefined = int((series.raw == 3).sum())
+    names = series.labels()          # array of 'Locked', 'Undefined', ...
+"""
+
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+
+# DBC frame ids carry bit 31 as the "extended id" marker
+EXTENDED_ID_FLAG = 0x80000000
+CAN_ID_MASK = 0x1FFFFFFF
+
+_BO_RE = re.compile(r'^BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)\s+(\w+)')
+_SG_RE = re.compile(
+    r'^SG_\s+(\w+)\s*(M|m\d+)?\s*:\s*(\d+)\|(\d+)@([01])([+-])\s*'
+    r'\(([^,]+),([^)]+)\)\s*\[([^|]*)\|([^\]]*)\]\s*"([^"]*)"\s*(.*)$'
+)
+_VAL_RE = re.compile(r'^VAL_\s+(\d+)\s+(\w+)\s+(.*);')
+_VAL_TABLE_RE = re.compile(r'^VAL_TABLE_\s+(\w+)\s+(.*);')
+_VALTYPE_RE = re.compile(r'^SIG_VALTYPE_\s+(\d+)\s+(\w+)\s*:\s*([12])\s*;')
+_CM_RE = re.compile(r'CM_\s+(?:(BO_|SG_)\s+(\d+)\s+(?:(\w+)\s+)?)?"((?:[^"\\]|\\.)*)"\s*;', re.DOTALL)
+_CHOICE_RE = re.compile(r'(-?\d+)\s+"((?:[^"\\]|\\.)*)"')
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and 'e' not in text.lower() and '.' not in text else value
+
+
+class Signal:
+    """One SG_ entry with its bit layout, scaling and value table."""
+
+    def __init__(self, name, start_bit, length, little_endian, signed, factor, offset,
+                 minimum, maximum, unit, receivers, multiplex=None):
+        self.name = name
+        self.start_bit = start_bit
+        self.length = length
+        self.little_endian = little_endian
+        self.signed = signed
+        self.factor = factor
+        self.offset = offset
+        self.minimum = minimum
+        self.maximum = maximum
+        self.unit = unit
+        self.receivers = receivers
+        self.multiplex = multiplex
+        self.value_type = 'int'  # 'int', 'float' or 'double' (SIG_VALTYPE_)
+        self.choices = {}
+        self.comment = ''
+
+    def __repr__(self):
+        order = 'intel' if self.little_endian else 'motorola'
+        return f'<Signal {self.name} {self.start_bit}|{self.length} {order}>'
+
+    @property
+    def lsb(self):
+        """
+        Position of the signal's least significant bit when the 8 payload
+        bytes are read as one 64-bit integer - little-endian for Intel,
+        big-endian for Motorola (whose DBC start bit is the MSB).
+        """
+        if self.little_endian:
+            return self.start_bit
+        msb = (7 - self.start_bit // 8) * 8 + self.start_bit % 8
+        return msb - self.length + 1
+
+    def decode_raw(self, data):
+        """Raw integer values of this signal for every row of an N x 8 uint8 matrix."""
+        data = np.ascontiguousarray(data, dtype=np.uint8).reshape(-1, 8)
+        words = data.view('<u8' if self.little_endian else '>u8').ravel()
+        mask = np.uint64((1 << self.length) - 1)
+        raw = (words >> np.uint64(self.lsb)) & mask
+
+        if self.value_type == 'float':
+            return raw.astype(np.uint32).view(np.float32)
+        if self.value_type == 'double':
+            return raw.view(np.float64)
+        if self.signed:
+            if self.length == 64:
+                return raw.view(np.int64)
+            sign_bit = np.uint64(1 << (self.length - 1))
+            raw = raw.astype(np.int64)
+            return np.where(raw & np.int64(sign_bit), raw - np.int64(1 << self.length), raw)
+        return raw
+
+    def scale(self, raw):
+        """Apply factor/offset. Integer signals with factor 1 and offset 0 stay integers."""
+        # TE_CAN_DBC_V1_3 declares DblLckSnsrRprtdSts with factor 0, which would zero
+        # every value; treat a zero factor as an unscaled signal.
+        factor = self.factor or 1
+        if factor == 1 and self.offset == 0:
+            return raw
+        return raw * float(factor) + float(self.offset)
+
+    def decode(self, data):
+        """Physical values for every row of an N x 8 uint8 matrix."""
+        return self.scale(self.decode_raw(data))
+
+    def labels(self, raw):
+        """Map raw values to value-table names (numbers without a name stay as text)."""
+        raw = np.asarray(raw)
+        if raw.size == 0:
+            return np.array([], dtype=object)
+        unique, inverse = np.unique(raw, return_inverse=True)
+        names = np.array([self.choices.get(int(value), str(value)) for value in unique], dtype=object)
+        return names[inverse]
+
+
+class Message:
+    """One BO_ entry."""
+
+    def __init__(self, frame_id, name, dlc, sender):
+        self.frame_id = frame_id
+        self.name = name
+        self.dlc = dlc
+        self.sender = sender
+        self.signals = {}
+        self.comment = ''
+
+    def __repr__(self):
+        return f'<Message {self.name} 0x{self.can_id:X}>'
+
+    @property
+    def is_extended(self):
+        return bool(self.frame_id & EXTENDED_ID_FLAG)
+
+    @property
+    def can_id(self):
+        """The id as it appears on the bus and in the log (0xCF06523)."""
+        return self.frame_id & CAN_ID_MASK
+
+
+class Database:
+    """Message/signal index of a DBC file."""
+
+    def __init__(self):
+        self.version = ''
+        self.nodes = []
+        self.messages = {}        # name -> Message
+        self.value_tables = {}    # VAL_TABLE_ name -> {value: name}
+        self._by_id = {}
+        self._signals = {}
+
+    def add_message(self, message):
+        self.messages[message.name] = message
+        self._by_id[message.frame_id] = message
+        self._by_id[message.can_id] = message
+
+    def message(self, key):
+        """Look up a message by name, DBC frame id or bus CAN id."""
+        if isinstance(key, str):
+            return self.messages[key]
+        return self._by_id[key]
+
+    def signal(self, name, message=None):
+        """Return (message, signal) for a signal name; pass message if the name is ambiguous."""
+        if message is not None:
+            message = self.message(message)
+            return message, message.signals[name]
+        matches = self._signals.get(name, [])
+        if not matches:
+            raise KeyError(f"Unknown signal '{name}'")
+        if len(matches) > 1:
+            raise KeyError(f"Signal '{name}' exists in {[m.name for m in matches]}, pass message=")
+        return matches[0], matches[0].signals[name]
+
+    def _index_signals(self):
+        self._signals = {}
+        for message in self.messages.values():
+            for name in message.signals:
+                self._signals.setdefault(name, []).append(message)
+
+
+def _parse_choices(text):
+    return {int(value): name for value, name in _CHOICE_RE.findall(text)}
+
+
+def parse_dbc(text):
+    """Parse DBC text into a Database."""
+    database = Database()
+    text = text.replace('\r\n', '\n')
+
+    # Comments may span lines; pull them out before the line-based pass
+    comments = _CM_RE.findall(text)
+    text = _CM_RE.sub('', text)
+
+    message = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            message = None
+            continue
+
+        if line.startswith('VERSION'):
+            database.version = line.split('"')[1] if '"' in line else ''
+        elif line.startswith('BU_:'):
+            database.nodes = line[4:].split()
+        elif line.startswith('BO_ '):
+            match = _BO_RE.match(line)
+            if match:
+                message = Message(int(match.group(1)), match.group(2), int(match.group(3)), match.group(4))
+                database.add_message(message)
+        elif line.startswith('SG_ ') and message is not None:
+            match = _SG_RE.match(line)
+            if not match:
+                continue
+            (name, multiplex, start, length, order, sign, factor, offset,
+             minimum, maximum, unit, receivers) = match.groups()
+            message.signals[name] = Signal(
+                name, int(start), int(length), order == '1', sign == '-',
+                _number(factor), _number(offset), _number(minimum or '0'), _number(maximum or '0'),
+                unit, [r for r in receivers.replace(',', ' ').split() if r], multiplex
+            )
+        elif line.startswith('VAL_TABLE_ '):
+            match = _VAL_TABLE_RE.match(line)
+            if match:
+                database.value_tables[match.group(1)] = _parse_choices(match.group(2))
+        elif line.startswith('VAL_ '):
+            match = _VAL_RE.match(line)
+            if match and int(match.group(1)) in database._by_id:
+                signals = database.message(int(match.group(1))).signals
+                if match.group(2) in signals:
+                    signals[match.group(2)].choices = _parse_choices(match.group(3))
+        elif line.startswith('SIG_VALTYPE_ '):
+            match = _VALTYPE_RE.match(line)
+            if match and int(match.group(1)) in database._by_id:
+                signals = database.message(int(match.group(1))).signals
+                if match.group(2) in signals:
+                    signals[match.group(2)].value_type = 'float' if match.group(3) == '1' else 'double'
+
+    for kind, frame_id, signal_name, comment in comments:
+        if not kind or int(frame_id) not in database._by_id:
+            continue
+        target = database.message(int(frame_id))
+        if kind == 'SG_':
+            target = target.signals.get(signal_name)
+        if target is not None:
+            target.comment = comment
+
+    database._index_signals()
+    return database
+
+
+def load_dbc(path):
+    """Parse a DBC file (DBC files are usually cp1252, not UTF-8)."""
+    with open(path, 'r', encoding='cp1252') as f:
+        return parse_dbc(f.read())
+
+
+class SignalSeries:
+    """A signal decoded for every frame of its message in a log."""
+
+    def __init__(self, message, signal, rows, timestamp_ms, raw):
+        self.message = message
+        self.signal = signal
+        self.rows = rows
+        self.timestamp_ms = timestamp_ms
+        self.raw = raw
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def values(self):
+        """Physical values (scale/offset applied)."""
+        return self.signal.scale(self.raw)
+
+    def labels(self):
+        """Value-table names for every frame."""
+        return self.signal.labels(self.raw)
+
+    def counts(self):
+        """{name: count} over the value table (only values that occur)."""
+        unique, counts = np.unique(self.raw, return_counts=True)
+        return {self.signal.choices.get(int(v), str(v)): int(c) for v, c in zip(unique, counts)}
+
+
+def decode_signal(log, database, signal_name, message=None):
+    """Decode one signal for all frames of its message in a can_log.CanLog."""
+    message, signal = database.signal(signal_name, message)
+    rows = log.frames(message.can_id)
+    raw = signal.decode_raw(log.data[rows])
+    return SignalSeries(message, signal, rows, log.timestamp_ms[rows], raw)
+
+
+def main():
+    import can_log
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    database = load_dbc(os.path.join(base_dir, 'TE_CAN_DBC_V1_3.dbc'))
+
+    if len(sys.argv) < 2:
+        print(f"DBC version: {database.version}")
+        for message in sorted(database.messages.values(), key=lambda m: m.can_id):
+            print(f"0x{message.can_id:X} {message.name} ({message.sender})")
+            for signal in message.signals.values():
+                order = 'Intel' if signal.little_endian else 'Motorola'
+                print(f"    {signal.name}: bits {signal.start_bit}|{signal.length} {order}"
+                      f"{' signed' if signal.signed else ''} {signal.choices or ''}")
+        return
+
+    log_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_dir, 'level1', 'VBG_CAN_Log__1_.log')
+    log = can_log.load_log(log_file)
+    start = time.perf_counter()
+    series = decode_signal(log, database, sys.argv[1])
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{series.message.name}.{series.signal.name}: {len(series):,} frames decoded in {elapsed:.2f} ms")
+    for name, count in series.counts().items():
+        print(f"  {name}: {count:,}")
+
+
+if __name__ == '__main__':
+    main()
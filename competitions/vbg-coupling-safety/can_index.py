@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Per-CAN-id offset index
+
+Records, for every CAN id in a BUSMASTER log, the byte offsets and frame
+row numbers of its frames plus the first/last timestamp (in log order, as
+can_log.id_summary). The index is
+persisted next to the log in a hidden ".<log name>.index" directory:
+
+    ids.npy      one record per CAN id: can_id, start, count, first_ms, last_ms
+    offsets.npy  int64 byte offset of each frame's line, grouped by id
+    rows.npy     int64 frame row number (same numbering as can_log), grouped by id
+    meta.json    source mtime/size, so a changed log rebuilds the index
+
+Opening an index only reads the small ids table; offsets and rows are
+memory-mapped on first use and a look-up slices just that id's records,
+so filtering one id costs O(matches) rather than O(log size). The frames
+themselves are read straight from the memory-mapped log at their offsets.
+
+Usage:
+    index = load_index('level1/VBG_CAN_Log__1_.log')
+    index.count(0xCF06523)                # 4433
+    index.time_range(0xCF06523)           # (first_ms, last_ms)
+    for frame in index.frames(0xCF06523): # parsed like can_log.parse_line
+        ...
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+
+import numpy as np
+
+import can_log
+
+
+# Bump when the index layout or parsing rules change
+INDEX_VERSION = 2
+
+ID_DTYPE = np.dtype([
+    ('can_id', '<u4'),
+    ('start', '<i8'),
+    ('count', '<i8'),
+    ('first_ms', '<i8'),
+    ('last_ms', '<i8'),
+])
+
+
+def index_dir(log_file):
+    """Directory holding the index for a log file."""
+    directory, name = os.path.split(os.path.abspath(log_file))
+    return os.path.join(directory, f'.{name}.index')
+
+
+def _source_stamp(log_file):
+    stat = os.stat(log_file)
+    return {'version': INDEX_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _index_is_valid(log_file, directory):
+    meta_path = os.path.join(directory, 'meta.json')
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if {k: meta.get(k) for k in ('version', 'mtime_ns', 'size')} != _source_stamp(log_file):
+        return False
+    return all(os.path.exists(os.path.join(directory, name)) for name in ('ids.npy', 'offsets.npy', 'rows.npy'))
+
+
+def scan_offsets(log_file):
+    """
+    One pass over the log returning (can_ids, offsets, timestamps_ms) for
+    every frame line, in log order. Only the id and timestamp are parsed, but
+    lines are accepted exactly as can_log.parse_line accepts them, so row
+    numbers match can_log's.
+    """
+    can_ids = array('I')
+    offsets = array('q')
+    timestamps = array('q')
+
+    offset = 0
+    with open(log_file, 'rb') as f:
+        for line in f:
+            if not line.startswith(b'***'):
+                parts = line.split(None, 5)
+                if len(parts) >= 6 and parts[1] in can_log.DIRECTIONS and parts[3].startswith(b'0x'):
+                    can_ids.append(int(parts[3], 16))
+                    offsets.append(offset)
+                    timestamps.append(can_log.parse_timestamp(parts[0]))
+            offset += len(line)
+
+    return (np.frombuffer(can_ids, dtype=np.uint32),
+            np.frombuffer(offsets, dtype=np.int64),
+            np.frombuffer(timestamps, dtype=np.int64))
+
+
+def build_index(log_file):
+    """Build and persist the index for a log (meta.json written last)."""
+    directory = index_dir(log_file)
+    with can_log.cache_lock(directory):
+        _build_index_locked(log_file, directory)
+
+
+def _build_index_locked(log_file, directory):
+    can_ids, offsets, timestamps = scan_offsets(log_file)
+
+    # Stable sort keeps each id's frames in log order
+    order = np.argsort(can_ids, kind='stable')
+    unique, starts, counts = np.unique(can_ids[order], return_index=True, return_counts=True)
+
+    ids = np.zeros(len(unique), dtype=ID_DTYPE)
+    ids['can_id'] = unique
+    ids['start'] = starts
+    ids['count'] = counts
+    if len(unique):
+        sorted_ts = timestamps[order]
+        ids['first_ms'] = sorted_ts[starts]
+        ids['last_ms'] = sorted_ts[starts + counts - 1]
+
+    meta_path = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    suffix = f'{os.getpid()}.tmp'
+    for name, values in (('ids', ids), ('offsets', offsets[order]), ('rows', order.astype(np.int64))):
+        tmp_path = os.path.join(directory, f'{name}.{suffix}.npy')
+        np.save(tmp_path, values)
+        os.replace(tmp_path, os.path.join(directory, f'{name}.npy'))
+
+    meta = _source_stamp(log_file)
+    meta['frames'] = int(len(can_ids))
+    with open(f'{meta_path}.{suffix}', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f'{meta_path}.{suffix}', meta_path)
+
+
+class CanIndex:
+    """Lazily loaded per-CAN-id index of one log file."""
+
+    def __init__(self, log_file, directory):
+        self.log_file = log_file
+        self.directory = directory
+        self.ids = np.load(os.path.join(directory, 'ids.npy'))
+        self._entries = {int(entry['can_id']): entry for entry in self.ids}
+        # Memory-mapped now so all three files come from the same build
+        self._offsets = self._load('offsets')
+        self._rows = self._load('rows')
+        self._log_map = None
+
+    def __contains__(self, can_id):
+        return can_id in self._entries
+
+    def __len__(self):
+        return int(self.ids['count'].sum())
+
+    @property
+    def can_ids(self):
+        return [int(can_id) for can_id in self.ids['can_id']]
+
+    def _load(self, name):
+        return np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+
+    def _slice(self, column, can_id):
+        entry = self._entries.get(can_id)
+        if entry is None:
+            return np.zeros(0, dtype=np.int64)
+        start = int(entry['start'])
+        return column[start:start + int(entry['count'])]
+
+    def count(self, can_id):
+        """Number of frames with this id (0 if it never occurs)."""
+        entry = self._entries.get(can_id)
+        return int(entry['count']) if entry is not None else 0
+
+    def time_range(self, can_id):
+        """(first_ms, last_ms) of this id's frames, or None."""
+        entry = self._entries.get(can_id)
+        if entry is None:
+            return None
+        return int(entry['first_ms']), int(entry['last_ms'])
+
+    def offsets(self, can_id):
+        """Byte offsets of this id's lines in the log, in log order."""
+        return self._slice(self._offsets, can_id)
+
+    def rows(self, can_id):
+        """Frame row numbers of this id - usable directly on a can_log.CanLog."""
+        return self._slice(self._rows, can_id)
+
+    def lines(self, can_id):
+        """Yield this id's raw log lines (bytes), read only at their offsets."""
+        if self._log_map is None:
+            with open(self.log_file, 'rb') as f:
+                self._log_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        log_map = self._log_map
+        for offset in self.offsets(can_id):
+            offset = int(offset)
+            end = log_map.find(b'\n', offset)
+            yield log_map[offset:end if end != -1 else len(log_map)]
+
+    def frames(self, can_id):
+        """Yield this id's frames parsed like can_log.parse_line."""
+        for line in self.lines(can_id):
+            frame = can_log.parse_line(line)
+            if frame is not None:
+                yield frame
+
+    def close(self):
+        if self._log_map is not None:
+            self._log_map.close()
+            self._log_map = None
+
+
+def load_index(log_file, rebuild=True):
+    """
+    Open the index of a log, building it first if missing or stale
+    (with rebuild=False a missing or stale index raises FileNotFoundError).
+    """
+    directory = index_dir(log_file)
+    if not _index_is_valid(log_file, directory):
+        if not rebuild:
+            raise FileNotFoundError(f"No up-to-date index for {log_file}")
+        with can_log.cache_lock(directory):
+            # Another process may have built it while we waited for the lock
+            if not _index_is_valid(log_file, directory):
+                _build_index_locked(log_file, directory)
+    with can_log.cache_lock(directory, shared=True):
+        return CanIndex(log_file, directory)
+
+
+def main():
+    log_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'level1', 'VBG_CAN_Log__1_.log')
+
+    index = load_index(log_file)
+    print(f"Log:    {log_file}")
+    print(f"Index:  {index.directory}")
+    print(f"Frames: {len(index):,} in {len(index.ids)} CAN ids\n")
+    for entry in sorted(index.ids, key=lambda e: -int(e['count'])):
+        print(f"  0x{int(entry['can_id']):X}: {int(entry['count']):>6,} frames  "
+              f"{int(entry['first_ms']):,} - {int(entry['last_ms']):,} ms")
+
+
+if __name__ == '__main__':
+    main()
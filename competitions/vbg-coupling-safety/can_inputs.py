@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - per-participant CAN logs
+
+Generator hook for the platform's per-participant inputs (inputs.py). Every
+participant gets their own synthetic log from can_synth, streamed straight
+to disk, and the answers to all five levels are derived from it. Enable it
+in level1/config.json:
+
+    "input_file": "VBG_CAN_Log.log",
+    "generator": {
+        "hook": "../can_inputs.py:generate",
+        "options": {"scale": 1},
+        "levels": [1, 2, 3, 4, 5]
+    }
+
+The traffic model is learned from the sample log once per process.
+
+Usage (try a seed without the server):
+    python can_inputs.py /tmp/vbg_alice.log --seed 42 --scale 2
+"""
+
+import argparse
+import os
+import threading
+
+import can_synth
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = can_synth.learn()
+        return _model
+
+
+def generate(out_path, seed, scale=1.0):
+    """Stream a synthetic log to out_path and return {level: answer}."""
+    model = _get_model()
+    answers = can_synth.generate(out_path, model, duration_ms=int(model.duration_ms * scale), seed=seed)
+    # The platform caches the answers itself; don't leave them next to the log
+    os.remove(out_path + '.answers.json')
+    return {level: value for level, value in answers['levels'].items() if value is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one participant's CAN log and print the answers")
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scale', type=float, default=1.0, help="Duration as a multiple of the sample log")
+    args = parser.parse_args()
+
+    for level, answer in generate(args.output, args.seed, args.scale).items():
+        print(f"Level {level}: {answer}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Columnar CAN log loader
+
+Parses a BUSMASTER log once into columnar NumPy arrays:
+
+    timestamp_ms  int64    HH:MM:SS:MSMS converted to ms (same rule as level 4)
+    can_id        uint32   CAN id as an integer (0xCF06523 -> 217081123)
+    direction     uint8    0 = Rx, 1 = Tx
+    channel       uint8    bus channel
+    flags         uint8    FLAG_EXTENDED / FLAG_REMOTE from the type column
+    dlc           uint8    data length code
+    data          uint8    N x 8 payload matrix (unused bytes are zero)
+
+The arrays are cached next to the log in a hidden ".<log name>.cache"
+directory as plain .npy files, loaded memory-mapped and invalidated when
+the log's mtime or size changes. Repeat runs skip parsing entirely.
+
+Logs larger than CHUNK_BYTES are split into line-aligned byte ranges
+(after the *** header) and parsed in a process pool; chunks are merged in
+file order, so the result is identical for any number of workers.
+
+Usage:
+    log = load_log('../level1/VBG_CAN_Log__1_.log')
+    rows = log.frames(0xCF06523)
+    undefined = int((log.data[rows, 0] == 0x03).sum())
+"""
+
+import json
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+
+
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+
+DIRECTIONS = {b'Rx': 0, b'Tx': 1}
+
+# Bump when the cache layout or parsing rules change
+CACHE_VERSION = 1
+
+COLUMNS = ('timestamp_ms', 'can_id', 'direction', 'channel', 'flags', 'dlc', 'data')
+
+# Bytes per parse chunk; fixed, so chunk boundaries never depend on the worker count
+CHUNK_BYTES = 16 << 20
+
+
+def parse_timestamp(timestamp):
+    """
+    Parse HH:MM:SS:MSMS (bytes or str) to total milliseconds, exactly like
+    the level 4 solution: the last field is taken as milliseconds.
+    """
+    if isinstance(timestamp, str):
+        timestamp = timestamp.encode('ascii')
+    hours, minutes, seconds, millis = timestamp.split(b':')
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def parse_frame_type(frame_type):
+    """Map the BUSMASTER type column (x, s, xr, sr) to flag bits."""
+    flags = 0
+    if frame_type.startswith(b'x'):
+        flags |= FLAG_EXTENDED
+    if frame_type.endswith(b'r'):
+        flags |= FLAG_REMOTE
+    return flags
+
+
+def parse_line(line):
+    """
+    Parse one BUSMASTER message line (bytes).
+
+    Returns (timestamp_ms, can_id, direction, channel, flags, dlc, payload)
+    with payload as 8 bytes, or None for header and blank lines.
+    """
+    if line.startswith(b'***'):
+        return None
+    parts = line.split()
+    if len(parts) < 6 or parts[1] not in DIRECTIONS or not parts[3].startswith(b'0x'):
+        return None
+
+    dlc = int(parts[5])
+    payload = bytes.fromhex(b''.join(parts[6:6 + dlc]).decode('ascii'))
+    return (
+        parse_timestamp(parts[0]),
+        int(parts[3], 16),
+        DIRECTIONS[parts[1]],
+        int(parts[2]),
+        parse_frame_type(parts[4]),
+        dlc,
+        payload.ljust(8, b'\0')[:8],
+    )
+
+
+def iter_frames(log_file):
+    """Stream parsed frames from a BUSMASTER log without building arrays."""
+    with open(log_file, 'rb') as f:
+        for line in f:
+            frame = parse_line(line)
+            if frame is not None:
+                yield frame
+
+
+def read_header(log_file):
+    """Return the *** header block lines (without the asterisks)."""
+    header = []
+    with open(log_file, 'rb') as f:
+        for line in f:
+            if not line.startswith(b'***'):
+                break
+            header.append(line.strip().strip(b'*').decode('utf-8', 'replace'))
+    return header
+
+
+def parse_lines(lines):
+    """Parse an iterable of byte lines into a dict of column arrays."""
+    timestamps = array('q')
+    can_ids = array('I')
+    directions = array('B')
+    channels = array('B')
+    flags = array('B')
+    dlcs = array('B')
+    data = bytearray()
+
+    for line in lines:
+        frame = parse_line(line)
+        if frame is None:
+            continue
+        timestamps.append(frame[0])
+        can_ids.append(frame[1])
+        directions.append(frame[2])
+        channels.append(frame[3])
+        flags.append(frame[4])
+        dlcs.append(frame[5])
+        data += frame[6]
+
+    return {
+        'timestamp_ms': np.frombuffer(timestamps, dtype=np.int64),
+        'can_id': np.frombuffer(can_ids, dtype=np.uint32),
+        'direction': np.frombuffer(directions, dtype=np.uint8),
+        'channel': np.frombuffer(channels, dtype=np.uint8),
+        'flags': np.frombuffer(flags, dtype=np.uint8),
+        'dlc': np.frombuffer(dlcs, dtype=np.uint8),
+        'data': np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, 8),
+    }
+
+
+def header_end(log_file):
+    """Byte offset of the first line after the *** header block."""
+    offset = 0
+    with open(log_file, 'rb') as f:
+        for line in f:
+            if not line.startswith(b'***'):
+                break
+            offset += len(line)
+    return offset
+
+
+def split_ranges(log_file, chunk_bytes=CHUNK_BYTES):
+    """
+    Split the log after its header into (start, end) byte ranges of about
+    chunk_bytes, each starting and ending on a line boundary.
+    """
+    size = os.path.getsize(log_file)
+    start = header_end(log_file)
+    ranges = []
+    with open(log_file, 'rb') as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                end = size
+            else:
+                # Move the boundary to the end of the line it falls in
+                f.seek(end)
+                f.readline()
+                end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(log_file, start, end):
+    """Parse the lines in one byte range into column arrays."""
+    with open(log_file, 'rb') as f:
+        f.seek(start)
+        return parse_lines(f.read(end - start).splitlines())
+
+
+def _parse_range_job(job):
+    return parse_range(*job)
+
+
+def concat_columns(parts):
+    """Concatenate column dicts in order."""
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+
+def id_summary(columns):
+    """{can_id: (count, first_ms, last_ms)} with first/last in log order."""
+    can_ids = columns['can_id']
+    timestamps = columns['timestamp_ms']
+    unique, first_rows, counts = np.unique(can_ids, return_index=True, return_counts=True)
+    last_rows = len(can_ids) - 1 - np.unique(can_ids[::-1], return_index=True)[1]
+    return {int(can_id): (int(count), int(timestamps[first]), int(timestamps[last]))
+            for can_id, count, first, last in zip(unique, counts, first_rows, last_rows)}
+
+
+def merge_summaries(summaries):
+    """Merge per-chunk id summaries given in file order."""
+    merged = {}
+    for summary in summaries:
+        for can_id, (count, first_ms, last_ms) in summary.items():
+            if can_id in merged:
+                merged[can_id] = (merged[can_id][0] + count, merged[can_id][1], last_ms)
+            else:
+                merged[can_id] = (count, first_ms, last_ms)
+    return merged
+
+
+def parse_log_chunked(log_file, workers=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Parse a log in line-aligned chunks, in parallel when workers != 1.
+    Returns (columns, id_summary) merged in file order.
+    """
+    jobs = [(log_file, start, end) for start, end in split_ranges(log_file, chunk_bytes)]
+    if not jobs:
+        return parse_lines([]), {}
+    if workers == 1 or len(jobs) == 1:
+        parts = [_parse_range_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order, whatever order workers finish in
+            parts = list(pool.map(_parse_range_job, jobs))
+    return concat_columns(parts), merge_summaries(id_summary(part) for part in parts)
+
+
+def parse_log(log_file, workers=None):
+    """
+    Parse a whole BUSMASTER log into column arrays. Logs larger than
+    CHUNK_BYTES are parsed in chunks by `workers` processes (None = all cores).
+    """
+    if workers != 1 and os.path.getsize(log_file) > CHUNK_BYTES:
+        return parse_log_chunked(log_file, workers)[0]
+    with open(log_file, 'rb') as f:
+        return parse_lines(f)
+
+
+def cache_dir(log_file):
+    """Directory holding the .npy cache for a log file."""
+    directory, name = os.path.split(os.path.abspath(log_file))
+    return os.path.join(directory, f'.{name}.cache')
+
+
+def _source_stamp(log_file):
+    stat = os.stat(log_file)
+    return {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _cache_is_valid(log_file, directory):
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if {k: meta.get(k) for k in ('version', 'mtime_ns', 'size')} != _source_stamp(log_file):
+        return False
+    return all(os.path.exists(os.path.join(directory, f'{name}.npy')) for name in COLUMNS)
+
+
+@contextmanager
+def cache_lock(directory, shared=False):
+    """
+    flock on <directory>/.lock. Rebuilds hold it exclusively and readers
+    shared while opening the files, so processes loading the same log in
+    parallel never see each other's half-written cache. A no-op without fcntl.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+def write_cache(log_file, columns):
+    """Write column arrays to the cache directory (meta.json last, so a
+    half-written cache is never considered valid)."""
+    directory = cache_dir(log_file)
+    with cache_lock(directory):
+        _write_cache_locked(log_file, directory, columns)
+
+
+def _write_cache_locked(log_file, directory, columns):
+    meta_path = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    suffix = f'{os.getpid()}.tmp'
+    for name in COLUMNS:
+        tmp_path = os.path.join(directory, f'{name}.{suffix}.npy')
+        np.save(tmp_path, np.ascontiguousarray(columns[name]))
+        os.replace(tmp_path, os.path.join(directory, f'{name}.npy'))
+
+    meta = _source_stamp(log_file)
+    meta['rows'] = int(len(columns['can_id']))
+    meta['header'] = read_header(log_file)
+    with open(f'{meta_path}.{suffix}', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f'{meta_path}.{suffix}', meta_path)
+
+
+class CanLog:
+    """Columnar view of a CAN log. Columns are NumPy arrays (possibly memory-mapped)."""
+
+    def __init__(self, columns, source=None, header=None):
+        self.source = source
+        self.header = header or []
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.can_id)
+
+    def mask(self, *can_ids):
+        """Boolean mask of frames with any of the given CAN ids."""
+        if len(can_ids) == 1:
+            return self.can_id == can_ids[0]
+        return np.isin(self.can_id, np.asarray(can_ids, dtype=np.uint32))
+
+    def frames(self, *can_ids):
+        """Row numbers of frames with any of the given CAN ids, in log order."""
+        return np.flatnonzero(self.mask(*can_ids))
+
+    def start_datetime(self):
+        """The 'START DATE AND TIME' header value, if present."""
+        for line in self.header:
+            if line.startswith('START DATE AND TIME'):
+                return line[len('START DATE AND TIME'):].strip()
+        return None
+
+
+def load_log(log_file, use_cache=True, workers=None):
+    """
+    Load a BUSMASTER log as a CanLog. With use_cache the columns come from
+    the memory-mapped .npy cache, (re)built first if missing or stale.
+    `workers` is passed to parse_log when the log has to be parsed.
+    Compact binary .canb files (can_binary) are memory-mapped as they are.
+    """
+    import can_binary
+    if can_binary.is_binary(log_file):
+        return can_binary.load_binary(log_file)
+
+    if not use_cache:
+        return CanLog(parse_log(log_file, workers), source=log_file, header=read_header(log_file))
+
+    directory = cache_dir(log_file)
+    if not _cache_is_valid(log_file, directory):
+        with cache_lock(directory):
+            # Another process may have built it while we waited for the lock
+            if not _cache_is_valid(log_file, directory):
+                _write_cache_locked(log_file, directory, parse_log(log_file, workers))
+
+    with cache_lock(directory, shared=True):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+    return CanLog(columns, source=log_file, header=meta.get('header'))
+
+
+def benchmark(log_file, workers_list):
+    """Time chunked parsing for each worker count and check the results agree."""
+    size_mb = os.path.getsize(log_file) / (1 << 20)
+    reference = None
+    for workers in workers_list:
+        start = time.perf_counter()
+        columns, summary = parse_log_chunked(log_file, workers)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = (columns, summary)
+        same = summary == reference[1] and all(np.array_equal(columns[name], reference[0][name]) for name in COLUMNS)
+        print(f"  {workers:>2} worker(s): {elapsed:7.2f} s  {size_mb / elapsed:7.1f} MB/s  "
+              f"{len(columns['can_id']):,} frames{'' if same else '  ✗ MISMATCH'}")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    log_file = args[0] if args else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'level1', 'VBG_CAN_Log__1_.log')
+
+    if '--bench' in sys.argv:
+        cores = os.cpu_count() or 1
+        print(f"Chunked parse of {log_file} ({len(split_ranges(log_file))} chunks):")
+        benchmark(log_file, sorted({1, 2, 4, cores} & set(range(1, cores + 1))))
+        return
+
+    log = load_log(log_file)
+    print(f"Log:      {log_file}")
+    print(f"Cache:    {cache_dir(log_file)}")
+    print(f"Frames:   {len(log):,}")
+    print(f"Started:  {log.start_datetime()}")
+    print("\nFrames per CAN id:")
+    ids, counts = np.unique(log.can_id, return_counts=True)
+    for can_id, count in sorted(zip(ids, counts), key=lambda item: -item[1]):
+        print(f"  0x{int(can_id):X}: {int(count):,}")
+
+
+if __name__ == '__main__':
+    main()
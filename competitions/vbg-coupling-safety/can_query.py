@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Single-pass multi-query engine
+
+Analyses are registered as small aggregations - Count, First, Last,
+Histogram - each with an optional CAN id filter and a predicate on the
+frame columns. QueryEngine.run() then makes ONE streaming pass over the
+log and feeds every chunk of frames to every query, so the cost of the
+scan is paid once however many questions are asked.
+
+Chunks are columnar (can_log.CanLog objects of up to CHUNK_ROWS frames):
+taken from the memory-mapped cache when it is valid, otherwise parsed
+straight from the text log, so memory stays bounded either way.
+
+Usage:
+    engine = QueryEngine()
+    engine.add(Count('total'))
+    engine.add(Count('undefined', 0xCF06523, where=byte_eq(0, 0x03)))
+    engine.add(First('first_undefined', 0xCF06523, where=byte_eq(0, 0x03)))
+    results = engine.run('level1/VBG_CAN_Log__1_.log')
+    results['undefined']          # 93
+"""
+
+import os
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+import can_binary
+import can_log
+
+
+# Frames per chunk handed to the queries
+CHUNK_ROWS = 1 << 16
+
+
+def byte_eq(index, value):
+    """Predicate: data byte `index` equals `value`."""
+    return lambda chunk: chunk.data[:, index] == value
+
+
+def any_nonzero(chunk):
+    """Predicate: at least one payload byte is non-zero."""
+    return chunk.data.any(axis=1)
+
+
+def signal_eq(signal, value):
+    """Predicate: a can_dbc Signal decodes to the raw `value`."""
+    return lambda chunk: signal.decode_raw(chunk.data) == value
+
+
+class Query:
+    """
+    Base aggregation. Subclasses implement update(chunk, rows, offset) with
+    `rows` the chunk-local row numbers that passed the filter and `offset`
+    the log row number of the chunk's first frame, and result().
+    """
+
+    def __init__(self, name, *can_ids, where=None):
+        self.name = name
+        self.can_ids = tuple(sorted(set(can_ids)))
+        self.where = where
+
+    def update(self, chunk, rows, offset):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class Count(Query):
+    """Number of matching frames."""
+
+    def __init__(self, name, *can_ids, where=None):
+        super().__init__(name, *can_ids, where=where)
+        self.count = 0
+
+    def update(self, chunk, rows, offset):
+        self.count += len(rows)
+
+    def result(self):
+        return self.count
+
+
+class First(Query):
+    """Timestamp (ms) of the first matching frame, None if there is none. `row` holds its log row."""
+
+    done = False
+
+    def __init__(self, name, *can_ids, where=None):
+        super().__init__(name, *can_ids, where=where)
+        self.row = None
+        self.timestamp_ms = None
+
+    def update(self, chunk, rows, offset):
+        if len(rows):
+            self.row = offset + int(rows[0])
+            self.timestamp_ms = int(chunk.timestamp_ms[rows[0]])
+            self.done = True
+
+    def result(self):
+        return self.timestamp_ms
+
+
+class Last(First):
+    """Timestamp (ms) of the last matching frame, None if there is none."""
+
+    def update(self, chunk, rows, offset):
+        if len(rows):
+            self.row = offset + int(rows[-1])
+            self.timestamp_ms = int(chunk.timestamp_ms[rows[-1]])
+
+
+class Histogram(Query):
+    """{value: count} of one data byte over the matching frames."""
+
+    def __init__(self, name, *can_ids, byte=0, where=None):
+        super().__init__(name, *can_ids, where=where)
+        self.byte = byte
+        self.counts = np.zeros(256, dtype=np.int64)
+
+    def update(self, chunk, rows, offset):
+        self.counts += np.bincount(chunk.data[rows, self.byte], minlength=256)
+
+    def result(self):
+        return {int(value): int(self.counts[value]) for value in np.flatnonzero(self.counts)}
+
+
+def iter_chunks(source, rows=CHUNK_ROWS, use_cache=True):
+    """
+    Yield (offset, chunk) pairs covering a log in order. `source` is a
+    CanLog or a log path; a .canb file or a text log with a valid cache is
+    memory-mapped, otherwise the text is streamed without building the
+    full arrays.
+    """
+    if isinstance(source, str) and (can_binary.is_binary(source) or
+                                    use_cache and can_log._cache_is_valid(source, can_log.cache_dir(source))):
+        source = can_log.load_log(source)
+
+    if isinstance(source, can_log.CanLog):
+        for offset in range(0, len(source), rows):
+            columns = {name: getattr(source, name)[offset:offset + rows] for name in can_log.COLUMNS}
+            yield offset, can_log.CanLog(columns)
+        return
+
+    offset = 0
+    with open(source, 'rb') as f:
+        while True:
+            lines = list(islice(f, rows))
+            if not lines:
+                break
+            chunk = can_log.CanLog(can_log.parse_lines(lines))
+            if len(chunk):
+                yield offset, chunk
+                offset += len(chunk)
+
+
+class QueryEngine:
+    """A set of named queries answered together in one pass over a log."""
+
+    def __init__(self, queries=()):
+        self.queries = {}
+        for query in queries:
+            self.add(query)
+
+    def add(self, query):
+        if query.name in self.queries:
+            raise ValueError(f"Duplicate query name '{query.name}'")
+        self.queries[query.name] = query
+        return query
+
+    def run(self, source, chunk_rows=CHUNK_ROWS, use_cache=True):
+        """Scan the log once and return {query name: result}."""
+        for offset, chunk in iter_chunks(source, chunk_rows, use_cache):
+            # Queries filtering on the same ids share one id mask per chunk
+            id_masks = {}
+            for query in self.queries.values():
+                if getattr(query, 'done', False):
+                    continue
+                if query.can_ids not in id_masks:
+                    id_masks[query.can_ids] = chunk.mask(*query.can_ids) if query.can_ids else None
+                mask = id_masks[query.can_ids]
+                if query.where is not None:
+                    predicate = query.where(chunk)
+                    mask = predicate if mask is None else mask & predicate
+                rows = np.arange(len(chunk)) if mask is None else np.flatnonzero(mask)
+                query.update(chunk, rows, offset)
+        return self.results()
+
+    def results(self):
+        return {name: query.result() for name, query in self.queries.items()}
+
+
+# CAN ids used by the VBG levels
+CSM_SENSOR = 0xCF06523          # DBLLCKSNSR, trailer-side coupling sensor
+TRUCK_SENSOR = 0xCF06931        # DBLLCKSNSRTRCK, truck-side coupling sensor
+JACKKNIFE_STATUS = 0xCF07731    # jack-knifing detection status
+
+
+def level_queries():
+    """Every aggregation levels 1-5 need, for one QueryEngine pass."""
+    undefined = byte_eq(0, 0x03)
+    return [
+        Count('total'),
+        Count('jackknife_active', JACKKNIFE_STATUS, where=any_nonzero),
+        First('first_jackknife_active', JACKKNIFE_STATUS, where=any_nonzero),
+        Count('csm_undefined', CSM_SENSOR, where=undefined),
+        First('first_csm_undefined', CSM_SENSOR, where=undefined),
+        Last('last_csm_undefined', CSM_SENSOR, where=undefined),
+        Count('truck_undefined', TRUCK_SENSOR, where=undefined),
+        First('first_truck_undefined', TRUCK_SENSOR, where=undefined),
+        Last('last_truck_undefined', TRUCK_SENSOR, where=undefined),
+        Histogram('csm_states', CSM_SENSOR, byte=0),
+    ]
+
+
+def level_answers(results):
+    """{level: answer} from the results of level_queries()."""
+    return {
+        1: results['total'],
+        2: results['jackknife_active'],
+        3: results['csm_undefined'],
+        4: results['first_jackknife_active'] - results['first_csm_undefined'],
+        5: results['csm_undefined'] + results['truck_undefined'],
+    }
+
+
+def main():
+    log_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'level1', 'VBG_CAN_Log__1_.log')
+
+    engine = QueryEngine(level_queries())
+    start = time.perf_counter()
+    results = engine.run(log_file)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"{len(engine.queries)} queries answered in one pass ({elapsed:.1f} ms)\n")
+    for name, value in results.items():
+        print(f"  {name:<24} {value}")
+    print()
+    for level, answer in level_answers(results).items():
+        print(f"Level {level}: {answer}")
+
+
+if __name__ == '__main__':
+    main()
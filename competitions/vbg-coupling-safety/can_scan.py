@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Zero-copy scanner over raw log text
+
+Works directly on an mmap of the BUSMASTER log, as bytes: candidate lines
+are located with mmap.find() of the " 0x<ID> " token and only the fields a
+question needs are compared through memoryview slices. Non-matching lines
+are never decoded, split or copied. Pure standard library, so it also
+serves the solutions when NumPy (and with it can_log) is unavailable.
+
+Usage:
+    count_byte_equals('level1/VBG_CAN_Log__1_.log', 0xCF06523, 0, 0x03)   # 93
+    first_nonzero('level1/VBG_CAN_Log__1_.log', 0xCF07731)               # ms
+
+Benchmark against the line-splitting approach of level 3:
+    python can_scan.py --bench                  # 2.2 MB sample log
+    python can_scan.py --bench --size-mb 1024   # plus a 1 GB synthetic log
+"""
+
+import argparse
+import importlib.util
+import mmap
+import os
+import shutil
+import tempfile
+import time
+
+
+def open_log(log_file):
+    """Read-only mmap of a log file (usable as a context manager)."""
+    with open(log_file, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _hex_byte(value):
+    return b'%02X' % value
+
+
+def iter_payloads(log_map, can_id):
+    """
+    Yield (id_pos, dlc, data_start) for every frame of can_id. Data byte i
+    is the two hex digits at data_start + 3 * i; line_start(log_map, id_pos)
+    finds the line (and its timestamp) only when a caller needs it.
+    """
+    token = b' 0x%X ' % can_id
+    find = log_map.find
+    pos = find(token)
+    while pos != -1:
+        # After the id: "<type> <dlc> <data...>" with a single-digit DLC
+        dlc_start = find(b' ', pos + len(token)) + 1
+        yield pos, log_map[dlc_start] - 48, dlc_start + 2
+        pos = find(token, dlc_start)
+
+
+def line_start(log_map, pos):
+    """Offset of the start of the line containing pos."""
+    return log_map.rfind(b'\n', 0, pos) + 1
+
+
+def _timestamp_ms(log_map, pos):
+    """HH:MM:SS:MSMS of the line containing pos, in ms (last field taken as ms, like can_log)."""
+    start = line_start(log_map, pos)
+    end = log_map.find(b' ', start)
+    hours, minutes, seconds, millis = log_map[start:end].split(b':')
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def count_frames(log_file, can_id):
+    """Number of frames with this CAN id."""
+    with open_log(log_file) as log_map:
+        return sum(1 for _ in iter_payloads(log_map, can_id))
+
+
+def byte_equals_timestamps(log_file, can_id, index, value):
+    """Timestamps (ms) of frames of can_id whose data byte `index` equals value."""
+    wanted = _hex_byte(value)
+    timestamps = []
+    with open_log(log_file) as log_map:
+        view = memoryview(log_map)
+        try:
+            for pos, dlc, data_start in iter_payloads(log_map, can_id):
+                field = data_start + 3 * index
+                if index < dlc and view[field:field + 2] == wanted:
+                    timestamps.append(_timestamp_ms(log_map, pos))
+        finally:
+            view.release()
+    return timestamps
+
+
+def count_byte_equals(log_file, can_id, index, value):
+    """Number of frames of can_id whose data byte `index` equals value."""
+    wanted = _hex_byte(value)
+    count = 0
+    with open_log(log_file) as log_map:
+        view = memoryview(log_map)
+        try:
+            for _, dlc, data_start in iter_payloads(log_map, can_id):
+                field = data_start + 3 * index
+                if index < dlc and view[field:field + 2] == wanted:
+                    count += 1
+        finally:
+            view.release()
+    return count
+
+
+def _zero_payloads():
+    # "00 00 ... 00" for every DLC, compared in one slice
+    return {dlc: b' '.join([b'00'] * dlc) for dlc in range(9)}
+
+
+def count_nonzero(log_file, can_id):
+    """Number of frames of can_id with at least one non-zero data byte."""
+    zeros = _zero_payloads()
+    count = 0
+    with open_log(log_file) as log_map:
+        view = memoryview(log_map)
+        try:
+            for _, dlc, data_start in iter_payloads(log_map, can_id):
+                if view[data_start:data_start + 3 * dlc - 1] != zeros[dlc]:
+                    count += 1
+        finally:
+            view.release()
+    return count
+
+
+def first_nonzero(log_file, can_id):
+    """Timestamp (ms) of the first frame of can_id with non-zero data, or None."""
+    zeros = _zero_payloads()
+    with open_log(log_file) as log_map:
+        view = memoryview(log_map)
+        try:
+            for pos, dlc, data_start in iter_payloads(log_map, can_id):
+                if view[data_start:data_start + 3 * dlc - 1] != zeros[dlc]:
+                    return _timestamp_ms(log_map, pos)
+        finally:
+            view.release()
+    return None
+
+
+def make_large_log(source, target, size_mb):
+    """
+    Write a synthetic log of about size_mb MB by repeating the frames of
+    source after its header. Good enough for throughput measurements;
+    the answers scale with the number of repetitions.
+    """
+    with open(source, 'rb') as f:
+        content = f.read()
+    body_start = 0
+    while content.startswith(b'***', body_start):
+        body_start = content.index(b'\n', body_start) + 1
+    header, body = content[:body_start], content[body_start:]
+
+    target_size = size_mb << 20
+    repeats = 0
+    with open(target, 'wb') as f:
+        f.write(header)
+        written = len(header)
+        while written < target_size:
+            f.write(body)
+            written += len(body)
+            repeats += 1
+    return repeats
+
+
+def _load_level3(base_dir):
+    spec = importlib.util.spec_from_file_location('level3_solution', os.path.join(base_dir, 'level3', 'solution.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _time(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark(log_file, size_mb=0):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    level3 = _load_level3(base_dir)
+
+    def run(path):
+        size = os.path.getsize(path) / (1 << 20)
+        baseline, baseline_s = _time(level3.count_undefined_coupling_states, path)
+        scanned, scanned_s = _time(count_byte_equals, path, 0xCF06523, 0, 0x03)
+        assert baseline == scanned, (baseline, scanned)
+        print(f"{size:>8.1f} MB  split lines: {baseline_s:8.3f} s ({size / baseline_s:7.1f} MB/s)   "
+              f"mmap scan: {scanned_s:8.3f} s ({size / scanned_s:7.1f} MB/s)   "
+              f"x{baseline_s / scanned_s:.1f}   answer {scanned:,}")
+
+    run(log_file)
+    if size_mb:
+        directory = tempfile.mkdtemp(prefix='can_scan_')
+        try:
+            large = os.path.join(directory, 'synthetic.log')
+            make_large_log(log_file, large, size_mb)
+            run(large)
+        finally:
+            shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zero-copy scan of a BUSMASTER log")
+    parser.add_argument('log', nargs='?', default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'level1', 'VBG_CAN_Log__1_.log'))
+    parser.add_argument('--bench', action='store_true', help="Compare with level 3's line-splitting count")
+    parser.add_argument('--size-mb', type=int, default=0, help="Also benchmark a synthetic log of this size")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.log, args.size_mb)
+        return
+
+    print(f"Undefined on 0xCF06523: {count_byte_equals(args.log, 0xCF06523, 0, 0x03)}")
+    print(f"Undefined on 0xCF06931: {count_byte_equals(args.log, 0xCF06931, 0, 0x03)}")
+    print(f"Non-zero 0xCF07731:     {count_nonzero(args.log, 0xCF07731)}")
+    print(f"First non-zero 0xCF07731 at {first_nonzero(args.log, 0xCF07731)} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Synthetic CAN log generator
+
+Learns the traffic of a sample BUSMASTER log - which CAN ids occur, their
+channel/type/DLC, the inter-arrival times of each id and the payloads it
+sends - and streams a new log of any length in the same format. Anomalies
+are planted explicitly, so the answers are known:
+
+    csm_undefined    0xCF06523 reports Undefined (byte 0 = 0x03)
+    truck_undefined  0xCF06931 reports Undefined (byte 0 = 0x03)
+    jackknife        0xCF07731 carries a non-zero (active) payload
+
+Learned payloads that would look like an anomaly are removed from the
+background traffic; a plant "KIND@OFFSET_MS:COUNT" turns the next COUNT
+frames of that id at or after OFFSET_MS (from the start of the log) into
+anomalies. OFFSET_MS may not precede the id's first frame, since the id is
+emitted from the same offset as in the sample. The default plan repeats the sample incident once per sample
+duration. Generation is seedable and writes in constant memory; the known
+answers are written next to the log as <log>.answers.json.
+
+Usage:
+    python can_synth.py /tmp/vbg_x10.log --scale 10 --seed 1
+    python can_synth.py /tmp/vbg.log --frames 5000000 --plant csm_undefined@120000:50 --check
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from itertools import accumulate
+
+import numpy as np
+
+import can_log
+import can_query
+
+
+SAMPLE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'level1', 'VBG_CAN_Log__1_.log')
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Plantable anomalies: (CAN id, predicate on a payload that marks it as an anomaly)
+ANOMALIES = {
+    'csm_undefined': (can_query.CSM_SENSOR, lambda payload: payload[0] == 0x03),
+    'truck_undefined': (can_query.TRUCK_SENSOR, lambda payload: payload[0] == 0x03),
+    'jackknife': (can_query.JACKKNIFE_STATUS, lambda payload: any(payload)),
+}
+
+# Payload used for a planted anomaly when the sample has none for that id
+DEFAULT_ANOMALY_PAYLOADS = {
+    'csm_undefined': bytes([0x03, 0, 0, 0, 0, 0, 0, 0]),
+    'truck_undefined': bytes([0x03, 0, 0, 0, 0, 0, 0, 0]),
+    'jackknife': bytes([0x01, 0, 0, 0, 0, 0, 0, 0]),
+}
+
+# The sample incident: Undefined bursts on both sensors, jack-knifing 966 ms later
+INCIDENT = (('csm_undefined', 0, 93), ('truck_undefined', 0, 93), ('jackknife', 966, 543))
+
+
+class IdModel:
+    """Learned traffic of one CAN id."""
+
+    def __init__(self, can_id, direction, channel, frame_type, dlc, first_offset_ms, gaps_ms, payloads, weights):
+        self.can_id = can_id
+        self.direction = direction
+        self.channel = channel
+        self.frame_type = frame_type
+        self.dlc = dlc
+        self.first_offset_ms = first_offset_ms
+        self.gaps_ms = gaps_ms
+        self.payloads = payloads
+        self.cum_weights = list(accumulate(weights))
+        self.anomaly_payloads = []
+        # "Rx 1 0xCF06523 x 8 " - everything between timestamp and data
+        self.prefix = f" {direction} {channel} 0x{can_id:X} {frame_type} {dlc} "
+        self.formatted = [self.format_payload(payload) for payload in payloads]
+
+    def format_payload(self, payload):
+        return ''.join(f"{byte:02X} " for byte in payload[:self.dlc])
+
+    def next_gap(self, rng):
+        return rng.choice(self.gaps_ms)
+
+    def next_payload(self, rng):
+        index = bisect.bisect_right(self.cum_weights, rng.random() * self.cum_weights[-1])
+        return self.formatted[min(index, len(self.formatted) - 1)]
+
+
+class Model:
+    """Traffic model of a whole sample log."""
+
+    def __init__(self, ids, duration_ms, start_ms, header, frames):
+        self.ids = ids
+        self.duration_ms = duration_ms
+        self.start_ms = start_ms
+        self.header = header
+        self.frames = frames
+
+
+def _frame_type(flags):
+    frame_type = 'x' if flags & can_log.FLAG_EXTENDED else 's'
+    return frame_type + ('r' if flags & can_log.FLAG_REMOTE else '')
+
+
+def learn(sample_log=SAMPLE_LOG):
+    """Learn an IdModel per CAN id from a sample log."""
+    log = can_log.load_log(sample_log)
+    timestamps = np.asarray(log.timestamp_ms)
+    start_ms = int(timestamps.min())
+    duration_ms = int(timestamps.max()) - start_ms
+    directions = {value: name.decode() for name, value in can_log.DIRECTIONS.items()}
+
+    ids = {}
+    for can_id in np.unique(log.can_id):
+        can_id = int(can_id)
+        rows = log.frames(can_id)
+        first = rows[0]
+        # With MSMS read as ms the per-frame steps are distorted (a ...:9999 ->
+        # ...:0005 step is negative), so keep the shape of the positive gaps
+        # but rescale them to the id's observed rate over the whole capture
+        gaps = np.diff(timestamps[rows])
+        gaps = gaps[gaps > 0]
+        span = int(timestamps[rows[-1]]) - int(timestamps[first])
+        if len(gaps) and span > 0:
+            gaps = np.maximum(np.rint(gaps * (span / (len(rows) - 1) / gaps.mean())), 1)
+            gaps = [int(gap) for gap in gaps]
+        else:
+            gaps = [max(duration_ms, 1)]
+
+        payloads, counts = np.unique(np.asarray(log.data[rows]), axis=0, return_counts=True)
+        payloads = [bytes(payload) for payload in payloads]
+        weights = [int(count) for count in counts]
+
+        # Keep anomalies out of the background; they are only ever planted
+        anomalies = []
+        for kind, (anomaly_id, is_anomaly) in ANOMALIES.items():
+            if anomaly_id == can_id:
+                anomalies = [payload for payload in payloads if is_anomaly(payload)]
+                kept = [(payload, weight) for payload, weight in zip(payloads, weights) if not is_anomaly(payload)]
+                payloads = [payload for payload, _ in kept] or [bytes(8)]
+                weights = [weight for _, weight in kept] or [1]
+
+        model = IdModel(can_id, directions[int(log.direction[first])], int(log.channel[first]),
+                        _frame_type(int(log.flags[first])), int(log.dlc[first]),
+                        int(timestamps[first]) - start_ms, gaps, payloads, weights)
+        model.anomaly_payloads = [model.format_payload(payload) for payload in anomalies]
+        ids[can_id] = model
+
+    header = [line for line in log.header if not line.startswith('START DATE AND TIME')]
+    return Model(ids, duration_ms, start_ms, header, len(log))
+
+
+def format_timestamp(total_ms):
+    """ms since midnight of day 0 to HH:MM:SS:MSMS, wrapping at midnight like a real capture."""
+    total_ms %= DAY_MS
+    seconds, milliseconds = divmod(total_ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{milliseconds:04d}"
+
+
+def parse_plant(text):
+    """'jackknife@966:543' -> ('jackknife', 966, 543)."""
+    kind, _, rest = text.partition('@')
+    offset, _, count = rest.partition(':')
+    if kind not in ANOMALIES or not offset or not count:
+        raise ValueError(f"Invalid plant '{text}' (expected KIND@OFFSET_MS:COUNT, KIND in {sorted(ANOMALIES)})")
+    return kind, int(offset), int(count)
+
+
+def default_plan(model, duration_ms):
+    """
+    The sample incident, repeated once per sample duration. The first one is
+    10% in, but not before all anomaly ids have started sending.
+    """
+    plan = []
+    started = max(model.ids[can_id].first_offset_ms for can_id, _ in ANOMALIES.values() if can_id in model.ids)
+    offset = max(model.duration_ms // 10, started + 1000)
+    while offset < duration_ms:
+        plan += [(kind, offset + delay, count) for kind, delay, count in INCIDENT if ANOMALIES[kind][0] in model.ids]
+        offset += model.duration_ms
+    return plan
+
+
+def generate(out_path, model, duration_ms=None, frames=None, plan=None, seed=0, start_ms=None):
+    """
+    Stream a synthetic log to out_path until duration_ms or frames is
+    reached. Returns the known answers (also written to <out_path>.answers.json).
+    """
+    if duration_ms is None and frames is None:
+        duration_ms = model.duration_ms
+    start_ms = model.start_ms if start_ms is None else start_ms
+    rng = random.Random(seed)
+    plan = default_plan(model, duration_ms or model.duration_ms * max(frames // model.frames, 1)) if plan is None else plan
+
+    # Pending plants per id, in offset order
+    pending = {}
+    for kind, offset, count in sorted(plan, key=lambda plant: plant[1]):
+        can_id = ANOMALIES[kind][0]
+        if can_id not in model.ids:
+            raise ValueError(f"Cannot plant {kind}: 0x{can_id:X} does not occur in the sample log")
+        if offset < model.ids[can_id].first_offset_ms:
+            # The id has no frames yet, so the plant would silently move to its first frame
+            raise ValueError(f"Cannot plant {kind}@{offset}: 0x{can_id:X} is first sent at "
+                             f"{model.ids[can_id].first_offset_ms} ms")
+        pending.setdefault(can_id, deque()).append([kind, offset, count])
+
+    stats = {kind: {'count': 0, 'first_ms': None, 'last_ms': None} for kind in ANOMALIES}
+    heap = [(model.ids[can_id].first_offset_ms, index, can_id) for index, can_id in enumerate(sorted(model.ids))]
+    heapq.heapify(heap)
+
+    emitted = 0
+    buffer = []
+    with open(out_path, 'w', newline='', encoding='ascii') as f:
+        f.write(''.join(f"***{line}***\r\n" for line in model.header[:4]))
+        f.write(f"***START DATE AND TIME 3:11:2025 {format_timestamp(start_ms)[:-5]}:000***\r\n")
+        f.write(''.join(f"***{line}***\r\n" for line in model.header[4:]))
+
+        while heap:
+            offset, index, can_id = heap[0]
+            if (duration_ms is not None and offset > duration_ms) or (frames is not None and emitted >= frames):
+                break
+            id_model = model.ids[can_id]
+            heapq.heapreplace(heap, (offset + id_model.next_gap(rng), index, can_id))
+
+            timestamp_ms = start_ms + offset
+            payload = None
+            plants = pending.get(can_id)
+            if plants and plants[0][1] <= offset:
+                kind = plants[0][0]
+                payload = rng.choice(id_model.anomaly_payloads) if id_model.anomaly_payloads else \
+                    id_model.format_payload(DEFAULT_ANOMALY_PAYLOADS[kind])
+                plants[0][2] -= 1
+                if plants[0][2] <= 0:
+                    plants.popleft()
+                kind_stats = stats[kind]
+                kind_stats['count'] += 1
+                if kind_stats['first_ms'] is None:
+                    kind_stats['first_ms'] = timestamp_ms
+                kind_stats['last_ms'] = timestamp_ms
+            elif id_model.dlc:
+                payload = id_model.next_payload(rng)
+
+            buffer.append(f"{format_timestamp(timestamp_ms)}{id_model.prefix}{payload or ''}\r\n")
+            emitted += 1
+            if len(buffer) >= 50000:
+                f.write(''.join(buffer))
+                buffer.clear()
+
+        f.write(''.join(buffer))
+        f.write(f"***END DATE AND TIME 3:11:2025 {format_timestamp(start_ms + offset)[:-5]}:000***\r\n")
+        f.write("***[STOP LOGGING SESSION]***\r\n\r\n")
+
+    csm, truck, jackknife = stats['csm_undefined'], stats['truck_undefined'], stats['jackknife']
+    answers = {
+        'seed': seed,
+        'frames': emitted,
+        'anomalies': stats,
+        'plan': plan,
+        'levels': {
+            '1': emitted,
+            '2': jackknife['count'],
+            '3': csm['count'],
+            '4': (jackknife['first_ms'] - csm['first_ms']) if jackknife['count'] and csm['count'] else None,
+            '5': csm['count'] + truck['count'],
+        },
+    }
+    with open(out_path + '.answers.json', 'w') as f:
+        json.dump(answers, f, indent=2)
+    return answers
+
+
+def check(out_path, answers):
+    """Re-derive the level answers with can_query and compare. Returns True if all match."""
+    results = can_query.QueryEngine(can_query.level_queries()).run(out_path, use_cache=False)
+    found = {str(level): value for level, value in can_query.level_answers(results).items()}
+    ok = True
+    for level, expected in answers['levels'].items():
+        match = found[level] == expected
+        ok &= match
+        print(f"  Level {level}: expected {expected}, found {found[level]} {'✓' if match else '✗'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic BUSMASTER log with known answers")
+    parser.add_argument('output')
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', type=float, default=10, help="Duration as a multiple of the sample log (default 10)")
+    size.add_argument('--frames', type=int, help="Stop after this many frames instead")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--plant', action='append', type=parse_plant, metavar='KIND@OFFSET_MS:COUNT',
+                        help="Plant anomalies (repeatable); replaces the default incident plan")
+    parser.add_argument('--sample', default=SAMPLE_LOG, help="Log to learn the traffic from")
+    parser.add_argument('--check', action='store_true', help="Verify the answers with can_query afterwards")
+    args = parser.parse_args()
+
+    model = learn(args.sample)
+    duration_ms = None if args.frames else int(model.duration_ms * args.scale)
+
+    start = time.perf_counter()
+    try:
+        answers = generate(args.output, model, duration_ms=duration_ms, frames=args.frames, plan=args.plant, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(args.output) / (1 << 20)
+    print(f"Wrote {answers['frames']:,} frames ({size_mb:.1f} MB) to {args.output} in {elapsed:.1f} s")
+    print(f"Answers: {args.output}.answers.json {answers['levels']}")
+
+    if args.check:
+        print("Checking with can_query:")
+        sys.exit(0 if check(args.output, answers) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+VBG Smart Coupling Safety Challenge - Timestamp-indexed event queries
+
+Builds a timeline over a parsed log: timestamps are unwrapped once to a
+monotonic day (a capture running past midnight keeps counting up), and
+each registered event - a CAN id plus an optional predicate - is stored as
+its rows and times. Forensic sequence questions are then answered with
+binary search (np.searchsorted) instead of re-scanning the log:
+
+    first / last occurrence           timeline.first('undefined')
+    count in a time window            timeline.count_between('undefined', t0, t1)
+    time from event A to next B       timeline.time_to_next('undefined', 'jackknife')
+    A events within +-delta of any B  timeline.near('undefined', 'truck_undefined', 5)
+
+Usage:
+    timeline = Timeline(can_log.load_log('level1/VBG_CAN_Log__1_.log'))
+    timeline.add_event('undefined', 0xCF06523, where=can_query.byte_eq(0, 0x03))
+    timeline.add_event('jackknife', 0xCF07731, where=can_query.any_nonzero)
+    timeline.time_to_next('undefined', 'jackknife')    # 966
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+import can_log
+import can_query
+
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# A step back larger than this between consecutive frames is a midnight rollover,
+# not the small jitter of interleaved channels
+ROLLOVER_THRESHOLD_MS = DAY_MS // 2
+
+
+def unwrap_midnight(timestamps_ms):
+    """Add a day to every frame after each midnight rollover (time-of-day jumping back)."""
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    if len(timestamps_ms) < 2:
+        return timestamps_ms.copy()
+    rollovers = np.concatenate(([0], np.cumsum(np.diff(timestamps_ms) < -ROLLOVER_THRESHOLD_MS)))
+    return timestamps_ms + rollovers * DAY_MS
+
+
+class Event:
+    """
+    Occurrences of one event: `rows` and `times` in capture order, plus the
+    times sorted for window and proximity queries. Under the repo's
+    HH:MM:SS:MSMS rule the time-of-day column is not strictly monotonic
+    (...:9999 is followed by ...:0005 of the next second), so "next" and
+    "first" follow the rows - the order the frames were captured in.
+    """
+
+    def __init__(self, rows, times):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.times = np.asarray(times, dtype=np.int64)
+        self.sorted_times = np.sort(self.times)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class Timeline:
+    """Named events of one log, queried by binary search."""
+
+    def __init__(self, log):
+        self.log = log
+        self.timestamp_ms = unwrap_midnight(log.timestamp_ms)
+        self.events = {}
+
+    def add_event(self, name, *can_ids, where=None):
+        """
+        Register frames of can_ids (all frames if none) matching `where` - a
+        can_query predicate such as byte_eq(0, 0x03) - as event `name`.
+        """
+        mask = self.log.mask(*can_ids) if can_ids else np.ones(len(self.log), dtype=bool)
+        if where is not None:
+            mask = mask & where(self.log)
+        rows = np.flatnonzero(mask)
+        self.events[name] = Event(rows, self.timestamp_ms[rows])
+        return self.events[name]
+
+    def times(self, name):
+        """Occurrence times in capture order."""
+        return self.events[name].times
+
+    def count(self, name):
+        return len(self.events[name])
+
+    def first(self, name):
+        """Time of the first occurrence in the capture, or None."""
+        times = self.events[name].times
+        return int(times[0]) if len(times) else None
+
+    def last(self, name):
+        """Time of the last occurrence in the capture, or None."""
+        times = self.events[name].times
+        return int(times[-1]) if len(times) else None
+
+    def count_between(self, name, start_ms, end_ms):
+        """Occurrences with start_ms <= t < end_ms."""
+        times = self.events[name].sorted_times
+        return int(np.searchsorted(times, end_ms, 'left') - np.searchsorted(times, start_ms, 'left'))
+
+    def window_counts(self, name, width_ms, start_ms=None, end_ms=None):
+        """
+        Occurrences per consecutive window of width_ms. Returns
+        (window_starts, counts), from start_ms (default: earliest frame) to end_ms.
+        """
+        start_ms = int(self.timestamp_ms.min()) if start_ms is None else start_ms
+        end_ms = int(self.timestamp_ms.max()) + 1 if end_ms is None else end_ms
+        edges = np.arange(start_ms, end_ms + width_ms, width_ms)
+        positions = np.searchsorted(self.events[name].sorted_times, edges, 'left')
+        return edges[:-1], np.diff(positions)
+
+    def next_after(self, name, row):
+        """(row, time) of the first occurrence captured after log row `row`, or None."""
+        event = self.events[name]
+        position = np.searchsorted(event.rows, row, 'right')
+        if position == len(event):
+            return None
+        return int(event.rows[position]), int(event.times[position])
+
+    def previous_before(self, name, row):
+        """(row, time) of the last occurrence captured before log row `row`, or None."""
+        event = self.events[name]
+        position = np.searchsorted(event.rows, row, 'left')
+        if position == 0:
+            return None
+        return int(event.rows[position - 1]), int(event.times[position - 1])
+
+    def time_to_next(self, a, b):
+        """ms from the first A to the next B captured after it, or None."""
+        event_a = self.events[a]
+        if not len(event_a):
+            return None
+        following = self.next_after(b, event_a.rows[0])
+        return None if following is None else following[1] - int(event_a.times[0])
+
+    def gaps_to_next(self, a, b):
+        """For every A, ms to the next B captured after it (-1 where none follows)."""
+        event_a, event_b = self.events[a], self.events[b]
+        positions = np.searchsorted(event_b.rows, event_a.rows, 'right')
+        found = positions < len(event_b)
+        gaps = np.full(len(event_a), -1, dtype=np.int64)
+        gaps[found] = event_b.times[positions[found]] - event_a.times[found]
+        return gaps
+
+    def near(self, a, b, delta_ms):
+        """Times of A events (capture order) that have at least one B within +-delta_ms."""
+        times_a, times_b = self.events[a].times, self.events[b].sorted_times
+        low = np.searchsorted(times_b, times_a - delta_ms, 'left')
+        high = np.searchsorted(times_b, times_a + delta_ms, 'right')
+        return times_a[high > low]
+
+
+def format_ms(total_ms):
+    """Render ms since the start of the first day as HH:MM:SS.mmm (+Nd past midnight)."""
+    days, total_ms = divmod(int(total_ms), DAY_MS)
+    seconds, milliseconds = divmod(total_ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    suffix = f" +{days}d" if days else ""
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}{suffix}"
+
+
+def vbg_timeline(log):
+    """Timeline with the coupling and jack-knifing events of the VBG levels."""
+    timeline = Timeline(log)
+    undefined = can_query.byte_eq(0, 0x03)
+    timeline.add_event('csm_undefined', can_query.CSM_SENSOR, where=undefined)
+    timeline.add_event('truck_undefined', can_query.TRUCK_SENSOR, where=undefined)
+    timeline.add_event('jackknife_active', can_query.JACKKNIFE_STATUS, where=can_query.any_nonzero)
+    return timeline
+
+
+def main():
+    log_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'level1', 'VBG_CAN_Log__1_.log')
+
+    timeline = vbg_timeline(can_log.load_log(log_file))
+    for name in timeline.events:
+        print(f"{name:<18} {timeline.count(name):>5}  "
+              f"{format_ms(timeline.first(name)) if timeline.count(name) else '-'} .. "
+              f"{format_ms(timeline.last(name)) if timeline.count(name) else '-'}")
+
+    start = time.perf_counter()
+    gap = timeline.time_to_next('csm_undefined', 'jackknife_active')
+    simultaneous = timeline.near('csm_undefined', 'truck_undefined', 5)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    print(f"\nFirst coupling Undefined -> next jack-knifing activation: {gap} ms")
+    print(f"CSM Undefined with a truck-side Undefined within ±5 ms: {len(simultaneous)}")
+    print(f"(both answered in {elapsed_us:.0f} µs)")
+
+
+if __name__ == '__main__':
+    main()
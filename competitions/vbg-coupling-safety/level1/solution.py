@@ -7,6 +7,17 @@ Task: Determine how many TOTAL CAN messages were recorded during the incident.
 Answer: 38407
 """
 
+import os
+import sys
+
+# Shared CAN tooling lives in the competition folder; solutions run from their level folder
+sys.path.insert(0, os.path.abspath('..'))
+try:
+    import can_log
+except ImportError:  # NumPy not available - fall back to scanning the text log
+    can_log = None
+
+
 def count_can_messages(log_file):
     """
     Count the total number of CAN messages in the log file.
@@ -32,6 +43,14 @@ def count_can_messages(log_file):
     return count
 
 
+def count_can_messages_cached(log_file):
+    """
+    Same count from the columnar cache: the parser keeps exactly one row per
+    CAN message line and skips the *** header block.
+    """
+    return len(can_log.load_log(log_file))
+
+
 def main():
     log_file = 'VBG_CAN_Log__1_.log'
     
@@ -40,7 +59,10 @@ def main():
     print("=" * 60)
     print("\nCounting CAN messages...")
     
-    total_messages = count_can_messages(log_file)
+    if can_log:
+        total_messages = count_can_messages_cached(log_file)
+    else:
+        total_messages = count_can_messages(log_file)
     
     print(f"\nTotal CAN messages: {total_messages:,}")
     print(f"\nAnswer: {total_messages}")
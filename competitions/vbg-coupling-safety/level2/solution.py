@@ -8,6 +8,17 @@ Task: Count how many CAN messages with ID 0xCF07731 contain NON-ZERO data
 Answer: 543
 """
 
+import os
+import sys
+
+# Shared CAN tooling lives in the competition folder; solutions run from their level folder
+sys.path.insert(0, os.path.abspath('..'))
+try:
+    import can_log
+except ImportError:  # NumPy not available - fall back to scanning the text log
+    can_log = None
+
+
 def count_jackknifing_messages(log_file):
     """
     Count CAN messages with ID 0xCF07731 that have non-zero data.
@@ -40,6 +51,16 @@ def count_jackknifing_messages(log_file):
     return count
 
 
+def count_jackknifing_messages_cached(log_file):
+    """
+    Same count over the columnar cache: select the 0xCF07731 rows and count
+    those whose 8-byte payload has any non-zero byte.
+    """
+    log = can_log.load_log(log_file)
+    rows = log.frames(0xCF07731)
+    return int(log.data[rows].any(axis=1).sum())
+
+
 def main():
     # Level 2 uses the same log file from Level 1
     log_file = '../level1/VBG_CAN_Log__1_.log'
@@ -50,7 +71,10 @@ def main():
     print("\nAnalyzing jack-knifing detection messages...")
     print("CAN ID: 0xCF07731 (JCKKNFNGSTS)")
     
-    active_messages = count_jackknifing_messages(log_file)
+    if can_log:
+        active_messages = count_jackknifing_messages_cached(log_file)
+    else:
+        active_messages = count_jackknifing_messages(log_file)
     
     print(f"\nTotal 0xCF07731 messages with NON-ZERO data: {active_messages:,}")
     print(f"\nAnswer: {active_messages}")
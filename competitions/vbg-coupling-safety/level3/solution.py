@@ -19,6 +19,28 @@ According to DBC:
     4 = Inhibited
 """
 
+import os
+import sys
+
+# Shared CAN tooling lives in the competition folder; solutions run from their level folder
+sys.path.insert(0, os.path.abspath('..'))
+try:
+    import numpy as np
+    import can_dbc
+    import can_log
+except ImportError:  # NumPy not available - fall back to scanning the text log
+    can_log = None
+
+
+STATE_NAMES = {
+    '00': 'Unlocked',
+    '01': 'Locked',
+    '02': 'Not present',
+    '03': 'Undefined ⚠️',
+    '04': 'Inhibited'
+}
+
+
 def count_undefined_coupling_states(log_file):
     """
     Count messages where the coupling sensor reports "Undefined" (0x03).
@@ -51,13 +73,6 @@ def analyze_coupling_states(log_file):
     Additional analysis: Show all unique coupling sensor states.
     """
     states = {}
-    state_names = {
-        '00': 'Unlocked',
-        '01': 'Locked',
-        '02': 'Not present',
-        '03': 'Undefined ⚠️',
-        '04': 'Inhibited'
-    }
     
     with open(log_file, 'r') as f:
         for line in f:
@@ -67,7 +82,20 @@ def analyze_coupling_states(log_file):
                     first_byte = parts[6]
                     states[first_byte] = states.get(first_byte, 0) + 1
     
-    return states, state_names
+    return states, STATE_NAMES
+
+
+def coupling_states_cached(log_file, dbc_file='../TE_CAN_DBC_V1_3.dbc'):
+    """
+    Undefined count and state distribution from the columnar cache in one go:
+    DblLckSnsrRprtdSts decoded from the DBC for every 0xCF06523 frame,
+    counted with np.unique.
+    """
+    log = can_log.load_log(log_file)
+    series = can_dbc.decode_signal(log, can_dbc.load_dbc(dbc_file), 'DblLckSnsrRprtdSts')
+    values, counts = np.unique(series.raw, return_counts=True)
+    states = {f'{int(value):02X}': int(count) for value, count in zip(values, counts)}
+    return states.get('03', 0), states
 
 
 def main():
@@ -80,16 +108,19 @@ def main():
     print("CAN ID: 0xCF06523 (DBLLCKSNSR)")
     
     # Count undefined states
-    undefined_count = count_undefined_coupling_states(log_file)
+    if can_log:
+        undefined_count, states = coupling_states_cached(log_file)
+    else:
+        undefined_count = count_undefined_coupling_states(log_file)
+        states, _ = analyze_coupling_states(log_file)
     
     # Additional analysis
     print("\n" + "-" * 60)
     print("Coupling Sensor State Distribution:")
     print("-" * 60)
-    states, state_names = analyze_coupling_states(log_file)
     
     for state_code, count in sorted(states.items()):
-        state_name = state_names.get(state_code, 'Unknown')
+        state_name = STATE_NAMES.get(state_code, 'Unknown')
         marker = " ⚠️ ANOMALOUS" if state_code == '03' else ""
         print(f"  0x{state_code} ({state_name}): {count:,} messages{marker}")
     
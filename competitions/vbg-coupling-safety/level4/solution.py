@@ -12,6 +12,19 @@ Time format: HH:MM:SS:MSMS (e.g., 11:40:03:1406)
 Formula: (Jack-knifing timestamp) - (Coupling anomaly timestamp)
 """
 
+import os
+import sys
+
+# Shared CAN tooling lives in the competition folder; solutions run from their level folder
+sys.path.insert(0, os.path.abspath('..'))
+try:
+    import can_log
+    import can_query
+    import can_timeline
+except ImportError:  # NumPy not available - fall back to scanning the text log
+    can_log = None
+
+
 def parse_timestamp(timestamp_str):
     """
     Parse timestamp from format HH:MM:SS:MSMS to total milliseconds.
@@ -66,6 +79,30 @@ def find_first_jackknifing_activation(log_file):
     return None, None
 
 
+def format_ms(total_ms):
+    """
+    Render total milliseconds as HH:MM:SS.mmm. The log's own MSMS field can
+    exceed 999 (11:40:03:1406 is 11:40:04.406), so this is not always the
+    literal text from the log line.
+    """
+    seconds, milliseconds = divmod(total_ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def find_first_events_cached(log_file):
+    """
+    Both first occurrences from a timeline over the columnar cache: 0xCF06523
+    frames with byte 0 == 0x03 and 0xCF07731 frames with any non-zero byte.
+    Returns (coupling_ms, jackknife_ms); None where an event never occurs.
+    """
+    timeline = can_timeline.Timeline(can_log.load_log(log_file))
+    timeline.add_event('coupling_undefined', 0xCF06523, where=can_query.byte_eq(0, 0x03))
+    timeline.add_event('jackknife_active', 0xCF07731, where=can_query.any_nonzero)
+    return timeline.first('coupling_undefined'), timeline.first('jackknife_active')
+
+
 def main():
     log_file = '../level1/VBG_CAN_Log__1_.log'
     
@@ -74,21 +111,30 @@ def main():
     print("=" * 60)
     print("\nForensic Timeline Reconstruction...")
     
-    # Find first coupling anomaly
-    coupling_time_str, coupling_line = find_first_coupling_anomaly(log_file)
-    print(f"\n1. FIRST Coupling Sensor Anomaly (0xCF06523 = 0x03):")
-    print(f"   Timestamp: {coupling_time_str}")
-    print(f"   Line: {coupling_line[:80]}...")
-    
-    # Find first jack-knifing activation
-    jackknife_time_str, jackknife_line = find_first_jackknifing_activation(log_file)
-    print(f"\n2. FIRST Jack-knifing Detection Activation (0xCF07731 non-zero):")
-    print(f"   Timestamp: {jackknife_time_str}")
-    print(f"   Line: {jackknife_line[:80]}...")
-    
-    # Calculate time difference
-    coupling_ms = parse_timestamp(coupling_time_str)
-    jackknife_ms = parse_timestamp(jackknife_time_str)
+    if can_log:
+        coupling_ms, jackknife_ms = find_first_events_cached(log_file)
+        coupling_time_str = format_ms(coupling_ms)
+        jackknife_time_str = format_ms(jackknife_ms)
+        print(f"\n1. FIRST Coupling Sensor Anomaly (0xCF06523 = 0x03):")
+        print(f"   Timestamp: {coupling_time_str}")
+        print(f"\n2. FIRST Jack-knifing Detection Activation (0xCF07731 non-zero):")
+        print(f"   Timestamp: {jackknife_time_str}")
+    else:
+        # Find first coupling anomaly
+        coupling_time_str, coupling_line = find_first_coupling_anomaly(log_file)
+        print(f"\n1. FIRST Coupling Sensor Anomaly (0xCF06523 = 0x03):")
+        print(f"   Timestamp: {coupling_time_str}")
+        print(f"   Line: {coupling_line[:80]}...")
+        
+        # Find first jack-knifing activation
+        jackknife_time_str, jackknife_line = find_first_jackknifing_activation(log_file)
+        print(f"\n2. FIRST Jack-knifing Detection Activation (0xCF07731 non-zero):")
+        print(f"   Timestamp: {jackknife_time_str}")
+        print(f"   Line: {jackknife_line[:80]}...")
+        
+        # Calculate time difference
+        coupling_ms = parse_timestamp(coupling_time_str)
+        jackknife_ms = parse_timestamp(jackknife_time_str)
     
     time_diff = jackknife_ms - coupling_ms
     
@@ -12,6 +12,21 @@ This reveals that BOTH redundant sensors failed simultaneously - a critical
 design vulnerability where extreme lateral forces affected both sensors.
 """
 
+import os
+import sys
+
+# Shared CAN tooling lives in the competition folder; solutions run from their level folder
+sys.path.insert(0, os.path.abspath('..'))
+try:
+    import can_scan
+except ImportError:  # Served on its own without the shared tooling - scan line by line
+    can_scan = None
+try:
+    import can_log
+except ImportError:  # NumPy not available - fall back to scanning the text log
+    can_log = None
+
+
 def count_sensor_undefined_states(log_file, can_id):
     """
     Count Undefined (0x03) states for a specific coupling sensor.
@@ -32,6 +47,38 @@ def count_sensor_undefined_states(log_file, can_id):
     return count, timestamps
 
 
+def count_sensor_undefined_states_scanned(log_file, can_id):
+    """
+    Same as count_sensor_undefined_states over an mmap of the log: only the
+    sensor's lines are located and only their first data byte is compared.
+    """
+    timestamps = can_scan.byte_equals_timestamps(log_file, can_id, 0, 0x03)
+    return len(timestamps), [format_ms(ms) for ms in timestamps]
+
+
+def count_sensor_undefined_states_cached(log, can_id):
+    """
+    Same as count_sensor_undefined_states, but over an already loaded
+    columnar log, so both sensors are answered from a single parse.
+    """
+    rows = log.frames(can_id)
+    rows = rows[log.data[rows, 0] == 0x03]
+    timestamps = [format_ms(int(ms)) for ms in log.timestamp_ms[rows]]
+    return len(rows), timestamps
+
+
+def format_ms(total_ms):
+    """
+    Render total milliseconds as HH:MM:SS.mmm. The log's own MSMS field can
+    exceed 999 (11:40:03:1406 is 11:40:04.406), so this is not always the
+    literal text from the log line.
+    """
+    seconds, milliseconds = divmod(total_ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
 def analyze_redundancy_failure(log_file):
     """
     Comprehensive analysis of both coupling sensors.
@@ -40,8 +87,16 @@ def analyze_redundancy_failure(log_file):
     print("REDUNDANT SENSOR ANALYSIS")
     print("=" * 60)
     
+    if can_log:
+        log = can_log.load_log(log_file)
+        count_undefined = lambda can_id: count_sensor_undefined_states_cached(log, int(can_id, 16))
+    elif can_scan:
+        count_undefined = lambda can_id: count_sensor_undefined_states_scanned(log_file, int(can_id, 16))
+    else:
+        count_undefined = lambda can_id: count_sensor_undefined_states(log_file, can_id)
+    
     # Analyze CSM sensor (trailer-side)
-    csm_count, csm_times = count_sensor_undefined_states(log_file, '0xCF06523')
+    csm_count, csm_times = count_undefined('0xCF06523')
     print(f"\n1. CSM Sensor (0xCF06523) - DBLLCKSNSR")
     print(f"   Location: Trailer-side coupling lock sensor")
     print(f"   Undefined states: {csm_count}")
@@ -50,7 +105,7 @@ def analyze_redundancy_failure(log_file):
         print(f"   Last failure:  {csm_times[-1]}")
     
     # Analyze BCM/DSM sensor (truck-side)
-    bcm_count, bcm_times = count_sensor_undefined_states(log_file, '0xCF06931')
+    bcm_count, bcm_times = count_undefined('0xCF06931')
     print(f"\n2. BCM/DSM Sensor (0xCF06931) - DBLLCKSNSRTRCK")
     print(f"   Location: Truck-side coupling sensor")
     print(f"   Undefined states: {bcm_count}")
@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 """
 VBG Smart Coupling Safety Challenge - Complete Solution Runner
-Runs all 5 levels and displays comprehensive results.
+Answers all 5 levels from a single pass over the log (can_query) and
+displays comprehensive results.
+
+Usage:
+    python run_all_solutions.py              # one scan, all answers
+    python run_all_solutions.py --solutions  # run each level's solution.py instead
 """
 
 import sys
 import os
 
+try:
+    import can_query
+except ImportError:  # NumPy not available - run the per-level solutions
+    can_query = None
+
+LEVEL_TITLES = {
+    1: "The Data Deluge - total CAN messages",
+    2: "The Warning Signs - active jack-knifing messages",
+    3: "The Coupling Anomaly - Undefined states on 0xCF06523",
+    4: "The Sequence of Events - ms from anomaly to jack-knifing",
+    5: "The Root Cause Report - Undefined states on both sensors",
+}
+
 def run_level(level_num, level_dir):
     """Run a specific level's solution."""
     print("\n" + "█" * 60)
@@ -21,13 +39,30 @@ def run_level(level_num, level_dir):
         # Import and run the solution
         solution_path = os.path.join(level_dir, 'solution.py')
         with open(solution_path) as f:
-            exec(f.read())
+            # Own globals, so the solution's module-level imports are visible to its functions
+            exec(compile(f.read(), solution_path, 'exec'), {'__name__': '__main__', '__file__': solution_path})
     except Exception as e:
         print(f"Error running level {level_num}: {e}")
     finally:
         os.chdir(original_dir)
 
 
+def run_single_pass(base_dir):
+    """Answer every level from one QueryEngine scan of the log."""
+    log_file = os.path.join(base_dir, 'level1', 'VBG_CAN_Log__1_.log')
+    engine = can_query.QueryEngine(can_query.level_queries())
+    results = engine.run(log_file)
+    answers = can_query.level_answers(results)
+    
+    print("\n" + "█" * 60)
+    print(f"█  ALL LEVELS - {len(engine.queries)} queries, one pass over the log")
+    print("█" * 60)
+    for level_num, answer in answers.items():
+        print(f"\nLevel {level_num}: {LEVEL_TITLES[level_num]}")
+        print(f"  Answer: {answer}")
+    return answers
+
+
 def main():
     print("=" * 60)
     print(" VBG SMART COUPLING SAFETY CHALLENGE")
@@ -41,13 +76,17 @@ def main():
     # Get base directory
     base_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Run all levels
-    for level_num in range(1, 6):
-        level_dir = os.path.join(base_dir, f'level{level_num}')
-        if os.path.exists(level_dir):
-            run_level(level_num, level_dir)
-        else:
-            print(f"\nLevel {level_num} directory not found: {level_dir}")
+    if can_query and '--solutions' not in sys.argv[1:]:
+        sys.path.insert(0, base_dir)
+        run_single_pass(base_dir)
+    else:
+        # Run all levels
+        for level_num in range(1, 6):
+            level_dir = os.path.join(base_dir, f'level{level_num}')
+            if os.path.exists(level_dir):
+                run_level(level_num, level_dir)
+            else:
+                print(f"\nLevel {level_num} directory not found: {level_dir}")
     
     # Final summary
     print("\n" + "=" * 60)
@@ -5,26 +5,28 @@ Supports UUID-based competition IDs.
 """
 import sqlite3
 import os
-from typing import List, Dict, Any, Optional
+import re
+import heapq
+import time
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+
+import answers
+import attempts
+import progress
 
 
 DB_PATH = "competition.db"
 
+# Katalog med en databasfil per tävling för results/submissions, tom = av.
+# DB_PATH är då en katalogdatabas med competitions och competition_state.
+DB_SHARD_DIR = os.getenv("DB_SHARD_DIR", "")
 
-def init_db():
-    """Skapar databastabellerna om de inte redan finns."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Skapa tabell för tävlingar (with TEXT id for UUIDs)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS competitions (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            description TEXT
-        )
-    """)
-    
+# Shard-filer vars tabeller redan skapats i denna process (så länge filen finns kvar)
+_initialized_shards = set()
+
+
+def _create_result_tables(cursor: sqlite3.Cursor):
+    """Skapar results och submissions med index (i DB_PATH eller en shard)."""
     # Skapa tabell för resultat: användare, tävling, nivå, bästa tid (ms), tidsstämpel
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS results (
@@ -37,15 +39,6 @@ def init_db():
         )
     """)
     
-    # Skapa tabell för tävlingsstatus
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS competition_state (
-            competition_id TEXT PRIMARY KEY,
-            is_active BOOLEAN DEFAULT FALSE,
-            start_time INT DEFAULT 0
-        )
-    """)
-    
     # Skapa tabell för alla inlämningar (för ranking)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS submissions (
@@ -59,6 +52,101 @@ def init_db():
         )
     """)
     
+    # Antal felaktiga svar per användare och nivå (skrivs i batchar, se attempts.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS wrong_attempts (
+            user TEXT NOT NULL,
+            competition_id TEXT NOT NULL,
+            level INT NOT NULL,
+            attempts INT NOT NULL,
+            last_ts INT NOT NULL,
+            PRIMARY KEY (user, competition_id, level)
+        )
+    """)
+    
+    # Index för statistikfrågor per tävling
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submissions_competition_ts ON submissions (competition_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_competition_level ON results (competition_id, level)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_competition_ts ON results (competition_id, ts)")
+    # Slår upp webbsvar per (user, level) för aktiviteten i get_stats
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_submissions_competition_user_level ON submissions (competition_id, user, level)")
+
+
+def shard_path(competition_id: str) -> str:
+    """Sökväg till tävlingens shard-fil i DB_SHARD_DIR."""
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", competition_id)
+    return os.path.join(DB_SHARD_DIR, f"{safe_id}.db")
+
+
+def init_shard(path: str):
+    """Skapar en shard-fil med results och submissions om den inte finns."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    _create_result_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+    _initialized_shards.add(path)
+
+
+def list_shards() -> List[str]:
+    """Alla shard-filer i DB_SHARD_DIR."""
+    if not DB_SHARD_DIR or not os.path.isdir(DB_SHARD_DIR):
+        return []
+    return sorted(os.path.join(DB_SHARD_DIR, name) for name in os.listdir(DB_SHARD_DIR) if name.endswith(".db"))
+
+
+def remove_shards():
+    """Raderar alla shard-filer (används av /reset)."""
+    for path in list_shards():
+        os.remove(path)
+    _initialized_shards.clear()
+
+
+def connect(competition_id: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Anslutning för results/submissions. Med DB_SHARD_DIR satt går varje
+    tävling till sin egen fil, så att tävlingar inte delar SQLite:s skrivlås;
+    annars (eller utan competition_id) används DB_PATH.
+    """
+    return sqlite3.connect(database_path(competition_id))
+
+
+def database_path(competition_id: Optional[str] = None) -> str:
+    """Databasfilen för en tävlings results/submissions (shard eller DB_PATH)."""
+    if DB_SHARD_DIR and competition_id is not None:
+        path = shard_path(competition_id)
+        # /reset i en annan process raderar filen utan att tömma setet i denna process
+        if path not in _initialized_shards or not os.path.exists(path):
+            init_shard(path)
+        return path
+    return DB_PATH
+
+
+def init_db():
+    """Skapar databastabellerna om de inte redan finns."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    # Skapa tabell för tävlingar (with TEXT id for UUIDs)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS competitions (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT
+        )
+    """)
+    
+    # Skapa tabell för tävlingsstatus
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS competition_state (
+            competition_id TEXT PRIMARY KEY,
+            is_active BOOLEAN DEFAULT FALSE,
+            start_time INT DEFAULT 0
+        )
+    """)
+    
+    _create_result_tables(cursor)
+    
     conn.commit()
     conn.close()
 
@@ -96,12 +184,19 @@ def init_competitions(competitions_config: Dict[str, Dict[str, Any]]):
 
 
 def get_active_competition_id() -> Optional[str]:
-    """Hämtar ID för den valda tävlingen (startad eller ej)."""
+    """
+    Hämtar ID för den valda tävlingen (startad eller ej). Med flera startade
+    tävlingar väljs den senast startade (vid lika start_time lägsta id), så
+    att sidor utan /c/<competition_id>/ alltid visar samma tävling.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # Först försök hitta en startad tävling (is_active = TRUE)
-    cursor.execute("SELECT competition_id FROM competition_state WHERE is_active = TRUE LIMIT 1")
+    cursor.execute(
+        "SELECT competition_id FROM competition_state WHERE is_active = TRUE "
+        "ORDER BY start_time DESC, competition_id LIMIT 1"
+    )
     row = cursor.fetchone()
     
     if row:
@@ -110,7 +205,7 @@ def get_active_competition_id() -> Optional[str]:
     
     # Om ingen är startad, kolla om det finns en vald tävling i competition_state
     # (även om den inte är startad)
-    cursor.execute("SELECT competition_id FROM competition_state LIMIT 1")
+    cursor.execute("SELECT competition_id FROM competition_state ORDER BY competition_id LIMIT 1")
     row = cursor.fetchone()
     
     if row:
@@ -128,6 +223,16 @@ def get_active_competition_id() -> Optional[str]:
     return None  # No competition found
 
 
+def get_started_competition_ids() -> List[str]:
+    """Hämtar ID för alla startade tävlingar (flera kan köras parallellt)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT competition_id FROM competition_state WHERE is_active = TRUE ORDER BY competition_id")
+    rows = cursor.fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
 def get_all_competitions() -> List[Dict[str, Any]]:
     """Hämtar alla tillgängliga tävlingar."""
     conn = sqlite3.connect(DB_PATH)
@@ -140,14 +245,8 @@ def get_all_competitions() -> List[Dict[str, Any]]:
     return [{"id": row[0], "name": row[1], "description": row[2]} for row in rows]
 
 
-def save_result(user: str, competition_id: str, level: int, ms: int) -> bool:
-    """
-    Sparar eller uppdaterar resultat om den nya tiden är bättre.
-    Returnerar True om tiden förbättrades eller var första försöket.
-    """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+def _save_result(cursor: sqlite3.Cursor, user: str, competition_id: str, level: int, ms: int, current_ts: int) -> bool:
+    """Sparar ett resultat med en befintlig cursor. Returnerar True om tiden förbättrades."""
     # Hämta nuvarande bästa tid om den finns
     cursor.execute(
         "SELECT best_ms, ts FROM results WHERE user = ? AND competition_id = ? AND level = ?",
@@ -155,28 +254,58 @@ def save_result(user: str, competition_id: str, level: int, ms: int) -> bool:
     )
     existing = cursor.fetchone()
     
-    import time
-    current_ts = int(time.time())
-    
     if existing is None:
         # Första försöket - spara direkt
         cursor.execute(
             "INSERT INTO results (user, competition_id, level, best_ms, ts) VALUES (?, ?, ?, ?, ?)",
             (user, competition_id, level, ms, current_ts)
         )
-        improved = True
+        return True
     elif ms < existing[0]:
         # Ny bättre tid - uppdatera
         cursor.execute(
             "UPDATE results SET best_ms = ?, ts = ? WHERE user = ? AND competition_id = ? AND level = ?",
             (ms, existing[1], user, competition_id, level)  # Behåll original tidsstämpel vid förbättring
         )
-        improved = True
-    else:
-        improved = False
+        return True
+    return False
+
+
+def save_result(user: str, competition_id: str, level: int, ms: int) -> bool:
+    """
+    Sparar eller uppdaterar resultat om den nya tiden är bättre.
+    Returnerar True om tiden förbättrades eller var första försöket.
+    """
+    import time
+    
+    conn = connect(competition_id)
+    cursor = conn.cursor()
+    improved = _save_result(cursor, user, competition_id, level, ms, int(time.time()))
+    conn.commit()
+    conn.close()
+    _progress.mark(user, competition_id, level)
+    if improved:
+        mark_leaderboard_changed(competition_id)
+    return improved
+
+
+def save_results(competition_id: str, results: List[Tuple[str, int, int]]) -> List[bool]:
+    """
+    Sparar flera resultat (user, level, ms) i en och samma transaktion.
+    Returnerar en lista med improved-flaggor i samma ordning som indata.
+    """
+    import time
     
+    current_ts = int(time.time())
+    conn = connect(competition_id)
+    cursor = conn.cursor()
+    improved = [_save_result(cursor, user, competition_id, level, ms, current_ts) for user, level, ms in results]
     conn.commit()
     conn.close()
+    for user, level, _ in results:
+        _progress.mark(user, competition_id, level)
+    if any(improved):
+        mark_leaderboard_changed(competition_id)
     return improved
 
 
@@ -196,7 +325,7 @@ def load_leaderboard(competition_id: Optional[str] = None) -> List[Dict[str, Any
     competition_state = get_competition_state(competition_id)
     start_time = int(competition_state.get("start_time", 0))
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(competition_id)
     cursor = conn.cursor()
     
     # Hämta alla resultat för denna tävling
@@ -280,16 +409,17 @@ def get_competition_state(competition_id: Optional[str] = None) -> Dict[str, Any
     return {"competition_id": competition_id, "is_active": False, "start_time": 0}
 
 
-def set_competition_state(competition_id: str, is_active: bool, start_time: int = 0):
+def set_competition_state(competition_id: str, is_active: bool, start_time: int = 0, exclusive: bool = True):
     """
     Sätter tävlingsstatus för en specifik tävling.
     Om start_time är 0 och raden redan finns, behåller vi det befintliga start_time.
+    Med exclusive=False får andra startade tävlingar fortsätta (parallella spår).
     """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # Om tävlingen ska aktiveras, deaktivera alla andra först
-    if is_active:
+    if is_active and exclusive:
         cursor.execute("UPDATE competition_state SET is_active = FALSE")
     
     # Kontrollera om raden redan finns och hämta befintligt start_time
@@ -317,6 +447,8 @@ def set_competition_state(competition_id: str, is_active: bool, start_time: int
     
     conn.commit()
     conn.close()
+    # start_time avgör tiderna i leaderboarden
+    mark_leaderboard_changed(competition_id)
 
 
 def set_active_competition(competition_id: str):
@@ -326,6 +458,8 @@ def set_active_competition(competition_id: str):
     
     # Ta bort alla icke-startade tävlingar från competition_state
     # (behåll bara startade tävlingar, dvs där is_active = TRUE)
+    cursor.execute("SELECT competition_id FROM competition_state WHERE is_active = FALSE")
+    removed = [row[0] for row in cursor.fetchall()]
     cursor.execute("DELETE FROM competition_state WHERE is_active = FALSE")
     
     # Kontrollera om den valda tävlingen redan finns (och är startad)
@@ -345,38 +479,147 @@ def set_active_competition(competition_id: str):
     
     conn.commit()
     conn.close()
+    # Borttagna rader kan ha haft ett start_time
+    for removed_id in removed:
+        mark_leaderboard_changed(removed_id)
+
+
+def _load_solved_levels(user: str, competition_id: str) -> List[int]:
+    """Lösta nivåer för en användare direkt från results."""
+    conn = connect(competition_id)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT level FROM results WHERE user = ? AND competition_id = ?",
+        (user, competition_id)
+    )
+    levels = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return levels
+
+
+# Lösta nivåer per (user, tävling) som bitmappar, se progress.py
+_progress = progress.ProgressCache(_load_solved_levels, lambda: DB_PATH + ".progress-epoch")
+
+
+def get_solved_levels(user: str, competition_id: str) -> List[int]:
+    """Lösta nivåer för en användare (cachat, normalt utan databasfråga)."""
+    return progress.from_bitmap(_progress.get(user, competition_id))
+
+
+def reset_progress():
+    """Glömmer cachad progress i alla processer (efter att resultat raderats)."""
+    _progress.bump_epoch()
+
+
+def reset_epoch() -> int:
+    """Epokfilens mtime; ändras vid varje /reset, även i andra processer."""
+    try:
+        return os.stat(DB_PATH + ".progress-epoch").st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _changed_path(competition_id: str) -> str:
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", competition_id)
+    return f"{DB_PATH}.changed-{safe_id}"
+
+
+def mark_leaderboard_changed(competition_id: str):
+    """Stämplar att tävlingens leaderboard har ändrats, för cacher i alla processer."""
+    path = _changed_path(competition_id)
+    try:
+        with open(path, "a"):
+            pass
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+    except OSError as e:
+        print(f"⚠️  Warning: Marking leaderboard as changed failed: {e}")
+
+
+def leaderboard_stamp(competition_id: Optional[str]) -> Tuple[int, int]:
+    """
+    (reset-epok, senaste ändring) för tävlingens leaderboard. Läs stämpeln
+    innan leaderboarden läses, så ses en samtidig skrivning vid nästa anrop.
+    """
+    if competition_id is None:
+        return reset_epoch(), 0
+    try:
+        changed = os.stat(_changed_path(competition_id)).st_mtime_ns
+    except OSError:
+        changed = 0
+    return reset_epoch(), changed
 
 
 def has_completed_level(user: str, competition_id: str, level: int) -> bool:
     """Kontrollerar om en användare har slutfört en specifik nivå i en tävling."""
-    conn = sqlite3.connect(DB_PATH)
+    return bool(_progress.get(user, competition_id, level) >> level & 1)
+
+
+def check_answer(answer: str, expected_answer: str, input_type: str = "text") -> bool:
+    """
+    Jämför ett svar med förväntat svar enligt nivåns input_type: text utan
+    hänsyn till versaler, number som exakt sträng. Nivåer med ett answer-objekt
+    jämförs med sin förkompilerade matcher (level["matcher"]) istället.
+    """
+    return answers.default_matcher(expected_answer, input_type)(answer)
+
+
+def _write_wrong_attempts(competition_id: str, rows: List[Tuple[int, str, int, int]]):
+    """Lägger till buffrade felräknare [(level, user, antal, ts)] i en transaktion."""
+    conn = connect(competition_id)
+    cursor = conn.cursor()
+    cursor.executemany(
+        """
+        INSERT INTO wrong_attempts (user, competition_id, level, attempts, last_ts) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user, competition_id, level) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            last_ts = MAX(last_ts, excluded.last_ts)
+        """,
+        [(user, competition_id, level, count, ts) for level, user, count, ts in rows]
+    )
+    conn.commit()
+    conn.close()
+
+
+# Felaktiga svar räknas i minnet och skrivs ut periodiskt, se attempts.py
+_attempts = attempts.AttemptBuffer(_write_wrong_attempts, lambda: DB_PATH + ".progress-epoch")
+
+
+def flush_wrong_attempts() -> int:
+    """Skriver ut buffrade felräknare direkt. Returnerar antal rader."""
+    return _attempts.flush()
+
+
+def reset_wrong_attempts():
+    """Kastar buffrade felräknare (efter att databasen raderats)."""
+    _attempts.clear()
+
+
+def get_wrong_attempts(user: str, competition_id: str, level: int) -> int:
+    """Antal felaktiga svar för en användare på en nivå, inklusive ej utskrivna."""
+    conn = connect(competition_id)
     cursor = conn.cursor()
-    
     cursor.execute(
-        "SELECT COUNT(*) FROM results WHERE user = ? AND competition_id = ? AND level = ?",
+        "SELECT attempts FROM wrong_attempts WHERE user = ? AND competition_id = ? AND level = ?",
         (user, competition_id, level)
     )
-    count = cursor.fetchone()[0]
+    row = cursor.fetchone()
     conn.close()
-    
-    return count > 0
+    return (row[0] if row else 0) + _attempts.pending_count(user, competition_id, level)
 
 
-def submit_answer(user: str, competition_id: str, level: int, answer: str, expected_answer: str, input_type: str = "text") -> bool:
+def submit_answer(user: str, competition_id: str, level: int, answer: str, expected_answer: str, input_type: str = "text",
+                  matcher: Optional[Callable[[str], bool]] = None) -> bool:
     """
     Validerar svar för en nivå och sparar om korrekt.
     Returnerar True om svaret var korrekt.
     
     expected_answer ska skickas in från competitions config.
     input_type ska vara "text" eller "number" från level config.
+    matcher är nivåns förkompilerade matcher; om den anges används den
+    istället för expected_answer/input_type.
     """
-    # Jämför svar baserat på input_type
-    if input_type == "number":
-        # Numeriska svar - exakt matchning (case-sensitive)
-        is_correct = answer.strip() == expected_answer
-    else:
-        # Text-svar - case-insensitive
-        is_correct = answer.strip().lower() == expected_answer.lower()
+    is_correct = matcher(answer) if matcher is not None else check_answer(answer, expected_answer, input_type)
     
     if is_correct:
         # Spara som korrekt resultat
@@ -387,7 +630,7 @@ def submit_answer(user: str, competition_id: str, level: int, answer: str, expec
         save_result(user, competition_id, level, 0)  # 0 ms för webb-baserade svar
         
         # Lägg till i submissions-tabellen
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect(competition_id)
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO submissions (user, competition_id, level, ms, timestamp, is_correct) VALUES (?, ?, ?, ?, ?, ?)",
@@ -395,6 +638,216 @@ def submit_answer(user: str, competition_id: str, level: int, answer: str, expec
         )
         conn.commit()
         conn.close()
+    else:
+        # Bara en räknare i minnet - ingen skrivning på felvägen
+        _attempts.record(user, competition_id, level)
     
     return is_correct
 
+
+def get_stats(competition_id: Optional[str] = None, window_seconds: int = 300) -> Dict[str, Any]:
+    """
+    Hämtar aggregerad statistik för admin-panelen med indexerade aggregatfrågor.
+    Aktiva användare och inlämningar per minut räknas över de senaste window_seconds
+    och omfattar webbsvar (submissions) samt första lösningen per nivå via /update
+    (results.ts) - förbättrade tider via /update sparar ingen tidsstämpel.
+    Andelen fel svar räknas på webbsvar: fel svar (wrong_attempts) delat med alla
+    webbsvar; /update tar bara emot lösta nivåer.
+    """
+    import time
+    
+    if competition_id is None:
+        competition_id = get_active_competition_id()
+    
+    since = int(time.time()) - window_seconds
+    _attempts.flush()
+    
+    conn = connect(competition_id)
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "SELECT level, COUNT(*) FROM results WHERE competition_id = ? GROUP BY level ORDER BY level",
+        (competition_id,)
+    )
+    solves_per_level = {str(level): count for level, count in cursor.fetchall()}
+    
+    cursor.execute("SELECT COUNT(DISTINCT user) FROM results WHERE competition_id = ?", (competition_id,))
+    total_users = cursor.fetchone()[0]
+    
+    cursor.execute("SELECT COUNT(*) FROM submissions WHERE competition_id = ?", (competition_id,))
+    total_submissions = cursor.fetchone()[0]
+    
+    # Webbsvar plus resultat från /update (results utan motsvarande webbsvar)
+    cursor.execute(
+        """
+        SELECT COUNT(*), COUNT(DISTINCT user) FROM (
+            SELECT user FROM submissions WHERE competition_id = ? AND timestamp >= ?
+            UNION ALL
+            SELECT r.user FROM results r
+            WHERE r.competition_id = ? AND r.ts >= ? AND NOT EXISTS (
+                SELECT 1 FROM submissions s
+                WHERE s.competition_id = r.competition_id AND s.user = r.user AND s.level = r.level
+            )
+        )
+        """,
+        (competition_id, since, competition_id, since)
+    )
+    recent_submissions, active_users = cursor.fetchone()
+    
+    cursor.execute(
+        "SELECT level, SUM(attempts) FROM wrong_attempts WHERE competition_id = ? GROUP BY level ORDER BY level",
+        (competition_id,)
+    )
+    wrong_attempts_per_level = {str(level): count for level, count in cursor.fetchall()}
+    
+    # Användare med fel svar på en nivå som de fortfarande inte löst
+    cursor.execute(
+        """
+        SELECT a.level, COUNT(*) FROM wrong_attempts a
+        WHERE a.competition_id = ? AND NOT EXISTS (
+            SELECT 1 FROM results r
+            WHERE r.user = a.user AND r.competition_id = a.competition_id AND r.level = a.level
+        )
+        GROUP BY a.level ORDER BY a.level
+        """,
+        (competition_id,)
+    )
+    stuck_per_level = {str(level): count for level, count in cursor.fetchall()}
+    conn.close()
+    
+    wrong_attempts = sum(wrong_attempts_per_level.values())
+    # submissions innehåller bara korrekta webbsvar, felen finns i wrong_attempts
+    total_answers = total_submissions + wrong_attempts
+    
+    return {
+        "competition_id": competition_id,
+        "total_users": total_users,
+        "active_users": active_users,
+        "total_submissions": total_submissions,
+        "submissions_per_minute": round(recent_submissions * 60 / window_seconds, 2),
+        "solves_per_level": solves_per_level,
+        "completed_levels": sum(solves_per_level.values()),
+        "wrong_answer_rate": round(wrong_attempts / total_answers, 3) if total_answers else 0.0,
+        "wrong_attempts_per_level": wrong_attempts_per_level,
+        "stuck_per_level": stuck_per_level,
+        "window_seconds": window_seconds
+    }
+
+
+# Kolumner och tidskolumn för tabeller som kan exporteras
+EXPORT_TABLES = {
+    "results": (("user", "competition_id", "level", "best_ms", "ts"), "ts"),
+    "submissions": (("id", "user", "competition_id", "level", "ms", "timestamp", "is_correct"), "timestamp"),
+}
+
+
+def iter_export_rows(table: str, competition_id: Optional[str] = None, since: Optional[int] = None,
+                     until: Optional[int] = None, user: Optional[str] = None,
+                     batch_size: int = 1000) -> Iterator[Tuple[Any, ...]]:
+    """
+    Strömmar rader ur results eller submissions i batchar om batch_size rader,
+    så att minnesåtgången är konstant oavsett hur många rader som matchar.
+    Filtren kombineras med AND. Varje batch är en egen kort läsning som
+    fortsätter efter (tid, rowid) för föregående batch, så en långsam
+    nedladdning håller ingen läsning öppen mellan batcharna och blockerar inte
+    skrivare. Rader som sparas under nedladdningen kommer med om de sorteras
+    efter det som redan skickats.
+    """
+    columns, time_column = EXPORT_TABLES[table]
+    
+    conditions = ["competition_id = ?"]
+    params: List[Any] = []
+    if since is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append(until)
+    if user is not None:
+        conditions.append("user = ?")
+        params.append(user)
+    
+    query = f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE " + " AND ".join(conditions)
+    
+    if competition_id is not None:
+        sources = [(database_path(competition_id), competition_id)]
+    else:
+        # Alla tävlingar: en ström per tävling och fil, så att varje ström
+        # kan läsas i tidsordning via (competition_id, tid)-indexet
+        paths = [DB_PATH] + (list_shards() if DB_SHARD_DIR else [])
+        sources = [(path, cid) for path in paths for cid in _competition_ids(path, table)]
+    
+    time_index = columns.index(time_column)
+    streams = [_iter_pages(path, query, [cid] + params, time_column, time_index, batch_size)
+               for path, cid in sources]
+    if len(streams) == 1:
+        yield from streams[0]
+    else:
+        yield from heapq.merge(*streams, key=lambda row: row[time_index])
+
+
+def _competition_ids(path: str, table: str) -> List[str]:
+    """Tävlingar som har rader i table i databasfilen path."""
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute(f"SELECT DISTINCT competition_id FROM {table}")]
+    finally:
+        conn.close()
+
+
+def _iter_pages(path: str, query: str, params: List[Any], time_column: str, time_index: int,
+                batch_size: int) -> Iterator[Tuple[Any, ...]]:
+    """
+    Kör query sida för sida ordnat på (time_column, rowid). query ska välja
+    rowid som första kolumn; den används bara för att fortsätta efter
+    föregående sida och tas bort ur raderna som lämnas ut (time_index räknas
+    i de utlämnade raderna).
+    """
+    order = f" ORDER BY {time_column}, rowid LIMIT ?"
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(query + order, params + [batch_size]).fetchall()
+        while rows:
+            for row in rows:
+                yield row[1:]
+            if len(rows) < batch_size:
+                break
+            last = rows[-1]
+            rows = conn.execute(
+                query + f" AND ({time_column}, rowid) > (?, ?)" + order,
+                params + [last[time_index + 1], last[0], batch_size]
+            ).fetchall()
+    finally:
+        conn.close()
+
+
+def _iter_query(conn: sqlite3.Connection, query: str, params: List[Any], batch_size: int) -> Iterator[Tuple[Any, ...]]:
+    """Strömmar resultatet av query i batchar och stänger anslutningen efteråt."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def iter_solved_levels(competition_id: str, after_rowid: int = 0,
+                       batch_size: int = 1000) -> Iterator[Tuple[int, str, int, int]]:
+    """
+    Strömmar lösta nivåer (rowid, user, level, ts) ur results i den ordning
+    de sparades, från och med rowid > after_rowid. Används av replay.py för att
+    bygga leaderboard-historiken i ett pass och sedan bara läsa det nya.
+    results täcker både /submit och /update; en förbättrad tid ändrar inte
+    ts, så en rad behöver aldrig läsas om.
+    """
+    yield from _iter_query(
+        connect(competition_id),
+        "SELECT rowid, user, level, ts FROM results "
+        "WHERE competition_id = ? AND rowid > ? ORDER BY rowid",
+        [competition_id, after_rowid],
+        batch_size
+    )
@@ -0,0 +1,126 @@
+"""
+Delta-kodade leaderboard-uppdateringar.
+
+Varje gång leaderboarden ser annorlunda ut än förra gången den lästes får
+den ett nytt versionsnummer och en ögonblicksbild sparas (högst
+DELTA_HISTORY stycken). En klient skickar den version den senast såg och
+får bara de rader som ändrats, lagts till eller försvunnit samt nya
+placeringar sedan dess. Är versionen okänd (för gammal, annan tävling,
+omstartad server) eller ändringarna för många skickas hela listan istället.
+
+Versioner har formen "<epok>-<nummer>" där epoken är unik per process, så
+en version från en annan serverprocess aldrig misstas för en egen.
+
+Senaste versionen sparas med databasens ändringsstämpel (db.leaderboard_stamp),
+så att en poll utan skrivningar sedan dess svaras utan att leaderboarden läses.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Antal versioner som går att få delta från
+DELTA_HISTORY = int(os.getenv("DELTA_HISTORY", "50"))
+# Hela listan skickas om mer än denna andel av raderna ändrats
+DELTA_MAX_RATIO = 0.5
+
+
+def _split(leaderboard: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """(rader per användare utan rank, rank per användare)."""
+    rows = {}
+    ranks = {}
+    for rank, entry in enumerate(leaderboard, start=1):
+        rows[entry["user"]] = {key: value for key, value in entry.items() if key != "rank"}
+        ranks[entry["user"]] = rank
+    return rows, ranks
+
+
+class LeaderboardVersions:
+    """Versionshistorik för en tävlings leaderboard."""
+
+    def __init__(self, history: int = DELTA_HISTORY):
+        self.history = history
+        self.epoch = uuid.uuid4().hex[:8]
+        self.competition_id: Optional[str] = None
+        self.counter = 0
+        self.stamp: Optional[Any] = None
+        self.snapshots: "OrderedDict[str, Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return f"{self.epoch}-{self.counter}"
+
+    def is_current(self, competition_id: Optional[str], stamp: Any) -> bool:
+        """True om senaste versionen lästes vid samma ändringsstämpel (inget har skrivits sedan)."""
+        with self._lock:
+            return bool(self.snapshots) and competition_id == self.competition_id and stamp == self.stamp
+
+    def update(self, competition_id: Optional[str], leaderboard: List[Dict[str, Any]], stamp: Any = None) -> str:
+        """
+        Registrerar aktuell leaderboard och returnerar dess version. stamp är
+        ändringsstämpeln som lästes före leaderboarden, se is_current.
+        """
+        snapshot = _split(leaderboard)
+        with self._lock:
+            if competition_id != self.competition_id:
+                # Annan tävling - gamla versioner går inte att bygga delta från
+                self.competition_id = competition_id
+                self.snapshots.clear()
+            self.stamp = stamp
+            if self.snapshots and self.snapshots[self.version] == snapshot:
+                return self.version
+            self.counter += 1
+            self.snapshots[self.version] = snapshot
+            while len(self.snapshots) > self.history:
+                self.snapshots.popitem(last=False)
+            return self.version
+
+    def delta(self, since: Optional[str]) -> Dict[str, Any]:
+        """
+        Ändringarna från version since till senaste versionen:
+        {"version", "full": False, "since", "upsert": [rader med rank], "removed": [användare],
+        "ranks": {användare: rank}}, eller hela listan {"version", "full": True, "rows": [...]}.
+        """
+        with self._lock:
+            version = self.version
+            current_rows, current_ranks = self.snapshots.get(version, ({}, {}))
+            previous = self.snapshots.get(since) if since else None
+
+        if previous is None:
+            return self._full(version, current_rows, current_ranks)
+
+        previous_rows, previous_ranks = previous
+        upsert = [
+            dict(row, rank=current_ranks[user]) for user, row in current_rows.items()
+            if previous_rows.get(user) != row
+        ]
+        removed = [user for user in previous_rows if user not in current_rows]
+        if len(upsert) + len(removed) > DELTA_MAX_RATIO * max(len(current_rows), 1):
+            return self._full(version, current_rows, current_ranks)
+
+        changed = {row["user"] for row in upsert}
+        ranks = {
+            user: rank for user, rank in current_ranks.items()
+            if user not in changed and previous_ranks.get(user) != rank
+        }
+        return {"version": version, "full": False, "since": since, "upsert": upsert, "removed": removed, "ranks": ranks}
+
+    @staticmethod
+    def _full(version: str, rows: Dict[str, Dict[str, Any]], ranks: Dict[str, int]) -> Dict[str, Any]:
+        ordered = sorted(rows, key=ranks.get)
+        return {"version": version, "full": True, "rows": [dict(rows[user], rank=ranks[user]) for user in ordered]}
+
+
+_versions: Dict[Optional[str], LeaderboardVersions] = {}
+_versions_lock = threading.Lock()
+
+
+def get_versions(competition_id: Optional[str]) -> LeaderboardVersions:
+    """Versionshistoriken för en tävling; varje tävling har sin egen."""
+    with _versions_lock:
+        if competition_id not in _versions:
+            _versions[competition_id] = LeaderboardVersions()
+        return _versions[competition_id]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Export av results och submissions som CSV eller JSONL/NDJSON.
+
+Raderna strömmas från en databascursor (db.iter_export_rows) och formateras
+bit för bit, så att även mycket stora exporter körs med konstant minne.
+Används både av /admin/export/<table> i main.py och som CLI:
+
+    python export.py submissions --format csv -o submissions.csv
+    python export.py results --competition <id> --since 2025-03-11T10:00
+    python export.py submissions --url http://127.0.0.1:5000 --api-key <nyckel> -o subs.ndjson
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+from typing import Iterator, Optional
+
+import db
+
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/jsonl",
+    "ndjson": "application/x-ndjson",
+}
+
+# Antal rader som formateras per utskriven bit
+CHUNK_ROWS = 500
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """Tolkar unix-tid i sekunder eller ISO-datum/tid (lokal tid) till unix-tid."""
+    if value is None or value == "":
+        return None
+    if value.lstrip("-").isdigit():
+        return int(value)
+    return int(datetime.datetime.fromisoformat(value).timestamp())
+
+
+def stream_export(table: str, fmt: str = "csv", competition_id: Optional[str] = None,
+                  since: Optional[int] = None, until: Optional[int] = None,
+                  user: Optional[str] = None) -> Iterator[str]:
+    """Genererar exporten som textbitar i valt format."""
+    if table not in db.EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}'")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+    columns, _ = db.EXPORT_TABLES[table]
+    rows = db.iter_export_rows(table, competition_id=competition_id, since=since, until=until, user=user)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    pending = 0
+    for row in rows:
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            buffer.write("\n")
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining
+
+
+def _download(url: str, api_key: str, table: str, params: dict, out):
+    """Strömmar en export från en körande server."""
+    import requests
+
+    response = requests.get(
+        f"{url.rstrip('/')}/admin/export/{table}",
+        params={k: v for k, v in params.items() if v is not None},
+        headers={"X-API-Key": api_key},
+        stream=True,
+        timeout=30
+    )
+    response.raise_for_status()
+    response.encoding = "utf-8"
+    for chunk in response.iter_content(chunk_size=64 * 1024, decode_unicode=True):
+        out.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportera results eller submissions")
+    parser.add_argument("table", choices=sorted(db.EXPORT_TABLES))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--competition", help="Filtrera på competition_id")
+    parser.add_argument("--since", help="Från och med tid (unix-tid eller ISO, t.ex. 2025-03-11T10:00)")
+    parser.add_argument("--until", help="Till (exklusive) tid (unix-tid eller ISO)")
+    parser.add_argument("--user", help="Filtrera på användare")
+    parser.add_argument("-o", "--output", help="Utfil (standard: stdout)")
+    parser.add_argument("--db", default=db.DB_PATH, help="Databasfil vid lokal export")
+    parser.add_argument("--url", help="Hämta från en körande server istället för lokal databas")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"), help="API-nyckel för --url")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.url:
+            _download(args.url, args.api_key, args.table, {
+                "format": args.format,
+                "competition_id": args.competition,
+                "since": args.since,
+                "until": args.until,
+                "user": args.user
+            }, out)
+        else:
+            db.DB_PATH = args.db
+            for chunk in stream_export(args.table, args.format, args.competition,
+                                       parse_time(args.since), parse_time(args.until), args.user):
+                out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Genererade indata per deltagare.
+
+En nivå kan ange en generator i sin config.json istället för en gemensam
+input_file. Generatorn anropas som function(out_path, seed, **options),
+skriver indatan direkt till out_path (strömmande, så även stora filer som
+syntetiska CAN-loggar går i konstant minne) och returnerar svaret - eller
+{nivå: svar} när flera nivåer räknas på samma indata. Seeden härleds
+deterministiskt från INPUT_SECRET, tävling, nivå och användarnamn, så samma
+deltagare alltid får samma fil och samma svar.
+
+Genererade filer och svar cachas på disk under INPUT_CACHE_DIR (högst
+INPUT_CACHE_SIZE indata, de minst nyligen använda tas bort) och svaren
+dessutom i en LRU i minnet, så att /download och svarskontroll normalt inte
+genererar något. Vid inloggning genereras deltagarens indata i förväg i en
+bakgrundstråd; en samtidig nedladdning väntar då in samma generering.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import publish
+
+
+INPUT_CACHE_DIR = os.getenv("INPUT_CACHE_DIR", "generated_inputs")
+# Antal genererade indata som behålls på disk (och vars svar hålls i minnet)
+INPUT_CACHE_SIZE = int(os.getenv("INPUT_CACHE_SIZE", "256"))
+# Hemlighet som blandas in i seeden så att deltagare inte kan räkna fram andras indata
+INPUT_SECRET = os.getenv("INPUT_SECRET", "")
+# Trådar för generering i förväg vid inloggning
+INPUT_WORKERS = int(os.getenv("INPUT_WORKERS", "2"))
+
+Key = Tuple[str, int, str]      # (competition_id, nivå med generatorn, user)
+
+_ANSWERS_SUFFIX = ".answers.json"
+
+
+def seed_for(competition_id: str, level_id: int, user: str) -> int:
+    """Deterministisk seed för en deltagares indata på en nivå."""
+    digest = hashlib.sha256(f"{INPUT_SECRET}\0{competition_id}\0{level_id}\0{user}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+_hooks: Dict[Tuple[str, str], Callable[..., Any]] = {}
+_hooks_lock = threading.Lock()
+
+
+def load_hook(path: str, function: str) -> Callable[..., Any]:
+    """Importerar generatorfunktionen (en gång per process). Filens katalog läggs i sys.path."""
+    with _hooks_lock:
+        key = (path, function)
+        if key not in _hooks:
+            directory = os.path.dirname(path)
+            if directory not in sys.path:
+                sys.path.insert(0, directory)
+            module_name = "input_generator_" + hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _hooks[key] = getattr(module, function)
+        return _hooks[key]
+
+
+def generated_level(competition: Dict[str, Any], level_id: int) -> Optional[int]:
+    """Nivån vars generator skapar indatan för level_id, eller None om nivån inte genereras."""
+    level = competition["levels"].get(level_id)
+    return level.get("generated_by") if level else None
+
+
+class InputCache:
+    """Genererade (indata, svar) per (tävling, nivå, användare) på disk med svaren i en LRU."""
+
+    def __init__(self, directory: str = INPUT_CACHE_DIR, size: int = INPUT_CACHE_SIZE):
+        self.directory = directory
+        self.size = size
+        self.entries: "OrderedDict[Key, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Key, threading.Lock] = {}
+
+    def paths(self, key: Key) -> Tuple[str, str]:
+        """(indatafil, svarsfil) för en nyckel."""
+        competition_id, level_id, user = key
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", competition_id)
+        safe_user = re.sub(r"[^A-Za-z0-9_-]", "_", user)
+        # Hash av användarnamnet skiljer namn som blir lika efter ersättningen
+        name = f"{safe_user}-{hashlib.sha1(user.encode('utf-8')).hexdigest()[:8]}"
+        input_path = os.path.join(self.directory, safe_id, str(level_id), name)
+        return input_path, input_path + _ANSWERS_SUFFIX
+
+    def get(self, key: Key, generator: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+        """(sökväg till indatan, {nivå: svar}). Genererar bara om indatan saknas."""
+        input_path, answers_path = self.paths(key)
+        with self._lock:
+            answers = self.entries.get(key)
+            if answers is not None and os.path.exists(input_path):
+                self.entries.move_to_end(key)
+                self._touch(answers_path)
+                return input_path, answers
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Samma deltagare genereras aldrig två gånger samtidigt
+        with key_lock:
+            answers = self._read(input_path, answers_path)
+            if answers is None:
+                answers = self._generate(key, generator, input_path, answers_path)
+            with self._lock:
+                self._key_locks.pop(key, None)
+                self.entries[key] = answers
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return input_path, answers
+
+    @staticmethod
+    def _touch(path: str):
+        # mtime på svarsfilen är senaste användning, för rensningen på disk
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _read(self, input_path: str, answers_path: str) -> Optional[Dict[str, str]]:
+        """Svaren från disk om både indata och svar finns (t.ex. från en annan process)."""
+        if not os.path.exists(input_path):
+            return None
+        try:
+            with open(answers_path, "r", encoding="utf-8") as f:
+                answers = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(answers_path)
+        return answers
+
+    def _generate(self, key: Key, generator: Dict[str, Any], input_path: str, answers_path: str) -> Dict[str, str]:
+        competition_id, level_id, user = key
+        os.makedirs(os.path.dirname(input_path), exist_ok=True)
+        hook = load_hook(generator["path"], generator["function"])
+
+        # Generatorn skriver till en temporär fil - en läsare ser aldrig en halv indata
+        tmp_path = f"{input_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            result = hook(tmp_path, seed_for(competition_id, level_id, user), **generator.get("options", {}))
+            os.replace(tmp_path, input_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if isinstance(result, dict):
+            answers = {str(level): str(answer) for level, answer in result.items() if answer is not None}
+        else:
+            answers = {str(level_id): str(result)}
+        publish.write_atomic(answers_path, json.dumps(answers))
+        self.prune()
+        return answers
+
+    def prune(self):
+        """Tar bort de minst nyligen använda indata på disk utöver size."""
+        stored = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(_ANSWERS_SUFFIX):
+                    answers_path = os.path.join(root, filename)
+                    try:
+                        stored.append((os.stat(answers_path).st_mtime, answers_path))
+                    except OSError:
+                        continue
+        stored.sort()
+        for _, answers_path in stored[:max(len(stored) - self.size, 0)]:
+            for path in (answers_path[:-len(_ANSWERS_SUFFIX)], answers_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_cache = InputCache()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_input(competition_id: str, competition: Dict[str, Any], level_id: int, user: str) -> Tuple[str, Dict[str, str]]:
+    """(indatafil, {nivå: svar}) för deltagarens genererade indata till level_id."""
+    source_level = generated_level(competition, level_id)
+    generator = competition["levels"][source_level]["generator"]
+    return _cache.get((competition_id, source_level, user), generator)
+
+
+def get_expected_answer(competition_id: str, competition: Dict[str, Any], level_id: int, user: str) -> Optional[str]:
+    """Deltagarens svar på level_id, eller None om nivån inte har genererad indata."""
+    if generated_level(competition, level_id) is None:
+        return None
+    _, answers = get_input(competition_id, competition, level_id, user)
+    return answers.get(str(level_id))
+
+
+def _prewarm_one(competition_id: str, competition: Dict[str, Any], level_id: int, user: str):
+    try:
+        get_input(competition_id, competition, level_id, user)
+    except Exception as e:
+        print(f"⚠️  Warning: Generating input for '{user}' (level {level_id}) failed: {e}")
+
+
+def prewarm(competition_id: str, competition: Dict[str, Any], user: str):
+    """Genererar deltagarens indata för tävlingens alla generatornivåer i bakgrunden."""
+    global _executor
+    levels = [level_id for level_id, level in competition["levels"].items() if "generator" in level]
+    if not levels:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=INPUT_WORKERS, thread_name_prefix="input-prewarm")
+    for level_id in levels:
+        _executor.submit(_prewarm_one, competition_id, competition, level_id, user)
@@ -2,15 +2,24 @@
 Flask-server för leaderboard och resultathantering.
 Sätter upp API-endpoints för att visa leaderboard och ta emot resultat.
 """
+import json
 import os
 import socket
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from .env file
 
-from flask import Flask, jsonify, request, send_from_directory, session, redirect, url_for, render_template
+from flask import Flask, jsonify, request, send_from_directory, send_file, session, redirect, url_for, render_template, Response, stream_with_context, g, abort
 import db
 import competition_loader
 import translations
+import export
+import backup
+import replay
+import publish
+import delta
+import answers
+import inputs
+import ratelimit
 import re
 
 app = Flask(__name__)
@@ -24,6 +33,16 @@ app.secret_key = os.getenv("SECRET_KEY", "change_this_secret_key_in_production")
 # Load competitions dynamically from folder structure
 COMPETITIONS = competition_loader.load_competitions()
 
+# Språk för den publicerade leaderboard-sidan (se publish.py)
+PUBLISH_LANG = os.getenv("PUBLISH_LANG", "sv")
+
+# Mappnamnet (t.ex. vbg-coupling-safety) fungerar som alias för competition_id i /c/<competition_id>/...
+COMPETITION_ALIASES = {
+    competition["folder_name"]: competition_id
+    for competition_id, competition in COMPETITIONS.items()
+    if competition.get("folder_name")
+}
+
 
 def get_current_language():
     """Get current language from session, default to Swedish."""
@@ -117,6 +136,89 @@ def markdown_to_html(text):
     return '\n'.join(result_lines)
 
 
+def resolve_competition_id(competition_id=None):
+    """
+    Tävlingen en förfrågan gäller: angivet id eller mappnamn, annars den aktiva
+    tävlingen. Returnerar None om en angiven tävling inte finns.
+    """
+    if competition_id is None:
+        return db.get_active_competition_id()
+    if competition_id in COMPETITIONS:
+        return competition_id
+    return COMPETITION_ALIASES.get(competition_id)
+
+
+@app.url_value_preprocessor
+def pull_competition_scope(endpoint, values):
+    """
+    Förfrågningar under /c/<competition_id>/ gäller en bestämd tävling (parallella spår).
+    Vyn får det riktiga id:t och g kommer ihåg prefixet för url_for.
+    """
+    if request.url_rule is None or not request.url_rule.rule.startswith("/c/") or not values:
+        return
+    competition_id = resolve_competition_id(values["competition_id"])
+    if competition_id is None:
+        abort(404)
+    g.competition_scope = values["competition_id"]
+    g.competition_id = competition_id
+    values["competition_id"] = competition_id
+
+
+@app.url_defaults
+def add_competition_scope(endpoint, values):
+    """Länkar från en sida under /c/<competition_id>/ stannar i samma tävling."""
+    scope = g.get("competition_scope")
+    if scope and "competition_id" not in values and app.url_map.is_endpoint_expecting(endpoint, "competition_id"):
+        values["competition_id"] = scope
+
+
+_background_started = False
+
+
+@app.before_request
+def start_background_tasks():
+    """
+    Startar schemalagd backup (BACKUP_INTERVAL) och publiceringen av
+    leaderboarden (PUBLISH_DIR) i processen som serverar den första
+    förfrågan - med debug-reloadern barnprocessen, under en WSGI-server varje
+    worker. backup.py och publish.py låter bara en av processerna skriva.
+    """
+    global _background_started
+    if _background_started:
+        return None
+    _background_started = True
+    if backup.start_scheduler():
+        print(f"💾 Backup var {backup.BACKUP_INTERVAL}:e sekund till {backup.BACKUP_DIR}/")
+    if publish.start(render_published_leaderboard):
+        print(f"📰 Leaderboard publiceras till {publish.PUBLISH_DIR}/")
+    return None
+
+
+def _rate_limit_key():
+    """
+    Inloggad användare, annars API-nyckeln plus klientens IP. Inte "user" i
+    JSON-kroppen - den väljer klienten själv och kunde ge en ny hink per anrop.
+    """
+    if 'username' in session:
+        return f"user:{session['username']}"
+    return f"key:{request.headers.get('X-API-Key', '')}:{request.remote_addr}"
+
+
+@app.before_request
+def enforce_rate_limit():
+    """Stryper /submit, /update m.fl. enligt RATE_LIMITS innan någon databasåtkomst sker."""
+    limiter = ratelimit.get_limiter()
+    if request.endpoint not in limiter.limits:
+        return None
+    allowed, retry_after = limiter.take(request.endpoint, _rate_limit_key())
+    if allowed:
+        return None
+    headers = {"Retry-After": str(max(int(retry_after + 0.999), 1))}
+    if request.is_json:
+        return jsonify({"error": t('errors', 'rate_limited')}), 429, headers
+    return t('errors', 'rate_limited'), 429, headers
+
+
 @app.template_filter('markdown')
 def markdown_filter(text):
     """Jinja2 filter for markdown conversion."""
@@ -130,13 +232,16 @@ def inject_competition_data():
     translations_dict = translations.get_translations(lang)
     
     try:
-        competition_id = db.get_active_competition_id()
+        competition_id = resolve_competition_id(g.get("competition_id"))
         if competition_id and competition_id in COMPETITIONS:
             competition = COMPETITIONS[competition_id]
             max_level = max(competition["levels"].keys()) if competition["levels"] else 0
+            # Lösta nivåer för navigeringen, ur progress-cachen (ingen databasfråga i normalfallet)
+            solved_levels = db.get_solved_levels(session['username'], competition_id) if 'username' in session else []
             return {
                 "competition": competition,
                 "max_level": max_level,
+                "solved_levels": solved_levels,
                 "competition_id": competition_id,
                 "t": lambda category, key, *args: translations.t(lang, category, key, *args),
                 "translations": translations_dict,
@@ -149,6 +254,7 @@ def inject_competition_data():
     return {
         "competition": None,
         "max_level": 0,
+        "solved_levels": [],
         "competition_id": None,
         "t": lambda category, key, *args: translations.t(lang, category, key, *args),
         "translations": translations_dict,
@@ -174,15 +280,18 @@ def index():
 
 
 @app.route("/login", methods=['GET', 'POST'])
-def login():
+@app.route("/c/<competition_id>/login", methods=['GET', 'POST'])
+def login(competition_id=None):
     """Login-sida för användare."""
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
         if username and username.isalnum():
             session['username'] = username
             # Redirect to competition intro instead of directly to level 1
-            competition_id = db.get_active_competition_id()
+            competition_id = resolve_competition_id(competition_id)
             if competition_id and competition_id in COMPETITIONS:
+                # Generera deltagarens indata medan intro-sidan läses
+                inputs.prewarm(competition_id, COMPETITIONS[competition_id], username)
                 return redirect(url_for('competition_intro'))
             else:
                 return redirect(url_for('leaderboard'))
@@ -200,7 +309,8 @@ def logout():
 
 
 @app.route("/level/<int:level_id>")
-def level(level_id):
+@app.route("/c/<competition_id>/level/<int:level_id>")
+def level(level_id, competition_id=None):
     """Visar problem för en specifik nivå."""
     if 'username' not in session:
         return redirect(url_for('login'))
@@ -209,7 +319,7 @@ def level(level_id):
         return redirect(url_for('leaderboard'))
     
     username = session['username']
-    competition_id = db.get_active_competition_id()
+    competition_id = resolve_competition_id(competition_id)
     
     # Kontrollera att tävlingen finns
     if not competition_id or competition_id not in COMPETITIONS:
@@ -237,7 +347,8 @@ def level(level_id):
 
 
 @app.route("/submit/<int:level_id>", methods=['POST'])
-def submit(level_id):
+@app.route("/c/<competition_id>/submit/<int:level_id>", methods=['POST'])
+def submit(level_id, competition_id=None):
     """Hanterar svar för en nivå."""
     if 'username' not in session:
         return redirect(url_for('login'))
@@ -246,7 +357,7 @@ def submit(level_id):
         return redirect(url_for('leaderboard'))
     
     username = session['username']
-    competition_id = db.get_active_competition_id()
+    competition_id = resolve_competition_id(competition_id)
     
     # Kontrollera att tävlingen finns
     if not competition_id or competition_id not in COMPETITIONS:
@@ -282,9 +393,16 @@ def submit(level_id):
     # Validera svar med expected_answer från competition config
     expected_answer = problem.get("expected_answer", "")
     input_type = problem.get("input_type", "text")
-    is_correct = db.submit_answer(username, competition_id, level_id, answer, expected_answer, input_type)
+    matcher = problem.get("matcher")
+    if inputs.generated_level(competition, level_id) is not None:
+        # Deltagarens eget svar, jämfört enligt nivåns answer-objekt
+        expected_answer = inputs.get_expected_answer(competition_id, competition, level_id, username) or ""
+        matcher = answers.compile_generated_matcher(expected_answer, input_type, problem.get("answer"))
+    is_correct = db.submit_answer(username, competition_id, level_id, answer, expected_answer, input_type, matcher=matcher)
     
     if is_correct:
+        publish.notify()
+        
         # Bestäm nästa nivå eller leaderboard
         max_level = max(competition["levels"].keys())
         if level_id < max_level:
@@ -312,12 +430,13 @@ def submit(level_id):
 
 
 @app.route("/competition/intro")
-def competition_intro():
+@app.route("/c/<competition_id>/intro")
+def competition_intro(competition_id=None):
     """Visar tävlingsintroduktion med Summary.md innehåll."""
     if 'username' not in session:
         return redirect(url_for('login'))
     
-    competition_id = db.get_active_competition_id()
+    competition_id = resolve_competition_id(competition_id)
     
     # Kontrollera att tävlingen finns
     if not competition_id or competition_id not in COMPETITIONS:
@@ -332,31 +451,182 @@ def competition_intro():
                          competition_id=competition_id)
 
 
-@app.route("/leaderboard")
-def leaderboard():
-    """Visar leaderboard."""
-    leaderboard_data = db.load_leaderboard()
-    competition_id = db.get_active_competition_id()
-    max_level = 0
+def _max_level(competition_id):
+    """Högsta nivån i en tävling, 0 om tävlingen saknas."""
     if competition_id and competition_id in COMPETITIONS:
         competition = COMPETITIONS[competition_id]
-        max_level = max(competition["levels"].keys()) if competition["levels"] else 0
-    return render_template('leaderboard.html', leaderboard=leaderboard_data, max_level=max_level)
+        return max(competition["levels"].keys()) if competition["levels"] else 0
+    return 0
 
 
-@app.route("/api/leaderboard")
-def api_leaderboard():
-    """Returnerar leaderboard som JSON."""
-    leaderboard_data = db.load_leaderboard()
-    competition_id = db.get_active_competition_id()
-    max_level = 0
-    if competition_id and competition_id in COMPETITIONS:
-        competition = COMPETITIONS[competition_id]
-        max_level = max(competition["levels"].keys()) if competition["levels"] else 0
+def _load_leaderboard(competition_id=None):
+    """Hämtar (leaderboard, max_level) för en tävling (standard: aktiv tävling)."""
+    competition_id = resolve_competition_id(competition_id)
+    return db.load_leaderboard(competition_id), _max_level(competition_id)
+
+
+def _leaderboard_json(leaderboard_data, max_level):
+    """JSON-listan som /api/leaderboard returnerar."""
     # Returnera array för bakåtkompatibilitet, men lägg till max_level i varje entry
     for entry in leaderboard_data:
         entry["max_level_total"] = max_level
-    return jsonify(leaderboard_data)
+    return leaderboard_data
+
+
+@app.route("/leaderboard")
+@app.route("/c/<competition_id>/leaderboard")
+def leaderboard(competition_id=None):
+    """Visar leaderboard."""
+    leaderboard_data, max_level = _load_leaderboard(competition_id)
+    return render_template('leaderboard.html', leaderboard=leaderboard_data, max_level=max_level)
+
+
+@app.route("/api/leaderboard")
+@app.route("/c/<competition_id>/api/leaderboard")
+def api_leaderboard(competition_id=None):
+    """Returnerar leaderboard som JSON."""
+    return jsonify(_leaderboard_json(*_load_leaderboard(competition_id)))
+
+
+@app.route("/api/leaderboard/delta")
+@app.route("/c/<competition_id>/api/leaderboard/delta")
+def api_leaderboard_delta(competition_id=None):
+    """
+    Returnerar bara ändringarna i leaderboarden sedan versionen since.
+    Utan since, eller om versionen är för gammal, returneras hela listan (full: true).
+    Leaderboarden läses bara från databasen när något skrivits sedan förra versionen.
+    """
+    competition_id = resolve_competition_id(competition_id)
+    versions = delta.get_versions(competition_id)
+    stamp = db.leaderboard_stamp(competition_id)
+    if not versions.is_current(competition_id, stamp):
+        versions.update(competition_id, db.load_leaderboard(competition_id), stamp)
+    payload = versions.delta(request.args.get("since"))
+    payload["max_level_total"] = _max_level(competition_id)
+    return jsonify(payload)
+
+
+def _render_published_files(competition_id=None, scope=None, links=()):
+    """
+    leaderboard.html och leaderboard.json för en tävling (standard: aktiv tävling).
+    links är sidornas navigering [(namn eller None för leaderboarden, sökväg
+    relativt publiceringskatalogen)]; länkarna görs relativa till sidan.
+    """
+    leaderboard_data, max_level = _load_leaderboard(competition_id)
+    prefix = "../" * (scope.count("/") + 1) if scope else ""
+    published_links = [{"name": name, "href": prefix + path} for name, path in links]
+    with app.test_request_context(f"/c/{scope}/leaderboard" if scope else "/leaderboard"):
+        session['language'] = PUBLISH_LANG
+        if scope:
+            g.competition_scope = scope
+            g.competition_id = competition_id
+        html = render_template('leaderboard.html', leaderboard=leaderboard_data, max_level=max_level,
+                               api_url="leaderboard.json", published_links=published_links)
+        payload = json.dumps(_leaderboard_json(leaderboard_data, max_level), ensure_ascii=False)
+    return html, payload
+
+
+def render_published_leaderboard():
+    """
+    Renderar leaderboard-sidan och JSON-svaret för publish.py: aktiv tävling i
+    roten och varje startad tävling i en underkatalog med tävlingens mappnamn.
+    Sidorna hämtar sina uppdateringar från leaderboard.json bredvid sig själva
+    och länkar bara till varandra, inte till appen.
+    """
+    scopes = []
+    for competition_id in db.get_started_competition_ids():
+        if competition_id not in COMPETITIONS:
+            continue
+        scope = COMPETITIONS[competition_id].get("folder_name") or competition_id
+        scopes.append((competition_id, scope))
+    links = [(None, "leaderboard.html")]
+    links += [(COMPETITIONS[competition_id]["name"], f"{scope}/leaderboard.html") for competition_id, scope in scopes]
+
+    html, payload = _render_published_files(links=links)
+    files = {"leaderboard.html": html, "leaderboard.json": payload}
+    for competition_id, scope in scopes:
+        html, payload = _render_published_files(competition_id, scope, links)
+        files[f"{scope}/leaderboard.html"] = html
+        files[f"{scope}/leaderboard.json"] = payload
+    return files
+
+
+@app.route("/published/<path:filename>")
+def published(filename):
+    """Serverar de publicerade leaderboard-filerna med cache-headers."""
+    if not publish.PUBLISH_DIR:
+        return t('errors', 'file_not_found'), 404
+    return send_from_directory(os.path.abspath(publish.PUBLISH_DIR), filename, max_age=publish.PUBLISH_MAX_AGE)
+
+
+@app.route("/api/leaderboard/replay")
+@app.route("/c/<competition_id>/api/leaderboard/replay")
+def api_leaderboard_replay(competition_id=None):
+    """
+    Returnerar leaderboarden som den såg ut vid tidpunkten t (unix-tid eller ISO).
+    Utan t returneras ställningen efter sista lösta nivån. Byggs ur results,
+    så både /submit och /update ingår.
+    Query-parametrar: t, competition_id.
+    """
+    competition_id = competition_id or resolve_competition_id(request.args.get("competition_id"))
+    if competition_id is None:
+        return jsonify({"error": t('errors', 'invalid_competition')}), 400
+    replay_data = replay.get_replay(competition_id)
+
+    try:
+        at = export.parse_time(request.args.get("t"))
+    except ValueError as e:
+        return jsonify({"error": t('errors', 'invalid_time_parameter', str(e))}), 400
+
+    start_time, end_time = replay_data.time_range()
+    if at is None:
+        at = end_time or 0
+
+    return jsonify({
+        "competition_id": replay_data.competition_id,
+        "t": at,
+        "start_time": start_time,
+        "end_time": end_time,
+        "leaderboard": replay_data.standings_at(at)
+    })
+
+
+@app.route("/api/leaderboard/timeline")
+@app.route("/c/<competition_id>/api/leaderboard/timeline")
+def api_leaderboard_timeline(competition_id=None):
+    """
+    Returnerar rankändringar över tid per användare: {"users": {user: [[ts, rank], ...]}}.
+    Query-parametrar: user, competition_id.
+    """
+    competition_id = competition_id or resolve_competition_id(request.args.get("competition_id"))
+    if competition_id is None:
+        return jsonify({"error": t('errors', 'invalid_competition')}), 400
+    replay_data = replay.get_replay(competition_id)
+
+    start_time, end_time = replay_data.time_range()
+    return jsonify({
+        "competition_id": replay_data.competition_id,
+        "start_time": start_time,
+        "end_time": end_time,
+        "users": replay_data.timeline(request.args.get("user"))
+    })
+
+
+@app.route("/api/admin/stats")
+@app.route("/c/<competition_id>/api/admin/stats")
+def api_admin_stats(competition_id=None):
+    """Returnerar aggregerad statistik för admin-panelen. Kräver X-API-Key header."""
+    api_key_header = request.headers.get("X-API-Key")
+    if api_key_header != API_KEY:
+        return jsonify({"error": t('errors', 'invalid_api_key_error')}), 403
+    
+    window_seconds = request.args.get("window", 300, type=int)
+    if window_seconds < 1:
+        window_seconds = 300
+    
+    stats = db.get_stats(competition_id, window_seconds=window_seconds)
+    stats["throttled"] = ratelimit.get_limiter().throttled()
+    return jsonify(stats)
 
 
 @app.route("/download/<string:competition_id>/<int:level_id>/<filename>")
@@ -388,6 +658,13 @@ def download_input_file(competition_id, level_id, filename):
     if ".." in filename or "/" in filename or "\\" in filename:
         return t('errors', 'invalid_filename'), 403
     
+    # Genererad indata: deltagarens egen fil ur cachen (genereras bara om den saknas)
+    if inputs.generated_level(competition, level_id) is not None:
+        if 'username' not in session:
+            return redirect(url_for('login'))
+        input_path, _ = inputs.get_input(competition_id, competition, level_id, session['username'])
+        return send_file(os.path.abspath(input_path), as_attachment=True, download_name=filename)
+    
     # Konstruera sökväg till filen (use folder_name from competition)
     from pathlib import Path
     competitions_dir = Path("competitions")
@@ -468,6 +745,8 @@ def admin():
     competition_state = db.get_competition_state(active_competition_id)
     all_competitions = db.get_all_competitions()
     
+    started_ids = set(db.get_started_competition_ids())
+    
     # Lägg till competition info från COMPETITIONS config
     competitions_with_info = []
     for comp in all_competitions:
@@ -475,6 +754,7 @@ def admin():
         comp_info = COMPETITIONS.get(comp_id, {})
         comp["config"] = comp_info
         comp["is_active"] = (comp_id == active_competition_id)
+        comp["is_started"] = comp_id in started_ids
         competitions_with_info.append(comp)
     
     # Formatera start_time till läsbart format om tävlingen är aktiv
@@ -492,31 +772,45 @@ def admin():
 
 
 @app.route("/admin/start", methods=["POST"])
-def admin_start():
-    """Startar den aktiva tävlingen."""
+@app.route("/c/<competition_id>/admin/start", methods=["POST"])
+def admin_start(competition_id=None):
+    """
+    Startar den aktiva tävlingen. Under /c/<competition_id>/ startas just den
+    tävlingen utan att andra startade tävlingar stoppas.
+    """
     api_key_header = request.headers.get("X-API-Key")
     if api_key_header != API_KEY:
         return jsonify({"error": t('errors', 'invalid_api_key_error')}), 403
     
-    competition_id = db.get_active_competition_id()
+    exclusive = competition_id is None
+    competition_id = resolve_competition_id(competition_id)
     if not competition_id:
         return jsonify({"error": t('errors', 'no_active_competition')}), 400
     
     import time
     start_time = int(time.time())
-    db.set_competition_state(competition_id, True, start_time)
+    db.set_competition_state(competition_id, True, start_time, exclusive=exclusive)
+    publish.notify()
     
     return jsonify({"success": True, "message": t('errors', 'competition_started')})
 
 
 @app.route("/admin/stop", methods=["POST"])
-def admin_stop():
-    """Stoppar den aktiva tävlingen."""
+@app.route("/c/<competition_id>/admin/stop", methods=["POST"])
+def admin_stop(competition_id=None):
+    """
+    Stoppar den aktiva tävlingen (eller tävlingen i /c/<competition_id>/).
+    Utan /c/<competition_id>/ och med flera pågående tävlingar blir det 409.
+    """
     api_key_header = request.headers.get("X-API-Key")
     if api_key_header != API_KEY:
         return jsonify({"error": t('errors', 'invalid_api_key_error')}), 403
     
-    competition_id = db.get_active_competition_id()
+    if competition_id is None:
+        ambiguous = _ambiguous_competition_error()
+        if ambiguous:
+            return ambiguous
+    competition_id = resolve_competition_id(competition_id)
     if not competition_id:
         return jsonify({"error": t('errors', 'no_active_competition')}), 400
     
@@ -524,6 +818,7 @@ def admin_stop():
     current_state = db.get_competition_state(competition_id)
     existing_start_time = current_state.get("start_time", 0)
     db.set_competition_state(competition_id, False, existing_start_time)
+    publish.notify()
     
     return jsonify({"success": True, "message": t('errors', 'competition_stopped')})
 
@@ -547,12 +842,127 @@ def admin_set_active_competition():
     
     # Sätt som aktiv
     db.set_active_competition(competition_id)
+    publish.notify()
     
     return jsonify({"success": True, "message": t('errors', 'competition_set', competition_id)})
 
 
+def _validate_result(competition_id, level, ms):
+    """Validerar ett inskickat resultat. Returnerar felnyckel i 'errors' eller None."""
+    # Validera att nivå och tid är positiva
+    if not isinstance(level, int) or level < 1:
+        return 'invalid_level'
+    
+    if not isinstance(ms, int) or ms < 0:
+        return 'invalid_time'
+    
+    if level not in COMPETITIONS[competition_id]["levels"]:
+        return 'level_not_in_competition'
+    
+    return None
+
+
+def _ambiguous_competition_error():
+    """
+    409-svar för en skrivning utan /c/<competition_id>/ när flera tävlingar
+    pågår, med URL:en per startad tävling. None om högst en tävling pågår.
+    """
+    started_ids = [cid for cid in db.get_started_competition_ids() if cid in COMPETITIONS]
+    if len(started_ids) <= 1:
+        return None
+    urls = {
+        cid: url_for(request.endpoint, competition_id=COMPETITIONS[cid].get("folder_name") or cid,
+                     **(request.view_args or {}))
+        for cid in started_ids
+    }
+    return jsonify({"error": t('errors', 'ambiguous_competition', ", ".join(urls.values())),
+                    "competitions": urls}), 409
+
+
+def _get_accepting_competition(competition_id=None):
+    """
+    Hämtar tävlingen (standard: aktiv tävling) om den tar emot resultat.
+    Utan competition_id och med flera pågående tävlingar blir det 409 istället
+    för att resultatet hamnar i en godtycklig av dem.
+    Returnerar (competition_id, None) eller (None, (felsvar, statuskod)).
+    """
+    if competition_id is None:
+        ambiguous = _ambiguous_competition_error()
+        if ambiguous:
+            return None, ambiguous
+    competition_id = resolve_competition_id(competition_id)
+    
+    # Kontrollera att tävlingen är aktiv
+    if not competition_id:
+        return None, (jsonify({"error": t('errors', 'no_active_competition')}), 400)
+    
+    competition_state = db.get_competition_state(competition_id)
+    if not competition_state.get("is_active", False):
+        return None, (jsonify({"error": t('errors', 'competition_inactive')}), 403)
+    
+    # Kontrollera att tävlingen finns
+    if competition_id not in COMPETITIONS:
+        return None, (jsonify({"error": t('errors', 'competition_not_found')}), 400)
+    
+    return competition_id, None
+
+
+@app.route("/admin/backup", methods=["POST"])
+def admin_backup():
+    """Tar en online-backup av databasen direkt. Kräver X-API-Key header."""
+    api_key_header = request.headers.get("X-API-Key")
+    if api_key_header != API_KEY:
+        return jsonify({"error": t('errors', 'invalid_api_key_error')}), 403
+    
+    path = backup.create_backup("manual")
+    if path is None:
+        return jsonify({"error": t('errors', 'no_database')}), 400
+    
+    return jsonify({
+        "success": True,
+        "message": t('errors', 'backup_created', os.path.basename(path)),
+        "backups": [os.path.basename(p) for p in backup.list_backups()]
+    })
+
+
+@app.route("/admin/export/<string:table>")
+def admin_export(table):
+    """
+    Strömmar results eller submissions som CSV/JSONL/NDJSON. Kräver X-API-Key header.
+    Query-parametrar: format, competition_id, since, until (unix-tid eller ISO), user.
+    """
+    api_key_header = request.headers.get("X-API-Key")
+    if api_key_header != API_KEY:
+        return jsonify({"error": t('errors', 'invalid_api_key_error')}), 403
+    
+    fmt = request.args.get("format", "csv")
+    if table not in db.EXPORT_TABLES or fmt not in export.FORMATS:
+        return jsonify({"error": t('errors', 'invalid_export_request', f"{table}/{fmt}")}), 400
+    
+    try:
+        since = export.parse_time(request.args.get("since"))
+        until = export.parse_time(request.args.get("until"))
+    except ValueError as e:
+        return jsonify({"error": t('errors', 'invalid_export_request', str(e))}), 400
+    
+    chunks = export.stream_export(
+        table, fmt,
+        competition_id=request.args.get("competition_id"),
+        since=since,
+        until=until,
+        user=request.args.get("user")
+    )
+    filename = f"{table}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=export.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @app.route("/update", methods=["POST"])
-def update():
+@app.route("/c/<competition_id>/update", methods=["POST"])
+def update(competition_id=None):
     """
     Tar emot resultat från användare och sparar om det är bättre.
     Förväntar JSON: {"user": str, "level": int, "ms": int}
@@ -566,31 +976,17 @@ def update():
     level = data["level"]
     ms = data["ms"]
     
-    # Validera att nivå och tid är positiva
-    if not isinstance(level, int) or level < 1:
-        return jsonify({"error": t('errors', 'invalid_level')}), 400
-    
-    if not isinstance(ms, int) or ms < 0:
-        return jsonify({"error": t('errors', 'invalid_time')}), 400
-    
-    competition_id = db.get_active_competition_id()
-    
-    # Kontrollera att tävlingen är aktiv
-    if not competition_id:
-        return jsonify({"error": t('errors', 'no_active_competition')}), 400
+    competition_id, error_response = _get_accepting_competition(competition_id)
+    if error_response:
+        return error_response
     
-    competition_state = db.get_competition_state(competition_id)
-    if not competition_state.get("is_active", False):
-        return jsonify({"error": t('errors', 'competition_inactive')}), 403
-    
-    # Kontrollera att nivån finns i tävlingen
-    if competition_id not in COMPETITIONS:
-        return jsonify({"error": t('errors', 'competition_not_found')}), 400
-    
-    if level not in COMPETITIONS[competition_id]["levels"]:
-        return jsonify({"error": t('errors', 'level_not_in_competition')}), 400
+    error = _validate_result(competition_id, level, ms)
+    if error:
+        return jsonify({"error": t('errors', error)}), 400
     
     improved = db.save_result(user, competition_id, level, ms)
+    if improved:
+        publish.notify()
     
     return jsonify({
         "success": True,
@@ -599,6 +995,49 @@ def update():
     })
 
 
+@app.route("/update/batch", methods=["POST"])
+@app.route("/c/<competition_id>/update/batch", methods=["POST"])
+def update_batch(competition_id=None):
+    """
+    Tar emot flera resultat i ett anrop och sparar dem i en transaktion.
+    Förväntar JSON: {"results": [{"user": str, "level": int, "ms": int}, ...]}
+    Svarar med ett utfall per resultat i samma ordning.
+    """
+    data = request.json
+    
+    if not data or not isinstance(data.get("results"), list):
+        return jsonify({"error": "Missing results"}), 400
+    
+    competition_id, error_response = _get_accepting_competition(competition_id)
+    if error_response:
+        return error_response
+    
+    outcomes = []
+    valid = []
+    for item in data["results"]:
+        if not isinstance(item, dict) or "user" not in item or "level" not in item or "ms" not in item:
+            outcomes.append({"error": "Missing user, level or ms"})
+            continue
+        error = _validate_result(competition_id, item["level"], item["ms"])
+        if error:
+            outcomes.append({"error": t('errors', error)})
+            continue
+        outcomes.append(None)
+        valid.append((len(outcomes) - 1, (item["user"], item["level"], item["ms"])))
+    
+    improved = db.save_results(competition_id, [result for _, result in valid])
+    if any(improved):
+        publish.notify()
+    for (index, _), was_improved in zip(valid, improved):
+        outcomes[index] = {"improved": was_improved}
+    
+    return jsonify({
+        "success": True,
+        "accepted": len(valid),
+        "results": outcomes
+    })
+
+
 @app.route("/reset", methods=["GET"])
 def reset():
     """
@@ -609,15 +1048,23 @@ def reset():
     if api_key_header != API_KEY:
         return jsonify({"error": t('errors', 'invalid_api_key_error')}), 403
     
+    # Ta en ögonblicksbild innan allt raderas
+    backup.create_backup("pre-reset")
+    
     # Radera databasfilen och skapa ny tabell
     import sqlite3
     import os as os_module
     
     if os_module.path.exists(db.DB_PATH):
         os_module.remove(db.DB_PATH)
+    db.remove_shards()
+    db.reset_progress()
+    db.reset_wrong_attempts()
     
     db.init_db()
     db.init_competitions(COMPETITIONS)
+    replay.clear_cache()
+    publish.notify()
     
     return jsonify({"success": True, "message": t('errors', 'all_data_deleted')})
 
@@ -0,0 +1,111 @@
+"""
+Cachad progress per användare: en bitmapp med lösta nivåer per (user, tävling).
+
+Bitmapparna hålls i en begränsad LRU i processen och uppdateras direkt när
+den egna processen sparar ett resultat. En löst nivå förblir löst, så satta
+bitar litas på utan databasfråga. En nivå som ännu inte är löst kan ha
+lösts via en annan serverprocess och kontrolleras därför mot databasen
+högst var PROGRESS_TTL:e sekund. /reset är det enda som tar bort lösta
+nivåer; det stämplar en epokfil som alla processer jämför med (en stat()
+per uppslag) och som då tömmer cachen.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+
+PROGRESS_CACHE_SIZE = int(os.getenv("PROGRESS_CACHE_SIZE", "4096"))
+# Sekunder innan en ej löst nivå kontrolleras mot databasen igen
+PROGRESS_TTL = float(os.getenv("PROGRESS_TTL", "2"))
+
+
+def to_bitmap(levels: Iterable[int]) -> int:
+    """Nivånummer -> bitmapp (bit n = nivå n löst)."""
+    bits = 0
+    for level in levels:
+        bits |= 1 << level
+    return bits
+
+
+def from_bitmap(bits: int) -> list:
+    """Bitmapp -> sorterade nivånummer."""
+    return [level for level in range(bits.bit_length()) if bits >> level & 1]
+
+
+class ProgressCache:
+    """LRU med (bitmapp, senast kontrollerad) per (user, competition_id)."""
+
+    def __init__(self, loader: Callable[[str, str], Iterable[int]], stamp_path: Callable[[], str],
+                 size: int = PROGRESS_CACHE_SIZE, ttl: float = PROGRESS_TTL):
+        self.loader = loader
+        self.stamp_path = stamp_path
+        self.size = size
+        self.ttl = ttl
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+        self.epoch: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _current_epoch(self) -> int:
+        try:
+            return os.stat(self.stamp_path()).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _check_epoch(self):
+        epoch = self._current_epoch()
+        if epoch != self.epoch:
+            self.entries.clear()
+            self.epoch = epoch
+
+    def _store(self, key: Tuple[str, str], bits: int, checked: float):
+        self.entries[key] = (bits, checked)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def get(self, user: str, competition_id: str, level: Optional[int] = None) -> int:
+        """
+        Bitmappen för (user, competition_id). Med level räcker en satt bit för
+        den nivån; annars läses databasen om bitmappen är äldre än ttl.
+        """
+        key = (user, competition_id)
+        with self._lock:
+            self._check_epoch()
+            entry = self.entries.get(key)
+            if entry is not None:
+                bits, checked = entry
+                fresh = time.monotonic() - checked < self.ttl
+                if (level is not None and bits >> level & 1) or fresh:
+                    self.entries.move_to_end(key)
+                    return bits
+
+        bits = to_bitmap(self.loader(user, competition_id))
+        with self._lock:
+            # Bitar som satts under tiden (write-through) får inte tappas
+            previous = self.entries.get(key)
+            if previous is not None:
+                bits |= previous[0]
+            self._store(key, bits, time.monotonic())
+        return bits
+
+    def mark(self, user: str, competition_id: str, level: int):
+        """Write-through: nivån är löst. Okända användare läses in vid nästa get."""
+        key = (user, competition_id)
+        with self._lock:
+            self._check_epoch()
+            entry = self.entries.get(key)
+            if entry is not None:
+                self._store(key, entry[0] | 1 << level, entry[1])
+
+    def bump_epoch(self):
+        """Stämplar epokfilen så att alla processer tömmer sina cachar (efter /reset)."""
+        path = self.stamp_path()
+        with open(path, "a"):
+            pass
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+        with self._lock:
+            self.entries.clear()
+            self.epoch = self._current_epoch()
@@ -0,0 +1,172 @@
+"""
+Publicering av leaderboarden som statiska filer.
+
+När PUBLISH_DIR är satt renderas leaderboard.html och JSON-svaret från
+/api/leaderboard till filer i katalogen varje gång leaderboarden ändras.
+Ändringar samlas ihop (PUBLISH_DEBOUNCE sekunder) så att en skur av
+inlämningar ger en enda skrivning, och varje fil skrivs först till en
+temporär fil som sedan byter namn - en läsare ser alltid en hel fil.
+
+Tittarna kan då serveras av valfri statisk filserver (eller /published/
+i main.py) utan att belasta app-processerna eller SQLite.
+
+Varje serverprocess kan starta publiceringen, men bara den som håller ett
+fcntl-lås bredvid katalogen skriver. notify() stämplar mtime på en fil
+bredvid katalogen (<PUBLISH_DIR>.changed) som publiceringstråden läser av
+var PUBLISH_POLL:e sekund, så ändringar i alla processer publiceras.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows - ingen låsning mellan processer
+    fcntl = None
+
+
+PUBLISH_DIR = os.getenv("PUBLISH_DIR", "")
+# Sekunder att vänta in fler ändringar innan filerna skrivs
+PUBLISH_DEBOUNCE = float(os.getenv("PUBLISH_DEBOUNCE", "2"))
+# Cache-tid (sekunder) när filerna serveras via Flask
+PUBLISH_MAX_AGE = int(os.getenv("PUBLISH_MAX_AGE", "5"))
+# Sekunder mellan kontrollerna av ändringsstämpeln från andra processer
+PUBLISH_POLL = float(os.getenv("PUBLISH_POLL", "1"))
+
+Renderer = Callable[[], Dict[str, Union[str, bytes]]]
+
+_renderer: Optional[Renderer] = None
+_publisher: Optional[threading.Thread] = None
+_changed = threading.Event()
+_publisher_stop = threading.Event()
+_publish_lock = threading.Lock()
+
+
+def write_atomic(path: str, content: Union[str, bytes]):
+    """Skriver content till path via en temporär fil och os.replace."""
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def publish_now(render: Optional[Renderer] = None, directory: Optional[str] = None) -> List[str]:
+    """
+    Renderar och skriver alla filer direkt. render returnerar {filnamn: innehåll}.
+    Returnerar sökvägarna som skrevs.
+    """
+    render = render or _renderer
+    directory = directory or PUBLISH_DIR
+    if render is None or not directory:
+        return []
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    with _publish_lock:
+        for filename, content in render().items():
+            path = os.path.join(directory, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, content)
+            paths.append(path)
+    return paths
+
+
+def _stamp_path(directory: str) -> str:
+    # Bredvid katalogen, så att stämpeln inte själv publiceras
+    return os.path.normpath(directory) + ".changed"
+
+
+def _stamp(directory: str) -> int:
+    try:
+        return os.stat(_stamp_path(directory)).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def notify():
+    """Markerar att leaderboarden har ändrats, för alla processer. Billig att anropa när publicering är av."""
+    if not PUBLISH_DIR:
+        return
+    if _publisher is not None:
+        _changed.set()
+    path = _stamp_path(PUBLISH_DIR)
+    try:
+        with open(path, "a"):
+            pass
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+    except OSError as e:
+        print(f"⚠️  Warning: Marking leaderboard as changed failed: {e}")
+
+
+def _acquire_publisher_lock(directory: str):
+    """Låset som gör en process till den som publicerar, eller None."""
+    if fcntl is None:
+        return True
+    os.makedirs(directory, exist_ok=True)
+    lock_file = open(os.path.normpath(directory) + ".lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _run_publisher(debounce: float, directory: str, poll: float):
+    lock = None
+    published_stamp = None
+    while not _publisher_stop.is_set():
+        _changed.wait(poll)
+        if _publisher_stop.is_set():
+            break
+        if lock is None:
+            # En annan serverprocess publicerar; försök igen nästa varv
+            lock = _acquire_publisher_lock(directory)
+            if lock is None:
+                _changed.clear()
+                continue
+        if not _changed.is_set() and _stamp(directory) == published_stamp:
+            continue
+        # Samla ihop ändringar som kommer strax efter varandra
+        if _publisher_stop.wait(debounce):
+            break
+        _changed.clear()
+        published_stamp = _stamp(directory)
+        try:
+            publish_now(directory=directory)
+        except Exception as e:
+            print(f"⚠️  Warning: Publishing leaderboard failed: {e}")
+
+
+def start(render: Renderer, directory: Optional[str] = None, debounce: Optional[float] = None,
+          poll: Optional[float] = None) -> bool:
+    """
+    Startar publiceringen i en bakgrundstråd. Processen som får låset skriver
+    filerna en första gång och sedan vid varje ändring.
+    Returnerar False om PUBLISH_DIR inte är satt.
+    """
+    global _renderer, _publisher
+    directory = directory or PUBLISH_DIR
+    debounce = PUBLISH_DEBOUNCE if debounce is None else debounce
+    poll = PUBLISH_POLL if poll is None else poll
+    if not directory or (_publisher is not None and _publisher.is_alive()):
+        return False
+
+    _renderer = render
+    _publisher_stop.clear()
+    _publisher = threading.Thread(target=_run_publisher, args=(debounce, directory, poll),
+                                  name="leaderboard-publisher", daemon=True)
+    _publisher.start()
+    _changed.set()
+    return True
+
+
+def stop():
+    """Stoppar publiceringen."""
+    global _publisher
+    _publisher_stop.set()
+    _changed.set()
+    _publisher = None
@@ -0,0 +1,167 @@
+"""
+Token bucket-begränsning av inlämningar, delad mellan serverprocesser.
+
+Varje (route, nyckel) har en hink med upp till `burst` polletter som fylls
+på med `burst / seconds` per sekund; en förfrågan kostar en pollett.
+Nyckeln är den inloggade användaren eller API-nyckeln plus klientens
+IP-adress, så att en deltagare - eller deras AI-agent i en loop - inte
+kan hamra på /submit eller /update. Användaren i JSON-kroppen ingår inte,
+eftersom klienten då kunde få en ny hink per anrop genom att byta namn. Kontrollen görs i before_request, före
+all databasåtkomst.
+
+Tillståndet ligger i en liten minnesmappad fil (RATE_LIMIT_FILE, standard
+<DB_PATH>.ratelimit) med en fast tabell av hinkar och en räknare per route
+för strypta förfrågningar. Alla processer på maskinen läser och skriver
+samma fil under ett kort fcntl-lås. Utan fcntl (Windows) blir tillståndet
+per process.
+
+RATE_LIMITS anger gränser per route (Flask-endpoint) som burst/sekunder:
+
+    RATE_LIMITS="submit=10/10,update=30/10,update_batch=10/10"
+    RATE_LIMITS=off
+"""
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import db
+
+
+RATE_LIMITS = os.getenv("RATE_LIMITS", "submit=10/10,update=30/10,update_batch=10/10")
+RATE_LIMIT_FILE = os.getenv("RATE_LIMIT_FILE", "")
+
+# Antal hinkar i den delade tabellen. En nyckel hamnar på sin egen eller första
+# lediga plats bland PROBES platser från hash-platsen; är alla upptagna tar den
+# över den minst nyligen använda och ärver dess polletter, så en kollision ger
+# aldrig en ny full hink.
+SLOTS = 4096
+PROBES = 8
+MAX_ROUTES = 32
+
+_COUNTER = struct.Struct("<Q")
+_SLOT = struct.Struct("<Qdd")       # nyckel-hash, polletter, senast uppdaterad
+_SLOTS_OFFSET = MAX_ROUTES * _COUNTER.size
+_FILE_SIZE = _SLOTS_OFFSET + SLOTS * _SLOT.size
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """'submit=10/10,update=30/10' -> {route: (burst, polletter per sekund)}."""
+    limits: Dict[str, Tuple[float, float]] = {}
+    if not spec or spec.strip().lower() == "off":
+        return limits
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        route, _, value = item.partition("=")
+        burst, _, seconds = value.partition("/")
+        burst_value = float(burst)
+        limits[route.strip()] = (burst_value, burst_value / float(seconds or 1))
+    if len(limits) > MAX_ROUTES:
+        raise ValueError(f"At most {MAX_ROUTES} rate-limited routes are supported")
+    return limits
+
+
+class RateLimiter:
+    """Token buckets i en delad minnesmappad fil."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], path: Optional[str] = None):
+        self.limits = limits
+        self.routes = {route: index for index, route in enumerate(sorted(limits))}
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._map is not None:
+            return
+        if fcntl is None or self.path is None:
+            self._map = mmap.mmap(-1, _FILE_SIZE)
+            return
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < _FILE_SIZE:
+            os.ftruncate(self._fd, _FILE_SIZE)
+        self._map = mmap.mmap(self._fd, _FILE_SIZE)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # Trådlåset behövs också: flock skiljer inte på trådar i samma process
+        with self._lock:
+            self._open()
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def take(self, route: str, key: str) -> Tuple[bool, float]:
+        """
+        Tar en pollett ur hinken för (route, key).
+        Returnerar (tillåten, sekunder tills nästa pollett finns).
+        """
+        limit = self.limits.get(route)
+        if limit is None:
+            return True, 0.0
+        burst, rate = limit
+        digest = hashlib.blake2b(f"{route}\0{key}".encode("utf-8"), digest_size=8).digest()
+        key_hash = int.from_bytes(digest, "little") or 1
+        now = time.time()
+
+        with self._locked():
+            offset, tokens, updated = self._find_slot(key_hash, burst, now)
+            tokens = min(burst, tokens + max(now - updated, 0.0) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            else:
+                counter = self.routes[route] * _COUNTER.size
+                _COUNTER.pack_into(self._map, counter, _COUNTER.unpack_from(self._map, counter)[0] + 1)
+            _SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+
+        return allowed, 0.0 if allowed else (1.0 - tokens) / rate
+
+    def _find_slot(self, key_hash: int, burst: float, now: float) -> Tuple[int, float, float]:
+        """(offset, polletter, senast uppdaterad) för nyckelns hink. Anropas under låset."""
+        oldest: Optional[Tuple[int, float, float]] = None
+        for probe in range(PROBES):
+            offset = _SLOTS_OFFSET + ((key_hash + probe) % SLOTS) * _SLOT.size
+            stored_hash, tokens, updated = _SLOT.unpack_from(self._map, offset)
+            if stored_hash == key_hash:
+                return offset, tokens, updated
+            if stored_hash == 0:
+                # Ledig plats: ny nyckel börjar med full hink
+                return offset, burst, now
+            if oldest is None or updated < oldest[2]:
+                oldest = (offset, tokens, updated)
+        return oldest
+
+    def throttled(self) -> Dict[str, int]:
+        """Antal strypta förfrågningar per route (alla processer)."""
+        with self._locked():
+            return {
+                route: _COUNTER.unpack_from(self._map, index * _COUNTER.size)[0]
+                for route, index in self.routes.items()
+            }
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    """Processens begränsare, skapad vid första användning (efter att DB_PATH satts)."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(parse_limits(RATE_LIMITS), RATE_LIMIT_FILE or db.DB_PATH + ".ratelimit")
+    return _limiter
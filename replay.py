@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Uppspelning av leaderboarden över tid ur results.
+
+Lösta nivåer läses i ett ordnat pass (db.iter_solved_levels) och
+rangordningen hålls sorterad inkrementellt: varje löst nivå flyttar en
+användare i listan, och bara de som passeras får en ny placering. Därför
+blir tidslinjen kompakt - en post per användare och faktisk rankändring.
+
+Var CHECKPOINT_EVERY:e händelse sparas en kopia av tillståndet, så att
+ställningen vid en godtycklig tidpunkt T byggs från närmaste checkpoint
+plus högst CHECKPOINT_EVERY händelser. Nya resultat läses vid nästa
+anrop utan att historiken byggs om. Eftersom uppspelningen byggs ur results
+(samma tabell som load_leaderboard) ingår både /submit och /update.
+Uppspelningen byggs om när start_time ändras eller när /reset har stämplat
+epokfilen (db.reset_epoch), även om det skedde i en annan serverprocess.
+
+Sortering och tider följer db.load_leaderboard: högsta nivå → lägsta
+totaltid från tävlingsstart → tidigaste tidsstämpel.
+
+    python replay.py --at 2025-03-11T10:30
+    python replay.py --timeline --competition <id>
+"""
+import argparse
+import bisect
+import datetime
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import db
+
+
+# Antal händelser mellan sparade tillstånd
+CHECKPOINT_EVERY = 64
+
+_replays: Dict[str, "LeaderboardReplay"] = {}
+_replays_lock = threading.Lock()
+
+
+class LeaderboardReplay:
+    """Leaderboard-historiken för en tävling, byggd i ett pass över results."""
+
+    def __init__(self, competition_id: str, start_time: int = 0, epoch: int = 0):
+        self.competition_id = competition_id
+        self.start_time = start_time
+        self.epoch = epoch
+        # Tävlingsstart för tidsberäkningen; utan start_time som i load_leaderboard
+        self.base_time = start_time
+        self.last_rowid = 0
+        self.events: List[Tuple[int, str, int]] = []
+        self.event_times: List[int] = []
+        self.levels: Dict[str, Dict[int, int]] = {}
+        self.order: List[Tuple[int, int, int, str]] = []
+        self.timelines: Dict[str, List[List[int]]] = {}
+        self.checkpoints: List[Tuple[Dict[str, Dict[int, int]], List[Tuple[int, int, int, str]]]] = []
+
+    def _ms(self, ts: int) -> int:
+        if self.base_time > 0 and ts >= self.base_time:
+            return (ts - self.base_time) * 1000
+        return 0
+
+    def _key(self, user: str, levels: Dict[int, int]) -> Tuple[int, int, int, str]:
+        # Användarnamnet sist ger samma ordning vid lika som load_leaderboard
+        return (-max(levels), sum(self._ms(ts) for ts in levels.values()), min(levels.values()), user)
+
+    def _place(self, levels: Dict[str, Dict[int, int]], order: List[Tuple[int, int, int, str]],
+               user: str, level: int, ts: int) -> Tuple[int, int]:
+        """Lägger till en löst nivå och flyttar användaren. Returnerar (gammal, ny) position."""
+        user_levels = levels.get(user)
+        if user_levels is None:
+            old_pos = len(order)
+            user_levels = levels[user] = {}
+        else:
+            old_pos = bisect.bisect_left(order, self._key(user, user_levels))
+            del order[old_pos]
+        user_levels[level] = ts
+        new_key = self._key(user, user_levels)
+        new_pos = bisect.bisect_left(order, new_key)
+        order.insert(new_pos, new_key)
+        return old_pos, new_pos
+
+    def _record(self, user: str, ts: int, rank: int):
+        timeline = self.timelines.setdefault(user, [])
+        if timeline and timeline[-1][1] == rank:
+            return
+        if timeline and timeline[-1][0] == ts:
+            # Flera ändringar samma sekund - behåll bara slutläget
+            timeline.pop()
+            if timeline and timeline[-1][1] == rank:
+                return
+        timeline.append([ts, rank])
+
+    def _apply(self, user: str, level: int, ts: int):
+        # Nivån räknas från första korrekta svaret, precis som results
+        if level in self.levels.get(user, ()):
+            return
+        if not self.base_time:
+            self.base_time = ts - 1
+        # Håll händelserna sorterade på tid även om klockan skulle gå bakåt
+        if self.event_times and ts < self.event_times[-1]:
+            ts = self.event_times[-1]
+
+        old_pos, new_pos = self._place(self.levels, self.order, user, level, ts)
+        # Alla mellan gammal och ny position har fått en ny placering
+        for position in range(min(old_pos, new_pos), max(old_pos, new_pos) + 1):
+            self._record(self.order[position][-1], ts, position + 1)
+
+        self.events.append((ts, user, level))
+        self.event_times.append(ts)
+        if len(self.events) % CHECKPOINT_EVERY == 0:
+            self.checkpoints.append((
+                {name: dict(levels) for name, levels in self.levels.items()},
+                list(self.order)
+            ))
+
+    def refresh(self) -> int:
+        """Läser in resultat som tillkommit sedan förra anropet. Returnerar antalet rader."""
+        count = 0
+        for rowid, user, level, ts in db.iter_solved_levels(self.competition_id, self.last_rowid):
+            self._apply(user, level, ts)
+            self.last_rowid = rowid
+            count += 1
+        return count
+
+    def state_at(self, t: int) -> Tuple[Dict[str, Dict[int, int]], List[Tuple[int, int, int, str]]]:
+        """(levels, order) efter alla händelser med tidsstämpel <= t."""
+        end = bisect.bisect_right(self.event_times, t)
+        checkpoint = end // CHECKPOINT_EVERY
+        if checkpoint:
+            saved_levels, saved_order = self.checkpoints[checkpoint - 1]
+            levels = {name: dict(user_levels) for name, user_levels in saved_levels.items()}
+            order = list(saved_order)
+        else:
+            levels, order = {}, []
+        for ts, user, level in self.events[checkpoint * CHECKPOINT_EVERY:end]:
+            self._place(levels, order, user, level, ts)
+        return levels, order
+
+    def standings_at(self, t: int) -> List[Dict[str, Any]]:
+        """Leaderboarden vid tidpunkt t, i samma format som db.load_leaderboard plus rank."""
+        levels, order = self.state_at(t)
+        standings = []
+        for rank, (negative_level, total_ms, _, user) in enumerate(order, start=1):
+            standings.append({
+                "rank": rank,
+                "user": user,
+                "levels": {
+                    str(level): {"ms": self._ms(ts), "ts": ts}
+                    for level, ts in sorted(levels[user].items())
+                },
+                "total_ms": total_ms,
+                "max_level": -negative_level
+            })
+        return standings
+
+    def timeline(self, user: Optional[str] = None) -> Dict[str, List[List[int]]]:
+        """Rankändringar per användare som [[ts, rank], ...]."""
+        if user is not None:
+            return {user: self.timelines.get(user, [])}
+        return self.timelines
+
+    def time_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """(base_time, tid för sista händelsen), eller (None, None) utan händelser."""
+        if not self.event_times:
+            return None, None
+        return self.base_time, self.event_times[-1]
+
+
+def get_replay(competition_id: Optional[str] = None) -> Optional[LeaderboardReplay]:
+    """
+    Hämtar (och uppdaterar) den cachade uppspelningen för en tävling.
+    Byggs om från början om tävlingens start_time har ändrats eller om
+    databasen har återställts sedan den byggdes.
+    """
+    if competition_id is None:
+        competition_id = db.get_active_competition_id()
+    if competition_id is None:
+        return None
+
+    start_time = int(db.get_competition_state(competition_id).get("start_time", 0))
+    epoch = db.reset_epoch()
+    with _replays_lock:
+        replay = _replays.get(competition_id)
+        if replay is None or replay.start_time != start_time or replay.epoch != epoch:
+            replay = _replays[competition_id] = LeaderboardReplay(competition_id, start_time, epoch)
+        replay.refresh()
+        return replay
+
+
+def clear_cache():
+    """Glömmer alla uppspelningar i denna process (andra processer ser epokfilen)."""
+    with _replays_lock:
+        _replays.clear()
+
+
+def main():
+    import export
+
+    parser = argparse.ArgumentParser(description="Spela upp leaderboarden över tid")
+    parser.add_argument("--competition", help="competition_id (standard: aktiv tävling)")
+    parser.add_argument("--at", help="Ställning vid tid (unix-tid eller ISO, standard: nu)")
+    parser.add_argument("--timeline", action="store_true", help="Skriv rankändringar per användare som JSON")
+    parser.add_argument("--db", default=db.DB_PATH, help="Databasfil")
+    args = parser.parse_args()
+
+    db.DB_PATH = args.db
+    replay = get_replay(args.competition)
+    if replay is None:
+        print("⚠️  Warning: Ingen tävling vald")
+        return
+
+    if args.timeline:
+        print(json.dumps(replay.timeline(), indent=2, ensure_ascii=False))
+        return
+
+    at = export.parse_time(args.at)
+    if at is None:
+        at = replay.time_range()[1] or 0
+    print(f"Ställning {datetime.datetime.fromtimestamp(at):%Y-%m-%d %H:%M:%S} ({len(replay.events)} lösta nivåer totalt)")
+    for entry in replay.standings_at(at):
+        print(f"{entry['rank']:>4}. {entry['user']:<20} nivå {entry['max_level']}  {entry['total_ms'] / 1000:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
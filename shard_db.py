@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Delar upp en befintlig competition.db i en databasfil per tävling.
+
+results och submissions kopieras per competition_id till DB_SHARD_DIR
+(samma layout som db.connect använder), med bevarade submission-id:n.
+Kopieringen är idempotent (INSERT OR IGNORE), så den kan köras om. Med
+--delete tas de flyttade raderna bort ur källan, som då bara behåller
+katalogen (competitions och competition_state).
+
+    python shard_db.py --shard-dir shards
+    python shard_db.py --db competition.db --shard-dir shards --delete
+    DB_SHARD_DIR=shards python main.py
+"""
+import argparse
+import sqlite3
+from typing import Dict, Tuple
+
+import db
+
+
+def split_database(source_path: str, shard_dir: str, delete: bool = False) -> Dict[str, Tuple[int, int]]:
+    """
+    Kopierar varje tävlings results/submissions från source_path till sin shard.
+    Returnerar {competition_id: (results, submissions)} med antal kopierade rader.
+    """
+    db.DB_SHARD_DIR = shard_dir
+    conn = sqlite3.connect(source_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT competition_id FROM results UNION SELECT competition_id FROM submissions")
+    competition_ids = [row[0] for row in cursor.fetchall()]
+
+    copied = {}
+    for competition_id in competition_ids:
+        path = db.shard_path(competition_id)
+        db.init_shard(path)
+        cursor.execute("ATTACH DATABASE ? AS shard", (path,))
+        try:
+            cursor.execute(
+                "INSERT OR IGNORE INTO shard.results SELECT user, competition_id, level, best_ms, ts "
+                "FROM main.results WHERE competition_id = ?",
+                (competition_id,)
+            )
+            results = cursor.rowcount
+            cursor.execute(
+                "INSERT OR IGNORE INTO shard.submissions SELECT id, user, competition_id, level, ms, timestamp, is_correct "
+                "FROM main.submissions WHERE competition_id = ?",
+                (competition_id,)
+            )
+            submissions = cursor.rowcount
+            conn.commit()
+        finally:
+            cursor.execute("DETACH DATABASE shard")
+        copied[competition_id] = (results, submissions)
+
+    if delete:
+        cursor.execute("DELETE FROM results")
+        cursor.execute("DELETE FROM submissions")
+        conn.commit()
+        cursor.execute("VACUUM")
+    conn.close()
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dela upp competition.db i en databas per tävling")
+    parser.add_argument("--db", default=db.DB_PATH, help="Källdatabas (blir katalogdatabas)")
+    parser.add_argument("--shard-dir", default=db.DB_SHARD_DIR or "shards", help="Katalog för shard-filerna")
+    parser.add_argument("--delete", action="store_true", help="Ta bort flyttade rader ur källdatabasen")
+    args = parser.parse_args()
+
+    copied = split_database(args.db, args.shard_dir, args.delete)
+    if not copied:
+        print("⚠️  Warning: Inga results eller submissions att flytta")
+        return
+    for competition_id, (results, submissions) in copied.items():
+        print(f"✓ {competition_id}: {results} results, {submissions} submissions -> {db.shard_path(competition_id)}")
+    print(f"\nStarta servern med DB_SHARD_DIR={args.shard_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,20 +40,33 @@ TRANSLATIONS = {
             'not_started': 'The competition has not started',
             'active_competition': 'Active competition:',
             'select_active_competition': 'Select Active Competition',
+            'running': 'Running',
             'start_competition': 'Start competition',
             'stop_competition': 'Stop competition',
+            'start_track': 'Start in parallel',
+            'stop_track': 'Stop',
             'clear_all_data': 'Clear all data',
+            'backup_now': 'Back up now',
+            'error_backup': 'Error creating backup: {}',
             'statistics': 'Statistics',
             'users': 'Users',
             'submissions': 'Submissions',
             'completed_levels': 'Completed levels',
+            'active_users': 'Active users (5 min)',
+            'submissions_per_minute': 'Submissions/min',
+            'wrong_answer_rate': 'Wrong answers',
+            'throttled': 'Throttled requests',
+            'solves_per_level': 'Solves per level',
+            'stuck_per_level': 'Stuck per level (wrong answers, not solved)',
+            'stuck_detail': 'Level {} ({} wrong)',
             'view_leaderboard': 'View leaderboard',
             'alert_started': 'Competition started!',
             'alert_stopped': 'Competition stopped!',
             'alert_changed': 'Competition changed!',
             'confirm_stop': 'Are you sure you want to stop the competition?',
+            'confirm_stop_track': 'Are you sure you want to stop {}?',
             'confirm_change': 'Are you sure you want to switch to this competition?',
-            'confirm_reset': 'Are you sure you want to delete ALL data? This cannot be undone!',
+            'confirm_reset': 'Are you sure you want to delete ALL data? A backup is taken first.',
             'alert_reset': 'All data deleted!',
             'error_start': 'Error starting: {}',
             'error_stop': 'Error stopping: {}',
@@ -131,6 +144,12 @@ TRANSLATIONS = {
             'level_not_in_competition': 'The level is not in the competition',
             'all_data_deleted': 'All results deleted',
             'error_reading_solution': 'Error reading solution file: {}',
+            'invalid_export_request': 'Invalid export request: {}',
+            'backup_created': 'Backup created: {}',
+            'no_database': 'No database to back up',
+            'invalid_time_parameter': 'Invalid time: {}',
+            'rate_limited': 'Too many attempts - wait a moment and try again',
+            'ambiguous_competition': 'Several competitions are running - send to the competition\'s own URL: {}',
         },
         'messages': {
             'time_improved': 'Time improved!',
@@ -173,20 +192,33 @@ TRANSLATIONS = {
             'not_started': 'Tävlingen är inte startad',
             'active_competition': 'Aktiv tävling:',
             'select_active_competition': 'Välj Aktiv Tävling',
+            'running': 'Pågår',
             'start_competition': '🚀 Starta tävling',
             'stop_competition': '⏹️ Stoppa tävling',
+            'start_track': '🚀 Starta parallellt',
+            'stop_track': '⏹️ Stoppa',
             'clear_all_data': '🗑️ Rensa all data',
+            'backup_now': '💾 Backup nu',
+            'error_backup': 'Fel vid backup: {}',
             'statistics': 'Statistik',
             'users': 'Användare',
             'submissions': 'Inlämningar',
             'completed_levels': 'Genomförda nivåer',
+            'active_users': 'Aktiva användare (5 min)',
+            'submissions_per_minute': 'Inlämningar/min',
+            'wrong_answer_rate': 'Felaktiga svar',
+            'throttled': 'Strypta förfrågningar',
+            'solves_per_level': 'Lösta per nivå',
+            'stuck_per_level': 'Fastnat per nivå (fel svar, ej löst)',
+            'stuck_detail': 'Nivå {} ({} fel)',
             'view_leaderboard': '📊 Visa leaderboard',
             'alert_started': 'Tävling startad!',
             'alert_stopped': 'Tävling stoppad!',
             'alert_changed': 'Tävling ändrad!',
             'confirm_stop': 'Är du säker på att du vill stoppa tävlingen?',
+            'confirm_stop_track': 'Är du säker på att du vill stoppa {}?',
             'confirm_change': 'Är du säker på att du vill byta till denna tävling?',
-            'confirm_reset': 'Är du säker på att du vill radera ALL data? Detta går inte att ångra!',
+            'confirm_reset': 'Är du säker på att du vill radera ALL data? En backup tas först.',
             'alert_reset': 'All data raderad!',
             'error_start': 'Fel vid start: {}',
             'error_stop': 'Fel vid stopp: {}',
@@ -264,6 +296,12 @@ TRANSLATIONS = {
             'level_not_in_competition': 'Nivån finns inte i tävlingen',
             'all_data_deleted': 'Alla resultat raderade',
             'error_reading_solution': 'Fel vid läsning av lösningsfil: {}',
+            'invalid_export_request': 'Ogiltig exportförfrågan: {}',
+            'backup_created': 'Backup skapad: {}',
+            'no_database': 'Ingen databas att säkerhetskopiera',
+            'invalid_time_parameter': 'Ogiltig tid: {}',
+            'rate_limited': 'För många försök - vänta en stund och försök igen',
+            'ambiguous_competition': 'Flera tävlingar pågår - skicka till tävlingens egen URL: {}',
         },
         'messages': {
             'time_improved': 'Tid förbättrad!',
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Solution verification runner.
+
+Discovers every level's solution.py through competition_loader, runs them in
+parallel subprocesses with a per-solution timeout and checks the printed answer
+with the level's compiled answer matcher, the same one the server uses.
+
+Results are cached in .verify_cache.json keyed by a hash of the solution,
+the level's files and the configs, so re-runs only execute what changed.
+
+Usage:
+    python verify_solutions.py                      # all competitions
+    python verify_solutions.py -c vbg-coupling-safety -j 8 --timeout 60
+    python verify_solutions.py --no-cache
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+import competition_loader
+
+
+CACHE_PATH = ".verify_cache.json"
+
+
+def _level_dir(competitions_dir: Path, competition: Dict[str, Any], level_id: int) -> Path:
+    return competitions_dir / competition["folder_name"] / f"level{level_id}"
+
+
+def solution_hash(competitions_dir: Path, competition: Dict[str, Any], level_id: int) -> str:
+    """
+    Hashes everything a solution's outcome depends on: the level directory
+    (solution.py, config.json, data files - hidden cache files excluded), the
+    competition config and helper modules, and the input files of all levels
+    in the competition, since later levels often read an earlier level's data
+    (e.g. ../level1/VBG_CAN_Log__1_.log).
+    """
+    competition_dir = competitions_dir / competition["folder_name"]
+    level_dir = _level_dir(competitions_dir, competition, level_id)
+    # Shared helper modules next to the levels are part of the solution too
+    files = [competition_dir / "config.json"] + sorted(competition_dir.glob("*.py"))
+    files += [p for p in sorted(level_dir.rglob("*"))
+              if p.is_file() and not any(part.startswith((".", "__pycache__")) for part in p.relative_to(level_dir).parts)]
+    for other_id, other_level in sorted(competition["levels"].items()):
+        if "input_file" in other_level:
+            files.append(_level_dir(competitions_dir, competition, other_id) / other_level["input_file"])
+
+    digest = hashlib.sha256()
+    for path in files:
+        if not path.exists():
+            continue
+        digest.update(str(path.relative_to(competitions_dir)).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def answer_candidates(stdout: str) -> List[str]:
+    """
+    Extracts the answer from a solution's output: the last "Answer: X" line
+    if there is one, otherwise the last non-empty line - what a participant
+    would paste into the answer field.
+    """
+    lines = [line.strip() for line in stdout.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    answer_lines = [line for line in lines if re.match(r"^Answer:\s*", line)]
+    if answer_lines:
+        return [re.sub(r"^Answer:\s*", "", answer_lines[-1])]
+    return [lines[-1]]
+
+
+def run_solution(level_dir: str, timeout: float) -> Dict[str, Any]:
+    """Runs solution.py in its level directory. Executed in a worker thread; the subprocess does the work."""
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(
+            [sys.executable, "solution.py"],
+            cwd=level_dir,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=timeout,
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        )
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout", "elapsed_ms": int((time.perf_counter() - start) * 1000)}
+
+    return {
+        "status": "ran",
+        "returncode": completed.returncode,
+        "stdout": completed.stdout,
+        "stderr": completed.stderr[-2000:],
+        "elapsed_ms": int((time.perf_counter() - start) * 1000),
+    }
+
+
+def evaluate(run: Dict[str, Any], matcher: Callable[[str], bool]) -> Dict[str, Any]:
+    """Turns a raw run into a verdict: pass, fail, error or timeout."""
+    if run["status"] == "timeout":
+        return {"status": "timeout", "answer": None, "elapsed_ms": run["elapsed_ms"]}
+    if run["returncode"] != 0:
+        return {"status": "error", "answer": None, "elapsed_ms": run["elapsed_ms"],
+                "detail": (run["stderr"].strip().splitlines() or [""])[-1]}
+
+    candidates = answer_candidates(run["stdout"])
+    for candidate in candidates:
+        if matcher(candidate):
+            return {"status": "pass", "answer": candidate, "elapsed_ms": run["elapsed_ms"]}
+    return {"status": "fail", "answer": candidates[0] if candidates else "", "elapsed_ms": run["elapsed_ms"]}
+
+
+def load_cache(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_cache(path: str, cache: Dict[str, Any]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def verify_all(competitions_dir: str = "competitions", only: Optional[List[str]] = None,
+               workers: Optional[int] = None, timeout: float = 120, use_cache: bool = True,
+               cache_path: str = CACHE_PATH) -> List[Dict[str, Any]]:
+    """
+    Verifies all solutions and returns one verdict per level, sorted by
+    competition folder and level. Only levels whose hash changed are executed.
+    """
+    competitions_path = Path(competitions_dir)
+    competitions = competition_loader.load_competitions(competitions_dir)
+    cache = load_cache(cache_path) if use_cache else {}
+
+    verdicts = []
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for comp_id, competition in competitions.items():
+            if only and competition["folder_name"] not in only and comp_id not in only:
+                continue
+            for level_id, level in sorted(competition["levels"].items()):
+                if "solution_file" not in level:
+                    continue
+
+                key = f"{competition['folder_name']}/level{level_id}"
+                digest = solution_hash(competitions_path, competition, level_id)
+                verdict = {"key": key, "hash": digest, "cached": False}
+
+                cached = cache.get(key)
+                if cached and cached.get("hash") == digest:
+                    verdict.update(cached, cached=True)
+                    verdicts.append(verdict)
+                    continue
+
+                level_dir = str(_level_dir(competitions_path, competition, level_id).resolve())
+                future = pool.submit(run_solution, level_dir, timeout)
+                jobs[future] = (verdict, level)
+
+        for future in as_completed(jobs):
+            verdict, level = jobs[future]
+            verdict.update(evaluate(future.result(), level["matcher"]))
+            verdicts.append(verdict)
+            # Timeouts depend on machine load and errors often on the environment
+            # (interpreter, missing packages) - don't cache them
+            if verdict["status"] not in ("timeout", "error"):
+                cache[verdict["key"]] = {k: v for k, v in verdict.items() if k not in ("key", "cached")}
+
+    if use_cache:
+        save_cache(cache_path, cache)
+
+    verdicts.sort(key=lambda v: v["key"])
+    return verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify all competition solutions against their expected answers")
+    parser.add_argument("-c", "--competition", action="append",
+                        help="Competition folder name or id (repeatable, default: all)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of solutions run in parallel")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-solution timeout in seconds")
+    parser.add_argument("--competitions-dir", default="competitions")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't update the cache")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    verdicts = verify_all(args.competitions_dir, args.competition, args.workers, args.timeout,
+                          use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+
+    symbols = {"pass": "✓", "fail": "✗", "error": "💥", "timeout": "⏱"}
+    print()
+    for verdict in verdicts:
+        cached = " (cached)" if verdict["cached"] else ""
+        answer = verdict.get("answer") or ""
+        if len(answer) > 40:
+            answer = answer[:37] + "..."
+        print(f"{symbols[verdict['status']]} {verdict['key']:<40} {verdict['status']:<8} "
+              f"{verdict['elapsed_ms']:>6} ms  {answer}{cached}")
+        if verdict.get("detail"):
+            print(f"    {verdict['detail']}")
+
+    failed = [v for v in verdicts if v["status"] != "pass"]
+    executed = sum(1 for v in verdicts if not v["cached"])
+    print(f"\n📊 {len(verdicts) - len(failed)}/{len(verdicts)} passed, "
+          f"{executed} executed, {len(verdicts) - executed} cached ({elapsed:.1f} s)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()